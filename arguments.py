@@ -7,6 +7,7 @@ from argparse import (
     Action, ArgumentParser, ArgumentError, ArgumentTypeError, Namespace
 )
 from configuration import LIGHT_COUNT
+from definitions import SongRange
 
 class ArgumentParserImproved(ArgumentParser):
     """
@@ -59,6 +60,8 @@ def display_help(
     print("  marquee.py mode [mode_index | mode_name]")
     print("                  [--brightness_factor=[0 - 1.0]]")
     print("                  [--speed_factor=(0 - 5.0]]")
+    print("                  [--from_measure=[1 - ]] [--to_measure=[1 - ]]")
+    print("                  [--loop=[true|false]]")
     print("  marquee.py pattern [--dimmer=[pattern] &| --relay=[pattern]]")
     print("                     [--derive_missing=[true|false]]")
     print("  marquee.py command [command_name]")
@@ -67,6 +70,9 @@ def display_help(
     for index, name in mode_menu:
         print(f'   {index}   {name}')
     print()
+    print("Measures: Music modes play from from_measure through")
+    print("  to_measure (default the whole song), repeatedly if loop.")
+    print()
     print("Patterns: Specify --dimmer, --relay, or both.")
     print(f"  dimmer: {LIGHT_COUNT} hex values, each 0..A (0%..100%)")
     print(f"  relay: {LIGHT_COUNT} binary values")
@@ -105,6 +111,18 @@ def validate_speed_factor(arg: str) -> float:
     else:
         return value
     
+def validate_measure(arg: str) -> int:
+    """ Return arg as int if it is a valid measure number,
+        otherwise raise exception. """
+    try:
+        value = int(arg)
+        if value < 1:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Invalid measure: {arg}")
+    else:
+        return value
+
 def validate_light_pattern(arg: str) -> str:
     """ Return arg if it is a valid light pattern, 
         otherwise raise exception. """
@@ -144,6 +162,15 @@ def parse_arguments(
     mode_p.add_argument('speed_factor', 
         optional=True, 
         type=validate_speed_factor, default=1.0)
+    mode_p.add_argument('from_measure', 'from-measure',
+        optional=True,
+        type=validate_measure, default=1)
+    mode_p.add_argument('to_measure', 'to-measure',
+        optional=True,
+        type=validate_measure, default=None)
+    mode_p.add_argument('loop',
+        optional=True,
+        type=str_to_bool, default=False)
     pattern_p = sub_p.add_parser('pattern')
     pattern_p.add_argument('relay', 
         optional=True, type=validate_light_pattern)
@@ -175,7 +202,13 @@ def process_arguments(
             "mode_index": mode_ids[parsed.mode_id],
             "brightness_factor": parsed.brightness_factor,
             "speed_factor": parsed.speed_factor,
+            "song_range": SongRange(
+                parsed.from_measure, parsed.to_measure, parsed.loop,
+            ),
         }
+        if parsed.to_measure is not None:
+            if parsed.to_measure < parsed.from_measure:
+                raise ValueError()
     elif parsed.operation == 'pattern':
         args = {}
         if p:= parsed.relay:
@@ -9,6 +9,7 @@ from typing import Any, ClassVar
 
 from button_interface import ButtonInterface
 from definitions import AutoModeEntry
+from schedulers import NS_PER_SECOND
 
 @dataclass
 class BaseMode(ABC):
@@ -31,7 +32,7 @@ class AutoMode(BaseMode):
     mode_lookup: ClassVar[dict[str, int]]
     modes: list[AutoModeEntry]
     mode_iter: Iterator[AutoModeEntry] = field(init=False)
-    trigger_time: float = field(init=False)
+    trigger_ns: int = field(init=False)
 
     def __post_init__(self):
         """Initialize."""
@@ -70,8 +71,8 @@ class AutoMode(BaseMode):
     def next_mode(self):
         """Set up next mode in sequence."""
         mode = next(self.mode_iter)
-        self.trigger_time = (
-            time.time() + mode.duration
+        self.trigger_ns = (
+            time.monotonic_ns() + round(mode.duration * NS_PER_SECOND)
         )
         print(f"Next auto mode is {mode.name} "
               f"for {mode.duration} seconds.")
@@ -0,0 +1,73 @@
+"""Marquee Lighted Sign Project - frame arrays benchmark
+
+Times generating long and parameter-swept sequences with
+frame_arrays, against generating them pattern by pattern
+with sequences.
+Run from the project directory:
+    python -m benchmarks.bench_frames
+"""
+
+from collections.abc import Callable
+import itertools
+import timeit
+
+import numpy as np
+
+from configuration import LIGHT_COUNT
+import frame_arrays
+import sequences
+
+RANDOM_FRAMES = 100_000
+
+def all_patterns() -> list[str]:
+    """Return every pattern of LIGHT_COUNT lights."""
+    return [f"{p:0{LIGHT_COUNT}b}" for p in range(1 << LIGHT_COUNT)]
+
+def rotate_sweep_arrays():
+    """Rotate every pattern, both ways, as arrays."""
+    for pattern in all_patterns():
+        for clockwise in (True, False):
+            frame_arrays.rotate(pattern, clockwise)
+
+def rotate_sweep_sequences():
+    """Rotate every pattern, both ways, pattern by pattern."""
+    for pattern in all_patterns():
+        for clockwise in (True, False):
+            list(sequences.rotate(pattern, clockwise))
+
+def rotate_sweep_matrix():
+    """Rotate every pattern, both ways, as a single array."""
+    rows = np.array([[int(c) for c in p] for p in all_patterns()], np.uint8)
+    shifts = np.concatenate(
+        [np.arange(LIGHT_COUNT, 0, -1), np.arange(0, LIGHT_COUNT)]
+    )
+    columns = (shifts[:, None] + np.arange(LIGHT_COUNT)) % LIGHT_COUNT
+    rows[:, columns]
+
+def random_flip_arrays():
+    """Generate RANDOM_FRAMES random flips as an array."""
+    frame_arrays.random_flip("0" * LIGHT_COUNT, RANDOM_FRAMES)
+
+def random_flip_sequences():
+    """Generate RANDOM_FRAMES random flips pattern by pattern."""
+    list(itertools.islice(
+        sequences.random_flip(light_pattern="0" * LIGHT_COUNT), RANDOM_FRAMES,
+    ))
+
+def best_of(func: Callable) -> float:
+    """Return the best seconds per call of func."""
+    return min(timeit.repeat(func, repeat=5, number=1))
+
+def main():
+    """Print the time of each workload."""
+    for name, func in (
+        ("rotate sweep, sequences", rotate_sweep_sequences),
+        ("rotate sweep, frame_arrays", rotate_sweep_arrays),
+        ("rotate sweep, one array", rotate_sweep_matrix),
+        ("random_flip, sequences", random_flip_sequences),
+        ("random_flip, frame_arrays", random_flip_arrays),
+    ):
+        print(f"{name:<30}{best_of(func) * 1e3:>10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Marquee Lighted Sign Project - merge benchmark
+
+Times Section._merge_concurrent_measures as the number of parts
+and of notes per part grows, against the former approach of
+rescanning every part at every beat.
+Run from the project directory:
+    python -m benchmarks.bench_merge
+"""
+
+from dataclasses import replace
+import timeit
+
+from music.music_implementation import (
+    BaseNote, DrumNote, Measure, NoteGroup, Rest, Section,
+)
+
+PART_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+NOTE_COUNTS = (16, 64, 256)
+
+def scan_merge(measures: tuple[Measure, ...]) -> Measure:
+    """Merge by rescanning every part at every beat (former approach)."""
+    beats = measures[0].beats
+    elements_in = [iter(m.elements) for m in measures]
+    elements_out = []
+    beat_next: list[float | None] = [0.0 for _ in measures]
+    beat, rest_accumulated = 0.0, 0.0
+    while any(bn is not None for bn in beat_next):
+        concurrent = []
+        for i, _ in enumerate(measures):
+            if beat_next[i] == beat:
+                element = next(elements_in[i], None)
+                if element is None:
+                    beat_next[i] = None
+                else:
+                    beat_next[i] = beat + element.duration
+                    if not isinstance(element, Rest):
+                        concurrent.append(replace(element, duration=0))
+        if concurrent:
+            if rest_accumulated:
+                elements_out.append(Rest(rest_accumulated))
+                rest_accumulated = 0.0
+            elements_out.append(
+                NoteGroup(tuple(concurrent)) if len(concurrent) > 1 else
+                concurrent[0]
+            )
+        next_beat = min(
+            (bn for bn in beat_next if bn is not None), default=beats
+        )
+        rest_accumulated += next_beat - beat
+        beat = next_beat
+    if rest_accumulated:
+        elements_out.append(Rest(rest_accumulated))
+    return Measure(tuple(elements_out), beats=beats)
+
+def concurrent_measures(parts: int, notes: int) -> tuple[Measure, ...]:
+    """Return one measure per part, each of notes notes,
+       with each part offset from the others,
+       so that no two notes are concurrent."""
+    measures = []
+    for p in range(parts):
+        elements: list[BaseNote] = [Rest(p / parts)] + [
+            DrumNote(1.0, accent=0, pitches={p % 2})
+            for _ in range(notes)
+        ]
+        measures.append(Measure(tuple(elements), beats=notes + 1))
+    return tuple(measures)
+
+def best_of(func, measures: tuple[Measure, ...]) -> float:
+    """Return the best seconds per call of func(measures)."""
+    timer = timeit.Timer(lambda: func(measures))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number
+
+def main():
+    """Print the time per merged element of each approach."""
+    print(f"{'parts':>6}{'notes':>7}{'heap µs/el':>12}{'scan µs/el':>12}")
+    for notes in NOTE_COUNTS:
+        for parts in PART_COUNTS:
+            measures = concurrent_measures(parts, notes)
+            assert Section._merge_concurrent_measures(measures) == (
+                scan_merge(measures)
+            )
+            elements = parts * notes
+            heap = best_of(Section._merge_concurrent_measures, measures)
+            scan = best_of(scan_merge, measures)
+            print(
+                f"{parts:>6}{notes:>7}"
+                f"{heap / elements * 1e6:>12.2f}{scan / elements * 1e6:>12.2f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Marquee Lighted Sign Project - notation benchmark
+
+Times parsing notation symbols with the tokenizer, both before
+(cold) and after (warm) its cache is filled, against the former
+recursive parser, on the Signs song and on the drum notation
+of Demo.rotate_fast.
+Run from the project directory:
+    python -m benchmarks.bench_notation
+"""
+
+from collections.abc import Callable
+import timeit
+
+import music.music_notation as notation
+from music.music_notation import (
+    drum_accent_map, drum_pitch_map, note_duration, rest_duration,
+    symbol_duration,
+)
+from signs_song import SignsSong
+
+ROTATIONS = 11  # As in Demo.rotate_fast
+ROTATE_FAST_DRUMS = ' ♩^ ♩ ♩ ♩ ♩ ♩^ ♩ ♩ ♩ ♩ ' * ROTATIONS + ' ♩^ '
+
+def recursive_interpret_symbols(
+    symbols: str,
+    accent_map: dict = {},
+    pitch_map: dict = {},
+) -> tuple[float, set, int, bool]:
+    """Parse symbols recursively (former approach)."""
+    symbols = symbols.replace(' ', '')
+    if not symbols:
+        raise ValueError("Invalid (empty) symbol.")
+    elif symbols[0] == '3':
+        duration, pitches, accent, is_rest = recursive_interpret_symbols(
+            symbols[1:], accent_map, pitch_map,
+        )
+        duration *= 2/3
+    elif symbols[-1] in accent_map:
+        duration, pitches, accent, is_rest = recursive_interpret_symbols(
+            symbols[:-1], accent_map, pitch_map,
+        )
+        accent = accent_map[symbols[-1]]
+    elif symbols[0] in pitch_map:
+        duration, pitches, accent, is_rest = recursive_interpret_symbols(
+            symbols[1:], accent_map, pitch_map,
+        )
+        pitches = {pitch_map[symbols[0]]} | pitches
+    else:
+        if any(s not in symbol_duration for s in symbols):
+            raise ValueError(f"Invalid symbol in '{symbols}'.")
+        if any(
+            s1 in rest_duration and s2 in note_duration
+            for s1 in symbols for s2 in symbols
+        ):
+            raise ValueError("Cannot mix note and rest symbols.")
+        is_rest = symbols[0] in rest_duration
+        duration = sum(
+            (rest_duration if is_rest else note_duration)[s]
+            for s in symbols
+        )
+        pitches, accent = set(), 0
+    return duration, pitches, accent, is_rest
+
+def signs_song():
+    """Build every section of the Signs song."""
+    SignsSong.sections(SignsSong.__new__(SignsSong))
+
+def rotate_fast_drums():
+    """Parse every symbol set of Demo.rotate_fast's drum notation."""
+    for symbols in ROTATE_FAST_DRUMS.split():
+        notation._interpret_symbols(
+            symbols, accent_map=drum_accent_map, pitch_map=drum_pitch_map,
+        )
+
+def best_of(func: Callable, setup: Callable = lambda: None) -> float:
+    """Return the best seconds per call of func, calling setup first."""
+    timer = timeit.Timer(func, setup)
+    return min(timer.repeat(repeat=20, number=1))
+
+def main():
+    """Print the time of each workload with each parser."""
+    tokenized = notation._interpret_symbols
+    print(f"{'workload':<20}{'recursive ms':>14}{'cold ms':>10}{'warm ms':>10}")
+    for name, func in (
+        ("Signs song", signs_song),
+        ("rotate_fast drums", rotate_fast_drums),
+    ):
+        notation._interpret_symbols = recursive_interpret_symbols
+        try:
+            recursive = best_of(func)
+        finally:
+            notation._interpret_symbols = tokenized
+        cold = best_of(func, notation._parse_symbols.cache_clear)
+        warm = best_of(func)
+        print(
+            f"{name:<20}{recursive * 1e3:>14.3f}"
+            f"{cold * 1e3:>10.3f}{warm * 1e3:>10.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
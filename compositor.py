@@ -0,0 +1,211 @@
+"""Marquee Lighted Sign Project - compositor"""
+
+"""
+Plays several sequences at once, each at its own pace,
+blending their frames into one relay mask (lit) and one
+brightness vector (levels) whenever any of them changes.
+"""
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from configuration import LIGHT_COUNT
+from frame_arrays import pattern, unpack
+from patterns import Pattern
+from sequences import FRAME_CACHE_SIZE, LRUCache, frame_buffer
+
+BRIGHTNESS_MAX = 100
+PACE_TOLERANCE = 1e-9  # Seconds within which layers change together
+
+# By sequence, kwargs and brightnesses
+_layer_frames: LRUCache = LRUCache(FRAME_CACHE_SIZE)
+
+def _blend_or(lit, levels, layer_lit, layer_levels):
+    """Light lights lit in either, at the brighter level."""
+    np.logical_or(lit, layer_lit, out=lit)
+    np.maximum(levels, layer_levels, out=levels)
+    np.multiply(levels, lit, out=levels)
+
+def _blend_and(lit, levels, layer_lit, layer_levels):
+    """Light lights lit in both, at the dimmer level."""
+    np.logical_and(lit, layer_lit, out=lit)
+    np.minimum(levels, layer_levels, out=levels)
+    np.multiply(levels, lit, out=levels)
+
+def _blend_xor(lit, levels, layer_lit, layer_levels):
+    """Light lights lit in just one, at the brighter level."""
+    np.logical_xor(lit, layer_lit, out=lit)
+    np.maximum(levels, layer_levels, out=levels)
+    np.multiply(levels, lit, out=levels)
+
+def _blend_max(lit, levels, layer_lit, layer_levels):
+    """Take the brighter level; light lights above 0."""
+    np.maximum(levels, layer_levels, out=levels)
+    np.greater(levels, 0, out=lit)
+
+def _blend_add(lit, levels, layer_lit, layer_levels):
+    """Add levels, up to BRIGHTNESS_MAX; light lights above 0."""
+    np.add(levels, layer_levels, out=levels)
+    np.minimum(levels, BRIGHTNESS_MAX, out=levels)
+    np.greater(levels, 0, out=lit)
+
+BLEND_MODES: dict[str, Callable] = {
+    'or': _blend_or, 'and': _blend_and, 'xor': _blend_xor,
+    'max': _blend_max, 'add': _blend_add,
+}
+
+@dataclass
+class Layer:
+    """A sequence played at pace seconds per frame, blended onto
+       the layers beneath it per blend:
+       'or', 'and', 'xor' combine which lights are lit, taking
+       the brighter ('or', 'xor') or dimmer ('and') level
+       for those lit, and turning the others off (level 0);
+       'max', 'add' combine levels, lighting any light above 0.
+       Patterns the sequence yields are lit at brightness_on,
+       unlit at brightness_off; lists it yields are brightnesses."""
+    sequence: Callable
+    pace: float
+    blend: str = 'or'
+    brightness_on: int = BRIGHTNESS_MAX
+    brightness_off: int = 0
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        """Validate."""
+        if self.blend not in BLEND_MODES:
+            raise ValueError(f"Unrecognized blend mode '{self.blend}'.")
+        if self.pace <= 0:
+            raise ValueError("Layer pace must be positive.")
+
+    def read(self, frame, lit: np.ndarray, levels: np.ndarray):
+        """Write frame, a pattern or a brightness per light,
+           into the lit and levels rows."""
+        if isinstance(frame, (Pattern, str)):
+            unpack(Pattern(frame), lit)
+            np.multiply(
+                lit, self.brightness_on - self.brightness_off, out=levels,
+            )
+            np.add(levels, self.brightness_off, out=levels)
+        else:
+            levels[:] = frame
+            np.greater(levels, 0, out=lit)
+
+    def buffered_rows(self) -> list[tuple[np.ndarray, np.ndarray]] | None:
+        """Return the (lit, levels) rows of each frame of the sequence,
+           converted once from its frame buffer and shared by every
+           caller.  Return None if the sequence must be streamed."""
+        frames = frame_buffer(self.sequence, self.kwargs)
+        if frames is None:
+            return None
+        key = (
+            self.sequence, frozenset(self.kwargs.items()),
+            self.brightness_on, self.brightness_off,
+        )
+        try:
+            return _layer_frames[key]
+        except KeyError:
+            pass
+        if not frames:
+            raise ValueError("Layer sequence yields no frames.")
+        lit = np.zeros((len(frames), LIGHT_COUNT), dtype=bool)
+        levels = np.zeros((len(frames), LIGHT_COUNT), dtype=np.int16)
+        for frame, lit_row, levels_row in zip(frames, lit, levels):
+            self.read(frame, lit_row, levels_row)
+        lit.setflags(write=False)
+        levels.setflags(write=False)
+        rows = list(zip(lit, levels))
+        _layer_frames[key] = rows
+        return rows
+
+    def stream(self) -> Iterator:
+        """Yield the frames of the sequence, restarting it
+           whenever it ends."""
+        while True:
+            empty = True
+            for frame in self.sequence(**self.kwargs):
+                empty = False
+                yield frame
+            if empty:
+                raise ValueError("Layer sequence yields no frames.")
+
+class _Track:
+    """Playback position of a layer, within its frame buffer
+       or its stream."""
+
+    def __init__(self, layer: Layer):
+        """Initialize at the first frame."""
+        self.layer = layer
+        self.step = 0
+        self.rows = layer.buffered_rows()
+        if self.rows is None:
+            self.frames = layer.stream()
+            self.lit = np.zeros(LIGHT_COUNT, dtype=bool)
+            self.levels = np.zeros(LIGHT_COUNT, dtype=np.int16)
+            layer.read(next(self.frames), self.lit, self.levels)
+        else:
+            self.lit, self.levels = self.rows[0]
+
+    @property
+    def next_offset(self) -> float:
+        """Seconds from the start at which the next frame begins."""
+        return (self.step + 1) * self.layer.pace
+
+    def advance(self):
+        """Move to the next frame."""
+        self.step += 1
+        if self.rows is None:
+            self.layer.read(next(self.frames), self.lit, self.levels)
+        else:
+            self.lit, self.levels = self.rows[self.step % len(self.rows)]
+
+class Compositor:
+    """Blends the frames of layers, bottom first, into lit and levels.
+       The bottom layer's blend is not used."""
+
+    def __init__(self, *layers: Layer):
+        """Initialize."""
+        if not layers:
+            raise ValueError("Compositor requires at least one layer.")
+        self.layers = layers
+        self.lit = np.zeros(LIGHT_COUNT, dtype=bool)
+        self.levels = np.zeros(LIGHT_COUNT, dtype=np.int16)
+
+    def _blend(self, tracks: list[_Track]):
+        """Blend the current frame of each track into lit and levels."""
+        bottom, *rest = tracks
+        np.copyto(self.lit, bottom.lit)
+        np.copyto(self.levels, bottom.levels)
+        for track in rest:
+            BLEND_MODES[track.layer.blend](
+                self.lit, self.levels, track.lit, track.levels,
+            )
+
+    def steps(self) -> Iterator[float]:
+        """Each time any layer's frame changes, blend every layer's
+           current frame into lit and levels, and yield the offset
+           in seconds from the start.
+           This does not end on its own."""
+        tracks = [_Track(layer) for layer in self.layers]
+        offset = 0.0
+        while True:
+            self._blend(tracks)
+            yield offset
+            offset = min(track.next_offset for track in tracks)
+            for track in tracks:
+                if track.next_offset <= offset + PACE_TOLERANCE:
+                    track.advance()
+
+    def pattern(self) -> Pattern:
+        """Return the blended lit lights, e.g. for LightSet.set_relays."""
+        return pattern(self.lit)
+
+    def brightnesses(self, factor: float = 1.0) -> list[int]:
+        """Return the blended levels times factor,
+           e.g. for LightSet.set_dimmers."""
+        if factor == 1.0:
+            return self.levels.tolist()
+        return (self.levels * factor).astype(int).tolist()
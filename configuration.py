@@ -50,3 +50,10 @@ DIMMER_ADDRESSES = [
     '192.168.64.115',
     '192.168.64.116',
 ]
+DIMMER_TRANSPORT = 'http'  # Or 'websocket', 'udp' (see transports.py)
+# Seconds to issue each device's actions ahead of the beat,
+# overriding the live round-trip estimate.  Devices are
+# 'lights' (relays), 'dimmers', 'bells' and 'drums'.
+LATENCY_OFFSETS: dict[str, float] = {
+    # 'dimmers': 0.040,
+}
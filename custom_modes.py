@@ -13,6 +13,7 @@ from configuration import (
 )
 from dimmers import TRANSITION_MINIMUM
 from modes import PlayMusicMode, PlayMode
+from patterns import Pattern, PatternLike
 from definitions import DimmerParams
 
 @dataclass(kw_only=True)
@@ -33,7 +34,7 @@ class BellTest(PlayMusicMode):
 class RotateReversible(PlayMode):
     """Rotate a pattern, reversing direction in response to a button press."""
     pace: float
-    pattern: str
+    pattern: PatternLike
 
     def __post_init__(self):
         """Initialize."""
@@ -44,9 +45,7 @@ class RotateReversible(PlayMode):
            Called repeatedly until the mode is changed."""
         self.player.lights.set_relays(self.pattern)
         self.player.wait(self.pace)
-        self.pattern = (
-            self.pattern[self.direction:] + self.pattern[:self.direction]
-        )
+        self.pattern = Pattern(self.pattern).rotate(self.direction)
 
 @dataclass(kw_only=True)
 class RotateRewind(PlayMode):
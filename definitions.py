@@ -27,6 +27,7 @@ class DimmerParams(SpecialParams):
     speed_factor: float = 1.0
     transition_on: float = 0.5
     transition_off: float = 0.5
+    transport: str | None = None  # Dimmer transport name; None for default
 
 @dataclass
 class MirrorParams(SpecialParams):
@@ -39,6 +40,14 @@ class ModeConstructor:
     mode_class: Type
     kwargs: dict[str, Any]
 
+@dataclass
+class SongRange:
+    """Measures of a song to play, counted from 1:
+       first through last (None for the end), repeated if loop."""
+    first: int = 1
+    last: int | None = None
+    loop: bool = False
+
 @dataclass
 class AutoModeEntry:
     index: int
@@ -7,7 +7,7 @@ from configuration import ALL_HIGH, ALL_ON, ALL_LOW, ALL_ON
 from definitions import ActionParams, DimmerParams
 from modes import PlayMusicMode
 from music import (
-    dimmer, dimmer_sequence, light, measure, part, play,
+    compile_sections, dimmer, dimmer_sequence, light, measure, part, play,
     section, sequence,
 )
 from music import(
@@ -26,7 +26,12 @@ class Demo(PlayMusicMode):
 
     def execute(self):
         """Execute version 3 demo."""
-        sections = [
+        self.play_song(compile_sections(self.sections, Demo))
+        sys.exit()
+
+    def sections(self):
+        """Demo sections, in order."""
+        return [
             self.pre(),
             self.alternate(),
             self.rotate(),
@@ -35,9 +40,6 @@ class Demo(PlayMusicMode):
             self.rotate_fast(),
             self.dim(),
         ]
-        for section in sections:
-            section.play()
-        sys.exit()
 
     def pre(self):
         # 𝅝 𝅗𝅥 ♩ ♪ 𝅘𝅥𝅯 𝅘𝅥𝅰 𝄻 𝄼 𝄽 𝄾 𝄿 𝅀
@@ -136,14 +138,13 @@ class Demo(PlayMusicMode):
         # 𝅝 𝅗𝅥 ♩ ♪ 𝅘𝅥𝅯 𝅘𝅥𝅰 𝄻 𝄼 𝄽 𝄾 𝄿 𝅀
         # light(ALL_ON, DimmerParams(transition_on=6))()
         rotations = 11
-        pattern = [
-            p
-            for p in rotate_build_flip(count = rotations * 10)
-        ] + ["111111111111"]
+        pattern = concat(
+            of(rotate_build_flip, count = rotations * 10), all_on,
+        )
         return section(
             part(
                 sequence_measure(
-                    '♩', rotations * 10 + 1, lambda: iter(pattern), 
+                    '♩', pattern.length, pattern, 
                 ),
             ),
             drum_part(
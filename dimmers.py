@@ -2,15 +2,23 @@
 
 from abc import ABC
 import asyncio
+import bisect
+from concurrent.futures import Future
 from dataclasses import dataclass
-import requests
+import threading
 import time
+from typing import ClassVar
 
-import aiohttp
+from configuration import DIMMER_TRANSPORT
+from eventloops import BackgroundEventLoop
+from latency import LatencyHistogram
+from transports import TRANSPORTS, ShellyRpcError, ShellyTransport
 
 TRANSITION_DEFAULT = 0.5
 TRANSITION_MINIMUM = 0.5
 TRANSITION_MAXIMUM = 10800.0
+STATUS_POLL_INTERVAL = 1.0
+STATUS_POLL_LINGER = 10.0
 
 class ShellyDimmer(ABC):
     """Supports Shelly Dimmers."""
@@ -18,18 +26,30 @@ class ShellyDimmer(ABC):
     channel_count: int  # Abstract
 
     _dimmers: list["ShellyDimmer"] = []
+    _dimmers_lock: ClassVar[threading.Lock] = threading.Lock()
+    _event_loop: ClassVar[BackgroundEventLoop | None] = None
+    _event_loop_lock: ClassVar[threading.Lock] = threading.Lock()
 
-    def __init__(self, index: int, ip_address: str):
-        """Create the dimmer instance."""
-        self._dimmers.append(self)
+    def __init__(
+            self,
+            index: int,
+            ip_address: str,
+            transport: str = DIMMER_TRANSPORT,
+        ):
+        """Create the dimmer instance, communicating via
+           the named transport (see transports.TRANSPORTS).
+           May be called on several threads at once."""
         self.index = index
         self.ip_address = ip_address
         print(f"Initializing {self}")
-        try:
-            self.session = requests.Session()
-        except requests.Timeout as err:
-            print(err)
-            raise
+        self.transport: ShellyTransport = TRANSPORTS[transport](
+            self.ip_address, self.event_loop(),
+        )
+        self.transports: dict[str, ShellyTransport] = {
+            transport: self.transport,
+        }
+        self._poll_task: asyncio.Task | None = None
+        self._unconfirmed_until = 0.0
         self.channels: list[DimmerChannel] = [
             DimmerChannel(
                 dimmer=self,
@@ -39,6 +59,8 @@ class ShellyDimmer(ABC):
             ) 
             for id, status in self._get_status()
         ]
+        with self._dimmers_lock:
+            bisect.insort(self._dimmers, self, key=lambda d: d.index)
 
     def __str__(self):
         return f"{type(self).__name__} {self.index} @ {self.ip_address}"
@@ -49,46 +71,132 @@ class ShellyDimmer(ABC):
     def close(self):
         """Clean up."""
 
+    @classmethod
+    def event_loop(cls) -> BackgroundEventLoop:
+        """Return the shared background event loop, starting it if needed.
+           May be called on several threads at once."""
+        with ShellyDimmer._event_loop_lock:
+            if ShellyDimmer._event_loop is None:
+                ShellyDimmer._event_loop = BackgroundEventLoop()
+            return ShellyDimmer._event_loop
+
+    @classmethod
+    def close_all(cls):
+        """Send any pending commands, stop every dimmer's status poll,
+           close its transports, then stop the shared event loop
+           and close its connection pools."""
+        if (event_loop := ShellyDimmer._event_loop) is not None:
+            for dimmer in cls._dimmers:
+                for channel in dimmer.channels:
+                    event_loop.run(channel._drain())
+                event_loop.run(dimmer._stop_polling())
+                for transport in dimmer.transports.values():
+                    event_loop.run(transport.close())
+            event_loop.close()
+            ShellyDimmer._event_loop = None
+        with cls._dimmers_lock:
+            cls._dimmers.clear()
+
     def _get_status(self) -> list[tuple[int, dict]]:
         """ Fetch status parameters for all channels. """
         try:
-            result = self.session.get(
-                url=f'http://{self.ip_address}/rpc/Shelly.GetStatus',
-                timeout=1.0,
-            )
-        # !!! Check for result != 200
-        except requests.Timeout as err:
+            json = self.event_loop().run(self._fetch_status())
+        except (TimeoutError, ShellyRpcError) as err:
             print(err)
             raise
-        json = result.json()
         return [
             (id, json[f'light:{id}'])
             for id in range(self.channel_count)
         ]      
+
+    def transport_for(self, name: str | None) -> ShellyTransport:
+        """Return the named transport, creating it on first use.
+           None selects the dimmer's default transport."""
+        if name is None:
+            return self.transport
+        if name not in self.transports:
+            self.transports[name] = TRANSPORTS[name](
+                self.ip_address, self.event_loop(),
+            )
+        return self.transports[name]
+
+    async def _fetch_status(self) -> dict:
+        """ Fetch raw status of the device over a transport
+            that returns responses. """
+        transport = (
+            self.transport_for('http') if self.transport.fire_and_forget else
+            self.transport
+        )
+        return await transport.call('Shelly.GetStatus', {})
+
+    def _expect_unconfirmed(self, command: "_DimmerCommand"):
+        """Note a command sent without a response, and make sure
+           the status poll is running to confirm its result.
+           Called on the event loop thread."""
+        command.channel.settle_time = (
+            time.monotonic() + command.params.get('transition_duration', 0)
+        )
+        self._unconfirmed_until = time.monotonic() + STATUS_POLL_LINGER
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_status())
+
+    async def _stop_polling(self):
+        """Cancel the status poll, if it is running."""
+        if self._poll_task is not None and not self._poll_task.done():
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+        self._poll_task = None
+
+    async def _poll_status(self):
+        """Correct the brightness of each channel from Shelly.GetStatus
+           once its transition is complete, until no unconfirmed
+           command has been sent for STATUS_POLL_LINGER seconds."""
+        while time.monotonic() < self._unconfirmed_until:
+            await asyncio.sleep(STATUS_POLL_INTERVAL)
+            try:
+                status = await self._fetch_status()
+            except Exception as err:
+                print(f"{self} status poll: {err!r}")
+                continue
+            now = time.monotonic()
+            for channel in self.channels:
+                if now >= channel.settle_time and channel._pending is None:
+                    channel.brightness = status[f'light:{channel.id}']['brightness']
     
     @classmethod
-    async def _execute_single_command(cls, command: "_DimmerCommand") -> aiohttp.ClientResponse:
+    async def _execute_single_command(cls, command: "_DimmerCommand") -> dict | None:
         """ Send individual command as part of asynchonous batch. """
+        dimmer = command.channel.dimmer
+        transport = dimmer.transport_for(command.transport)
+        start = time.monotonic()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    url=command.url,
-                    params=command.params,
-                ) as response:
-                    response = await response.json()
+            response = await transport.call(command.method, command.params)
         except TimeoutError as err:
-            # !!! catch timeout, check for != 200
+            # !!! catch timeout
+            command.channel.round_trips.record_timeout()
             print(err)
             raise
         else:
-            if (b := command.params.get('brightness')) is not None:
+            if not transport.fire_and_forget:
+                command.channel.round_trips.record(time.monotonic() - start)
+            if (
+                (b := command.params.get('brightness')) is not None
+                and command.channel._pending is None
+            ):
+                # Unless a newer command is pending, which has
+                # already set brightness, record the confirmed one.
                 command.channel.brightness = b
+            if transport.fire_and_forget:
+                dimmer._expect_unconfirmed(command)
         return response
     
     @classmethod
     async def execute_multiple_commands(
         cls, commands: list["_DimmerCommand"]
-    ) -> list[aiohttp.ClientResponse]:
+    ) -> list[dict]:
         """Send multiple commands asynchronously."""
         async with asyncio.TaskGroup() as tg:
             tasks = [
@@ -99,6 +207,41 @@ class ShellyDimmer(ABC):
             ]
         return [task.result() for task in tasks]
 
+    @classmethod
+    def submit_commands(cls, commands: list["_DimmerCommand"]) -> "Future[list[dict]]":
+        """Thread-safe: schedule commands on the shared event loop.
+           Return a future for the list of responses."""
+        return cls.event_loop().submit(cls.execute_multiple_commands(commands))
+
+    @classmethod
+    def execute_commands(
+        cls,
+        commands: list["_DimmerCommand"],
+        timeout: float | None = None,
+    ) -> list[dict]:
+        """Thread-safe: send commands on the shared event loop
+           and wait for all responses."""
+        return cls.submit_commands(commands).result(timeout)
+
+    @classmethod
+    async def _enqueue_commands(cls, commands: list["_DimmerCommand"]):
+        """Place each command in its channel's pending slot
+           and wait until each slot's latest command is sent."""
+        await asyncio.gather(*(
+            command.channel._enqueue(command)
+            for command in commands
+        ))
+
+    @classmethod
+    def submit_latest(cls, commands: list["_DimmerCommand"]) -> "Future[None]":
+        """Thread-safe: queue commands so that each channel sends
+           only the latest of any commands not yet on the wire.
+           Return a future that completes once they are sent."""
+        for command in commands:
+            if (b := command.params.get('brightness')) is not None:
+                command.channel.brightness = b
+        return cls.event_loop().submit(cls._enqueue_commands(commands))
+
     @classmethod
     def calibrate_all(cls):
         """ Execute calibration on all dimmers on each successive channel. """
@@ -115,13 +258,13 @@ class ShellyDimmer(ABC):
             commands = [
                 _DimmerCommand(
                     channel=dimmer.channels[id], 
-                    url=f'http://{dimmer.ip_address}/rpc/Light.Calibrate',
+                    method='Light.Calibrate',
                     params={'id':id},
                 )
                 for dimmer in cls._dimmers
                 if id < dimmer.channel_count
             ]
-            asyncio.run(cls.execute_multiple_commands(commands))
+            cls.execute_commands(commands)
             time.sleep(150)
         print("Calibration complete")
 
@@ -141,6 +284,16 @@ class DimmerChannel:
         self.id = id
         self.brightness = brightness
         self.next_update: float = 0
+        self.settle_time: float = 0
+        self.sent_count = 0
+        self.coalesced_count = 0
+        self._pending: _DimmerCommand | None = None
+        self._pending_sent: asyncio.Future | None = None
+        self._sender: asyncio.Task | None = None
+        self.round_trips = LatencyHistogram.named(f"{self} @ {self.ip_address}")
+        self.set_latency = LatencyHistogram.named(
+            f"{self} @ {self.ip_address} set-to-sent"
+        )
 
     def __str__(self):
         return (f"dimmer {self.dimmer.index} channel {self.index}")
@@ -148,13 +301,51 @@ class DimmerChannel:
     def __repr__(self):
         return f"<{self}>"
     
+    def _enqueue(self, command: "_DimmerCommand") -> asyncio.Future:
+        """Place command in the pending slot, replacing any older
+           command not yet sent.  Return a future that completes
+           when the slot's command is sent.
+           Called on the event loop thread."""
+        if self._pending is not None:
+            self.coalesced_count += 1
+            self._pending = command
+            assert self._pending_sent is not None
+            return self._pending_sent
+        self._pending = command
+        self._pending_sent = asyncio.get_running_loop().create_future()
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._send_pending())
+        return self._pending_sent
+
+    async def _send_pending(self):
+        """Send the pending command, one at a time,
+           until the slot stays empty."""
+        while self._pending is not None:
+            command, sent = self._pending, self._pending_sent
+            self._pending, self._pending_sent = None, None
+            assert sent is not None
+            try:
+                await self.dimmer._execute_single_command(command)
+            except Exception as err:
+                print(f"{self}: {err!r}")
+            self.sent_count += 1
+            sent.set_result(None)
+
+    async def _drain(self):
+        """Wait until the pending slot is empty and sent."""
+        if self._sender is not None:
+            await self._sender
+
     def make_set_command(
         self, 
         brightness: int | None = None, 
         offset: int | None = None,
         transition: float | None = None, 
+        transport: str | None = None,
     ) -> "_DimmerCommand":
-        """Produce dimmer API parameters from requested values and state."""
+        """Produce dimmer API parameters from requested values and state.
+           transport names the transport to send it by;
+           None selects the dimmer's default."""
         assert transition is None or transition >= TRANSITION_MINIMUM
         if brightness is not None:
             new_brightness = brightness 
@@ -168,12 +359,13 @@ class DimmerChannel:
                 if new_brightness is not None else {}) |
             ({'transition_duration': 
                 transition or TRANSITION_DEFAULT}) |
-            ({'on': 'true'})
+            ({'on': True})
         )
         return _DimmerCommand(
             channel = self,
-            url=f'http://{self.ip_address}/rpc/Light.Set',
+            method='Light.Set',
             params=params,
+            transport=transport,
         )
 
     def set(self, 
@@ -181,26 +373,21 @@ class DimmerChannel:
             offset: int | None = None,
             transition: float | None = None, 
             wait: bool = False,
+            transport: str | None = None,
     ):
-        """Set the dimmer channel per requested values and state."""
+        """Set the dimmer channel per requested values and state.
+           Return without waiting for the command to be sent;
+           an unsent older command for this channel is replaced."""
         command = self.make_set_command(
             brightness=brightness,
             offset=offset,
             transition=transition,
+            transport=transport,
+        )
+        start = time.monotonic()
+        self.dimmer.submit_latest([command]).add_done_callback(
+            lambda _: self.set_latency.record(time.monotonic() - start)
         )
-        try:
-            start = time.time()
-            self.dimmer.session.get(
-                url=command.url,
-                params=command.params,
-                timeout=1.0,
-            )
-            # !!! Check for result != 200
-        except requests.exceptions.Timeout as e:
-            print(time.time(), self.ip_address, id, e)
-        else:
-            if (b := command.params.get('brightness')) is not None:
-                self.brightness = b
         if wait:
             assert transition is not None
             print("WAIT")
@@ -210,8 +397,9 @@ class DimmerChannel:
 class _DimmerCommand:
     """ Parameters for giving command to dimmer. """
     channel: DimmerChannel
-    url: str
+    method: str
     params: dict
+    transport: str | None = None
     
 class ShellyProDimmer2PM(ShellyDimmer):
     """Supports the Shelly Pro Dimmer 2PM."""
@@ -0,0 +1,86 @@
+"""Marquee Lighted Sign Project - eventloops"""
+
+import asyncio
+from collections.abc import Coroutine
+from concurrent.futures import Future
+import threading
+from typing import Any, TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+CONNECTIONS_PER_HOST = 4
+KEEPALIVE_TIMEOUT = 60.0
+REQUEST_TIMEOUT = 1.0
+
+class BackgroundEventLoop:
+    """Long-lived asyncio event loop running on its own thread.
+       Owns one keep-alive connection pool (aiohttp session)
+       per device IP address, so no caller ever creates
+       a loop or a socket of its own."""
+
+    def __init__(self):
+        """Start the loop thread."""
+        self._loop = asyncio.new_event_loop()
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._thread = threading.Thread(
+            target=self._run,
+            name="marquee-event-loop",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __str__(self):
+        return f"{type(self).__name__} on {self._thread.name}"
+
+    def _run(self):
+        """Thread body: run the loop until stopped."""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The underlying event loop."""
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        """Schedule coro on the loop from any thread.
+           Return a future for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Schedule coro on the loop from any thread
+           and block until it completes."""
+        return self.submit(coro).result(timeout)
+
+    def session(self, ip_address: str) -> aiohttp.ClientSession:
+        """Return the pooled session for ip_address, creating it
+           on first use.  Must be called from the loop thread."""
+        session = self._sessions.get(ip_address)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=CONNECTIONS_PER_HOST,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ),
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            )
+            self._sessions[ip_address] = session
+        return session
+
+    async def _close_sessions(self):
+        """Close all pooled sessions."""
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    def close(self):
+        """Close all sessions, then stop the loop and its thread."""
+        if not self._loop.is_running():
+            return
+        try:
+            self.run(self._close_sessions(), timeout=REQUEST_TIMEOUT)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=REQUEST_TIMEOUT)
@@ -1,7 +1,11 @@
 """Marquee Lighted Sign Project - executors"""
 
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from signal import SIGUSR1  # type: ignore
+import time
+from typing import Any
 
 from gpiozero import Button as _Button  # type: ignore
 
@@ -11,26 +15,65 @@ from buttonsets import ButtonSet
 from configuration import (
     ALL_RELAYS, ALL_OFF, DIMMER_ADDRESSES, EXTRA_COUNT,
 )
-from definitions import SpecialParams, ModeConstructor
+from definitions import SpecialParams, ModeConstructor, SongRange
 from dimmers import ShellyDimmer, ShellyProDimmer2PM, TRANSITION_DEFAULT
 from instruments import BellSet, DrumSet
+from jitter import JitterRecorder
+from latency import LatencyHistogram
 from lightsets import LightSet
 from modes import PlaySequenceMode
 from relays import NumatoRL160001, NumatoSSR80001
 
+STATS_PROBE_COUNT = 20
+
+def _timed(constructor: Callable) -> tuple[Any, float]:
+    """Return the result of constructor and the seconds it took."""
+    start = time.monotonic()
+    result = constructor()
+    return result, time.monotonic() - start
+
+def start_devices(constructors: dict[str, Callable]) -> dict[str, Any]:
+    """Construct all devices concurrently, each on a worker thread,
+       and print how long each one took."""
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(constructors)) as pool:
+        futures = {
+            name: pool.submit(_timed, constructor)
+            for name, constructor in constructors.items()
+        }
+    results = {name: future.result() for name, future in futures.items()}
+    print("Device startup times:")
+    for name, (_, elapsed) in results.items():
+        print(f"  {name:<32}{elapsed * 1000:8.1f} ms")
+    print(f"  {'(all, concurrently)':<32}{(time.monotonic() - start) * 1000:8.1f} ms")
+    return {name: device for name, (device, _) in results.items()}
+
 def setup_devices(brightness_factor: float):
-    bells = BellSet(
-        relays = NumatoSSR80001("/dev/marquee_bells")  # /dev/ttyACM1
-    )
-    drums = DrumSet(
-        relays = NumatoRL160001("/dev/marquee_drums")  # /dev/ttyACM0
-    )
+    dimmer_names = [
+        f"dimmer {i} @ {ip}"
+        for i, ip in enumerate(DIMMER_ADDRESSES)
+    ]
+    devices = start_devices({
+        "bells": lambda: BellSet(
+            relays = NumatoSSR80001("/dev/marquee_bells")  # /dev/ttyACM1
+        ),
+        "drums": lambda: DrumSet(
+            relays = NumatoRL160001(
+                "/dev/marquee_drums", streaming=True,  # /dev/ttyACM0
+            )
+        ),
+        "light relays": partial(
+            NumatoRL160001, "/dev/marquee_lights", ALL_RELAYS,  # /dev/ttyACM2
+            coalesce=True, streaming=True,
+        ),
+    } | {
+        name: partial(ShellyProDimmer2PM, i, ip)
+        for name, (i, ip) in zip(dimmer_names, enumerate(DIMMER_ADDRESSES))
+    })
+    bells, drums = devices["bells"], devices["drums"]
     lights = LightSet(
-        relays = NumatoRL160001("/dev/marquee_lights", ALL_RELAYS),  # /dev/ttyACM2
-        dimmers = [
-            ShellyProDimmer2PM(i, ip)
-            for i, ip in enumerate(DIMMER_ADDRESSES)
-        ],
+        relays = devices["light relays"],
+        dimmers = [devices[name] for name in dimmer_names],
         brightness_factor=brightness_factor,
     )
     buttons = ButtonSet(
@@ -78,20 +121,59 @@ class Executor():
         self.commands: dict[str, Callable] = {
             'calibrate_dimmers': self.command_calibrate_dimmers,
             'off': self.command_off,
+            'stats': self.command_stats,
         }
 
     def close(self):
-        """Close dependencies."""
-        self.player.close()
-        # !!! close devices
+        """Close dependencies, waiting for every queued
+           device command to be sent."""
+        self.print_stats()
+        if (player := getattr(self, 'player', None)) is not None:
+            player.close()
+        ShellyDimmer.close_all()
+        for device in ('bells', 'drums', 'lights'):
+            if (instance := getattr(self, device, None)) is not None:
+                try:
+                    instance.close()
+                except Exception as e:
+                    print(f"Closing {device}: {e!r}")
 
     def command_calibrate_dimmers(self):
         """Calibrate dimmers."""
         ShellyDimmer.calibrate_all()
 
+    def command_stats(self):
+        """Measure and report round-trip latency of every device."""
+        LatencyHistogram.reset_all()
+        for _ in range(STATS_PROBE_COUNT):
+            self.lights.execute_dimmer_commands([
+                (channel, channel.brightness, TRANSITION_DEFAULT)
+                for channel in self.lights.dimmer_channels
+            ]).result()
+            for relays in (
+                self.lights.relays, self.bells.relays, self.drums.relays,
+            ):
+                relays.get_state_of_devices()
+        self.print_stats()
+
+    @staticmethod
+    def print_stats():
+        """Print, then discard, round-trip latency of every device used
+           and frame timing of every mode played."""
+        if lines := LatencyHistogram.report_all():
+            print("Round-trip latency:")
+            for line in lines:
+                print(f"  {line}")
+        LatencyHistogram.reset_all()
+        if lines := JitterRecorder.report_all():
+            print("Frame timing:")
+            for line in lines:
+                print(f"  {line}")
+        JitterRecorder.reset_all()
+
     def command_off(self):
         """Turn off all relays and potentially other devices."""
-        self.lights.set_relays(ALL_OFF, '0' * EXTRA_COUNT)
+        self.lights.set_relays(ALL_OFF, '0' * EXTRA_COUNT).result()
         print("Marquee hardware is now partially shut down.")
         print()
 
@@ -135,6 +217,7 @@ class Executor():
             mode_index: int | None = None, 
             brightness_factor: float = 1.0,
             speed_factor: float = 1.0,
+            song_range: SongRange | None = None,
             light_pattern: str | None = None, 
             brightness_pattern: str | None = None,
         ):
@@ -145,7 +228,7 @@ class Executor():
         if command is not None:
             self.execute_command(command)
         elif mode_index is not None:
-            self.execute_mode(mode_index, speed_factor)
+            self.execute_mode(mode_index, speed_factor, song_range)
         else:
             self.execute_pattern(light_pattern, brightness_pattern)
 
@@ -153,7 +236,12 @@ class Executor():
         """Effects the command-line specified command."""
         self.commands[command]()
 
-    def execute_mode(self, mode_index: int, speed_factor: float):
+    def execute_mode(
+            self,
+            mode_index: int,
+            speed_factor: float,
+            song_range: SongRange | None = None,
+        ):
         """Effects the command-line specified mode."""
         self.player = self.create_player(
             self.modes, 
@@ -163,6 +251,7 @@ class Executor():
             self.drums,
             self.lights,
             speed_factor,
+            song_range or SongRange(),
         )
         self.player.execute(mode_index)
 
@@ -173,7 +262,7 @@ class Executor():
     ):
         """Effects the command-line specified pattern(s)."""
         if brightness_pattern is not None:
-            self.lights.set_dimmers(brightness_pattern)
+            self.lights.set_dimmers(brightness_pattern).result()
             Button.wait(TRANSITION_DEFAULT)
         if light_pattern is not None:
-            self.lights.set_relays(light_pattern)
+            self.lights.set_relays(light_pattern).result()
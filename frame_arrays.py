@@ -0,0 +1,164 @@
+"""Marquee Lighted Sign Project - frame_arrays"""
+
+"""
+Vectorized counterparts of the sequences in sequences,
+each returning a whole sequence at once, as a
+(frames x LIGHT_COUNT) uint8 array: 0 / 1 for on / off sequences,
+0 - 100 for brightness sequences.
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from functools import wraps
+
+import numpy as np
+
+from configuration import (
+    LIGHT_COUNT, LIGHTS_BY_COL, LIGHTS_BY_ROW, LIGHTS_BY_SIDE,
+    LIGHTS_BOTTOM, LIGHTS_LEFT, LIGHTS_RIGHT, LIGHTS_TOP,
+)
+from patterns import Pattern
+from sequences import streamed
+
+_BIT_WEIGHTS = 1 << np.arange(LIGHT_COUNT - 1, -1, -1)  # Light 0 is the MSB
+
+def _row(pattern: str | Iterable[int]) -> np.ndarray:
+    """Return pattern (a '0' / '1' string, or values per light)
+       as a single frame."""
+    if isinstance(pattern, str):
+        pattern = [int(p) for p in pattern]
+    row = np.asarray(pattern, dtype=np.uint8)
+    assert row.shape == (LIGHT_COUNT,)
+    return row
+
+def _groups(groups: Iterable[Iterable[int]]) -> np.ndarray:
+    """Return a frame per group, with the lights of that group on."""
+    groups = list(groups)
+    frames = np.zeros((len(groups), LIGHT_COUNT), dtype=np.uint8)
+    for i, lights in enumerate(groups):
+        frames[i, list(lights)] = 1
+    return frames
+
+def _with_pattern(frames: np.ndarray, pattern: str) -> np.ndarray:
+    """Return frames, or their opposite if pattern is '0'."""
+    return frames if pattern == "1" else 1 - frames
+
+def rotate(
+        pattern: str | Iterable[int] = "1" + "0" * (LIGHT_COUNT - 1),
+        clockwise: bool = True,
+    ) -> np.ndarray:
+    """Rotate a pattern of lights counter/clockwise.
+       Pattern may also be a brightness per light."""
+    if clockwise:
+        shifts = np.arange(LIGHT_COUNT, 0, -1)
+    else:  # counterclockwise
+        shifts = np.arange(0, LIGHT_COUNT)
+    columns = (shifts[:, None] + np.arange(LIGHT_COUNT)) % LIGHT_COUNT
+    return _row(pattern)[columns]
+
+def build(pattern="1", rows=True, from_top_left=True) -> np.ndarray:
+    """Successive rows or cols on / off."""
+    groups = LIGHTS_BY_ROW if rows else LIGHTS_BY_COL
+    if not from_top_left:
+        groups = groups[::-1]
+    built = np.cumsum(_groups(groups), axis=0, dtype=np.uint8) > 0
+    return _with_pattern(built.astype(np.uint8), pattern)
+
+def each_row(pattern="1") -> np.ndarray:
+    """Each row, starting at the top."""
+    return _with_pattern(_groups(LIGHTS_BY_ROW), pattern)
+
+def rotate_sides(pattern="1", clockwise=True) -> np.ndarray:
+    """Each side in turn, counter/clockwise."""
+    sides = LIGHTS_BY_SIDE if clockwise else LIGHTS_BY_SIDE[::-1]
+    return _with_pattern(_groups(sides), pattern)
+
+def opposite_corner_pairs() -> np.ndarray:
+    """Alternate the lights in 2 diagonally-opposite corners
+       with the other 2 diagonally-opposite corners."""
+    corners = _groups([
+        (LIGHTS_TOP[0], LIGHTS_LEFT[-1], LIGHTS_BOTTOM[0], LIGHTS_RIGHT[-1]),
+        (LIGHTS_TOP[-1], LIGHTS_RIGHT[0], LIGHTS_BOTTOM[-1], LIGHTS_LEFT[0]),
+    ])
+    frames = np.ones((4, LIGHT_COUNT), dtype=np.uint8)
+    frames[0::2] = 1 - corners
+    return frames
+
+def _random_lights(count: int, rng: np.random.Generator | None) -> np.ndarray:
+    """Return count random light indices that never immediately repeat."""
+    rng = np.random.default_rng() if rng is None else rng
+    steps = rng.integers(1, LIGHT_COUNT, size=count)
+    if count:
+        steps[0] = rng.integers(LIGHT_COUNT)
+    return np.cumsum(steps) % LIGHT_COUNT
+
+@streamed
+def random_flip(
+        light_pattern: str | Iterable[int],
+        count: int,
+        rng: np.random.Generator | None = None,
+    ) -> np.ndarray:
+    """count frames of random light on / off, never immediately
+       repeating a light, starting from light_pattern."""
+    flips = np.zeros((count, LIGHT_COUNT), dtype=np.uint8)
+    flips[np.arange(count), _random_lights(count, rng)] = 1
+    flipped = (np.cumsum(flips, axis=0) % 2).astype(np.uint8)
+    return _row(light_pattern) ^ flipped
+
+@streamed
+def random_flip_start_blank(
+        count: int,
+        pattern: str = "1",
+        rng: np.random.Generator | None = None,
+    ) -> np.ndarray:
+    """count frames each with a random light, never immediately
+       repeating, set to pattern and all others to its opposite."""
+    frames = np.zeros((count, LIGHT_COUNT), dtype=np.uint8)
+    frames[np.arange(count), _random_lights(count, rng)] = 1
+    return _with_pattern(frames, pattern)
+
+def brightnesses(frames: np.ndarray, on: int = 100, off: int = 0) -> np.ndarray:
+    """Return on / off frames as brightness frames."""
+    return np.where(frames.astype(bool), on, off).astype(np.uint8)
+
+def fade(
+        start: int | Iterable[int],
+        end: int | Iterable[int],
+        steps: int,
+    ) -> np.ndarray:
+    """steps brightness frames from start to end (inclusive),
+       each given for all lights or per light."""
+    start_row = np.broadcast_to(np.asarray(start, dtype=float), LIGHT_COUNT)
+    end_row = np.broadcast_to(np.asarray(end, dtype=float), LIGHT_COUNT)
+    return np.rint(np.linspace(start_row, end_row, steps)).astype(np.uint8)
+
+def patterns(frames: np.ndarray) -> list[Pattern]:
+    """Return on / off frames as Patterns, e.g. for LightSet.set_relays."""
+    bits = frames.astype(bool) @ _BIT_WEIGHTS
+    return [Pattern(b, LIGHT_COUNT) for b in bits.tolist()]
+
+def pattern(frame: np.ndarray) -> Pattern:
+    """Return a single on / off frame as a Pattern."""
+    return Pattern(int(frame.astype(bool, copy=False) @ _BIT_WEIGHTS), LIGHT_COUNT)
+
+def unpack(pattern: Pattern, out: np.ndarray) -> np.ndarray:
+    """Write pattern into the on / off frame out, and return out."""
+    return np.not_equal(pattern.bits & _BIT_WEIGHTS, 0, out=out)
+
+def brightness_lists(frames: np.ndarray) -> list[list[int]]:
+    """Return brightness frames as lists,
+       e.g. for LightSet.set_dimmers(brightnesses=...)."""
+    return frames.tolist()
+
+def as_sequence(
+        frames_func: Callable[..., np.ndarray], brightness: bool = False,
+    ) -> Callable[..., Iterator]:
+    """Return a sequence function, as in sequences, yielding
+       the frames of frames_func(**kwargs) as Patterns,
+       or as lists if they are brightnesses.  It can be played
+       like any other, e.g. by PlaySequenceMode or music.sequence."""
+    convert = brightness_lists if brightness else patterns
+
+    @wraps(frames_func)
+    def sequence(**kwargs) -> Iterator:
+        yield from convert(frames_func(**kwargs))
+    return sequence
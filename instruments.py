@@ -1,12 +1,14 @@
 """Marquee Lighted Sign Project - instruments"""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 import random
+import threading
 import time
 
 from configuration import LIGHT_COUNT
+from patterns import Pattern, PatternLike
 from relays import RelayModuleInterface
-from sequences import opposite
 
 class Instrument(ABC):
     """"""
@@ -34,16 +36,21 @@ class RelayInstrument(Instrument):
         super().__init__()
         self.relays = relays
         self.count = self.relays.relay_count
-        self.relays.set_state_of_devices("0" * self.count)
+        self.relays.set_state_of_devices(Pattern(0, self.count))
         # time.sleep(2)
         self.pattern = self.relays.get_state_of_devices()
         assert self.pattern == "0" * self.count
 
-    def select_relays(self, desired_state: str, desired_count: int) -> set[int]:
+    def close(self):
+        """Finish any queued relay writes, then close the relays."""
+        self.relays.close()
+
+    def select_relays(
+            self, desired_state: str, desired_count: int, exclude: set[int] = set(),
+        ) -> set[int]:
         candidates = [
-            i
-            for i, p in enumerate(self.pattern)
-            if p == desired_state
+            i for i in Pattern(self.pattern).indices(desired_state)
+            if i not in exclude
         ]
         try:
             selected = set(random.sample(candidates, desired_count))
@@ -58,19 +65,61 @@ class RelayInstrument(Instrument):
 class BellSet(RelayInstrument):
     """"""
     pitch_levels = 8
+    strike_duration = 0.1  # seconds each solenoid is energized
 
     def __init__(self, relays: RelayModuleInterface):
         super().__init__(relays)
+        self._releases: dict[int, float] = {}  # Pitch: release time
+        self._strikes = threading.Condition()
+        self._closing = False
+        self._releaser = threading.Thread(
+            target=self._release_strikes, name="bell releaser", daemon=True,
+        )
+        self._releaser.start()
+
+    def close(self):
+        """Release every solenoid still energized, stop the releaser,
+           then close the relays once the release is written."""
+        with self._strikes:
+            self._closing = True
+            self._releases.clear()
+            self._set_energized()
+            self._strikes.notify()
+        self._releaser.join()
+        super().close()
 
     def play(self, pitches: set[int]):
-        """"""
-        pattern = [
-            '1' if i in pitches else '0'
-            for i in range(self.pitch_levels)
-        ]
-        self.relays.set_state_of_devices(pattern)
-        time.sleep(0.1)
-        self.relays.set_state_of_devices(['0'] * self.pitch_levels)
+        """Energize the solenoids for pitches, along with any still
+           energized, and return.  Each is released strike_duration
+           after it was last struck."""
+        release = time.monotonic() + self.strike_duration
+        with self._strikes:
+            for pitch in pitches:
+                self._releases[pitch] = release
+            self._set_energized()
+            self._strikes.notify()
+
+    def _set_energized(self):
+        """Set the relays of the pitches not yet released.
+           Caller must hold _strikes."""
+        self.pattern = Pattern.of(self._releases, self.pitch_levels)
+        self.relays.set_state_of_devices(self.pattern)
+
+    def _release_strikes(self):
+        """Release each pitch when due."""
+        with self._strikes:
+            while not self._closing:
+                if not self._releases:
+                    self._strikes.wait()
+                    continue
+                now = time.monotonic()
+                due = [p for p, t in self._releases.items() if t <= now]
+                if due:
+                    for pitch in due:
+                        del self._releases[pitch]
+                    self._set_energized()
+                else:
+                    self._strikes.wait(min(self._releases.values()) - now)
 
 class DrumSet(RelayInstrument):
     """"""
@@ -88,21 +137,26 @@ class DrumSet(RelayInstrument):
 
     def play(self, accent: int, pitches: set[int]):
         """"""
-        new_pattern = self.pattern
-        desired_count = self.accent_to_relay_count[accent]
-        for pitch in pitches:
-            desired_state = self.pitch_to_relay_state[pitch]
-            selected = self.select_relays(desired_state, desired_count)
-            new_pattern = ''.join(
-                opposite(p) if i in selected else p
-                for i, p in enumerate(new_pattern)
-            )
+        self.play_hits(((accent, pitches),))
+
+    def play_hits(self, hits: Iterable[tuple[int, set[int]]]):
+        """Sound several (accent, pitches) drum notes at once,
+           with a single relay write."""
+        selected: set[int] = set()
+        for accent, pitches in hits:
+            desired_count = self.accent_to_relay_count[accent]
+            for pitch in pitches:
+                desired_state = self.pitch_to_relay_state[pitch]
+                selected |= self.select_relays(
+                    desired_state, desired_count, exclude=selected,
+                )
+        new_pattern = Pattern(self.pattern).flip(*selected)
         self.relays.set_state_of_devices(new_pattern)
         self.pattern = new_pattern
 
-    def mirror(self, pattern: str):
-        self.relays.set_state_of_devices(pattern)
-        self.pattern = pattern
+    def mirror(self, pattern: PatternLike):
+        self.pattern = Pattern(pattern)
+        self.relays.set_state_of_devices(self.pattern)
 
 class RestInstrument(Instrument):
     """"""
@@ -0,0 +1,163 @@
+"""Marquee Lighted Sign Project - jitter"""
+
+from array import array
+from concurrent.futures import Future
+from functools import partial
+import threading
+import time
+from typing import ClassVar
+
+from schedulers import NS_PER_SECOND
+
+FRAME_BUFFER_SIZE = 4096  # Most recent frames kept per mode
+
+class JitterRecorder:
+    """Timing of the most recent frames played by one mode,
+       in a preallocated ring buffer.  For each frame: the
+       intended time, the actual dispatch time, the time the
+       frame's device I/O completed (when the last future tracked
+       for it completed), and, secondly, the time the main loop's
+       iteration for the frame ended (it began waiting for the next
+       frame) and by how much that was late for the next frame's
+       intended time.  A frame overruns if its device I/O completes
+       after the next frame's intended time.
+       Recording timing never allocates; tracking a future
+       adds a callback to it."""
+
+    _recorders: ClassVar[dict[str, "JitterRecorder"]] = {}
+    _recorders_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, name: str, size: int = FRAME_BUFFER_SIZE):
+        """Create an empty recorder."""
+        self.name = name
+        self.size = size
+        self.intended = array('q', bytes(8 * size))
+        self.dispatched = array('q', bytes(8 * size))
+        self.completed = array('q', bytes(8 * size))
+        self.iteration_end = array('q', bytes(8 * size))
+        self.lateness = array('q', bytes(8 * size))
+        self.reset()
+
+    def __str__(self):
+        frames = self.frames()
+        if not frames:
+            return f"{self.name}: no frames"
+        lateness = sorted(self.dispatched[i] - self.intended[i] for i in frames)
+        done = [i for i in frames if self.completed[i]]
+        device = sorted(self.completed[i] - self.dispatched[i] for i in done)
+        latest = (self.count - 1) % self.size
+        overruns = []  # Past the next frame's intended time
+        for i in done:
+            if i != latest:
+                overrun = self.completed[i] - self.intended[(i + 1) % self.size]
+                if overrun > 0:
+                    overruns.append(overrun)
+        ended = [i for i in frames if self.iteration_end[i]]
+        loop = sorted(
+            self.iteration_end[i] - self.dispatched[i] for i in ended
+        )
+        late = [self.lateness[i] for i in ended if self.lateness[i] > 0]
+        text = (
+            f"{self.name}: n={len(frames)} "
+            f"jitter p50={_ms(_percentile(lateness, 50))} "
+            f"p95={_ms(_percentile(lateness, 95))} "
+            f"max={_ms(lateness[-1])} ms"
+        )
+        if device:
+            text += (
+                f", device p95={_ms(_percentile(device, 95))} ms, "
+                f"{len(overruns)} overruns"
+            )
+        if overruns:
+            text += f" (max {_ms(max(overruns))} ms)"
+        if loop:
+            text += (
+                f", loop p95={_ms(_percentile(loop, 95))} ms, "
+                f"{len(late)} late iterations"
+            )
+        if late:
+            text += f" (max {_ms(max(late))} ms)"
+        return text
+
+    @classmethod
+    def named(cls, name: str) -> "JitterRecorder":
+        """Return the recorder for name, creating it on first use."""
+        recorder = cls._recorders.get(name)
+        if recorder is None:
+            with cls._recorders_lock:
+                recorder = cls._recorders.setdefault(name, cls(name))
+        return recorder
+
+    @classmethod
+    def report_all(cls) -> list[str]:
+        """Return a report line for every recorder with any frames."""
+        return [
+            str(recorder)
+            for _, recorder in sorted(cls._recorders.items())
+            if recorder.count
+        ]
+
+    @classmethod
+    def reset_all(cls):
+        """Discard all recorded frames."""
+        for recorder in cls._recorders.values():
+            recorder.reset()
+
+    def reset(self):
+        """Discard all recorded frames."""
+        self.count = 0
+        self._open = False
+
+    def dispatch(self, intended_ns: int, dispatched_ns: int):
+        """Record the start of a frame."""
+        i = self.count % self.size
+        self.intended[i] = intended_ns
+        self.dispatched[i] = dispatched_ns
+        self.completed[i] = 0
+        self.iteration_end[i] = 0
+        self.lateness[i] = 0
+        self.count += 1
+        self._open = True
+
+    def track(self, future: Future):
+        """Record when future, of device I/O for the current frame,
+           completes, if it is the last of the frame's to do so."""
+        if self._open:
+            future.add_done_callback(partial(self._complete, self.count - 1))
+
+    def _complete(self, frame: int, future: Future):
+        """Record that device I/O for frame (counted from 0) completed,
+           unless the frame has since been discarded or overwritten."""
+        completed_ns = time.monotonic_ns()
+        if not self.count - self.size <= frame < self.count:
+            return
+        i = frame % self.size
+        if completed_ns > self.completed[i]:
+            self.completed[i] = completed_ns
+
+    def end_iteration(self, ended_ns: int, next_intended_ns: int | None = None):
+        """Record the end of the main loop's iteration for the current
+           frame, and whether it ran past the next frame's intended time."""
+        if not self._open:
+            return
+        i = (self.count - 1) % self.size
+        self.iteration_end[i] = ended_ns
+        if next_intended_ns is not None:
+            self.lateness[i] = ended_ns - next_intended_ns
+        self._open = False
+
+    def abandon(self):
+        """Leave the current frame without an iteration end time."""
+        self._open = False
+
+    def frames(self) -> range:
+        """Return the buffer indices of the recorded frames."""
+        return range(min(self.count, self.size))
+
+def _percentile(ordered: list[int], p: float) -> int:
+    """Return the pth percentile of ordered values."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def _ms(ns: int) -> str:
+    """Return ns formatted as milliseconds."""
+    return f"{ns * 1000 / NS_PER_SECOND:.1f}"
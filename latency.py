@@ -0,0 +1,113 @@
+"""Marquee Lighted Sign Project - latency"""
+
+import bisect
+from collections.abc import Iterator
+from contextlib import contextmanager
+import math
+import threading
+import time
+from typing import ClassVar
+
+BUCKET_MINIMUM = 0.0001  # seconds
+BUCKET_MAXIMUM = 10.0    # seconds
+BUCKET_RATIO = 1.1
+# Upper bound of each bucket; one more bucket holds anything larger.
+BUCKET_BOUNDS: tuple[float, ...] = tuple(
+    BUCKET_MINIMUM * BUCKET_RATIO ** i
+    for i in range(
+        math.ceil(math.log(BUCKET_MAXIMUM / BUCKET_MINIMUM, BUCKET_RATIO)) + 1
+    )
+)
+
+class LatencyHistogram:
+    """Fixed-size histogram of round-trip latencies for one device,
+       with logarithmic buckets (about 10% resolution).
+       Recording never allocates."""
+
+    _histograms: ClassVar[dict[str, "LatencyHistogram"]] = {}
+    _histograms_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, name: str):
+        """Create an empty histogram."""
+        self.name = name
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.reset()
+
+    def __str__(self):
+        if not self.count:
+            return f"{self.name}: no samples, {self.timeouts} timeouts"
+        return (
+            f"{self.name}: n={self.count} "
+            f"p50={self.percentile(50) * 1000:.1f} "
+            f"p95={self.percentile(95) * 1000:.1f} "
+            f"p99={self.percentile(99) * 1000:.1f} "
+            f"max={self.max * 1000:.1f} ms, "
+            f"{self.timeouts} timeouts"
+        )
+
+    @classmethod
+    def named(cls, name: str) -> "LatencyHistogram":
+        """Return the histogram for name, creating it on first use."""
+        histogram = cls._histograms.get(name)
+        if histogram is None:
+            with cls._histograms_lock:
+                histogram = cls._histograms.setdefault(name, cls(name))
+        return histogram
+
+    @classmethod
+    def report_all(cls) -> list[str]:
+        """Return a report line for every histogram with any data."""
+        return [
+            str(histogram)
+            for _, histogram in sorted(cls._histograms.items())
+            if histogram.count or histogram.timeouts
+        ]
+
+    @classmethod
+    def reset_all(cls):
+        """Discard all recorded data."""
+        for histogram in cls._histograms.values():
+            histogram.reset()
+
+    def reset(self):
+        """Discard all recorded data."""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.timeouts = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Record one round trip."""
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def record_timeout(self):
+        """Record one round trip that did not complete."""
+        self.timeouts += 1
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the time taken by the enclosed block,
+           or a timeout if it raises TimeoutError."""
+        start = time.monotonic()
+        try:
+            yield
+        except TimeoutError:
+            self.record_timeout()
+            raise
+        self.record(time.monotonic() - start)
+
+    def percentile(self, p: float) -> float:
+        """Return the upper bound of the bucket holding
+           the pth percentile sample, in seconds."""
+        assert self.count
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
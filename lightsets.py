@@ -1,6 +1,6 @@
 """Marquee Lighted Sign Project - lightsets"""
 
-import asyncio
+from concurrent.futures import Future
 from dataclasses import dataclass
 
 from configuration import EXTRA_COUNT, LIGHT_COUNT
@@ -9,6 +9,8 @@ from dimmers import (
     ShellyDimmer, DimmerChannel,
     TRANSITION_DEFAULT, TRANSITION_MINIMUM,
 )
+from jitter import JitterRecorder
+from patterns import Pattern, PatternLike
 from relays import NumatoUSBRelayModule
 
 @dataclass
@@ -29,6 +31,14 @@ class LightSet:
         full_pattern = self.relays.get_state_of_devices()
         self.relay_pattern = full_pattern[:LIGHT_COUNT]
         self.extra_pattern = full_pattern[LIGHT_COUNT:]
+        # Records when each frame's writes complete; set by Player
+        self.jitter: JitterRecorder | None = None
+
+    def _track(self, future: Future | None) -> Future | None:
+        """Have jitter record when future completes, and return it."""
+        if future is not None and self.jitter is not None:
+            self.jitter.track(future)
+        return future
 
     def _updates_needed(
         self, 
@@ -48,10 +58,12 @@ class LightSet:
 
     def _set_relays_override(
             self,
-            light_pattern: list | str, 
+            light_pattern: PatternLike, 
             special: DimmerParams,
-    ):
-        """Set dimmers per the specified pattern and special."""
+    ) -> Future | None:
+        """Set dimmers per the specified pattern and special.
+           Return a future that completes once they are set,
+           if they are set concurrently."""
         bright_values: dict[int, int] = {
             0: int(special.brightness_off * self.brightness_factor), 
             1: int(special.brightness_on * self.brightness_factor),
@@ -74,40 +86,43 @@ class LightSet:
             for p in light_pattern
         ]
         if special.concurrent:
-            self.set_dimmers(
+            return self.set_dimmers(
                 brightnesses=brightnesses, 
                 transitions=transitions,
+                transport=special.transport,
             )
         else:
             updates = self._updates_needed(brightnesses, transitions)
             for c, b, t in updates:
-                c.set(brightness=b, transition=t)
+                c.set(brightness=b, transition=t, transport=special.transport)
             
     def set_relays(
             self, 
-            light_pattern: str,
-            extra_pattern: str | None = None,
+            light_pattern: PatternLike,
+            extra_pattern: PatternLike | None = None,
             special: SpecialParams | None = None,
-        ):
+        ) -> Future | None:
         """Set all lights and extra relays per supplied patterns and special.
-           Set light_pattern property, always as string
-           rather than list."""
+           Set light_pattern property, always as Pattern.
+           Return a future that completes once the devices are set,
+           if there is one."""
+        light_pattern = Pattern(light_pattern)
         assert len(light_pattern) == LIGHT_COUNT
         assert extra_pattern is None or len(extra_pattern) == EXTRA_COUNT
-        light_pattern = ''.join(str(e) for e in light_pattern)
         if isinstance(special, DimmerParams):
-            self._set_relays_override(light_pattern, special)
+            return self._set_relays_override(light_pattern, special)
         else:
             if extra_pattern is None:
                 extra_pattern = self.extra_pattern
             else:
-                extra_pattern = ''.join(str(e) for e in extra_pattern)
+                extra_pattern = Pattern(extra_pattern)
             full_pattern = light_pattern + extra_pattern
-            self.relays.set_state_of_devices(full_pattern)
+            future = self.relays.set_state_of_devices(full_pattern)
             if isinstance(special, MirrorParams):
                 special.func(full_pattern)
             self.extra_pattern = extra_pattern
             self.relay_pattern = light_pattern
+            return self._track(future)
 
     def set_dimmers(
             self, 
@@ -115,9 +130,11 @@ class LightSet:
             brightnesses: list[int] | None = None,
             transitions: list[float] | float = TRANSITION_DEFAULT,
             force_update: bool = False,
-        ):
+            transport: str | None = None,
+        ) -> Future:
         """ Set the dimmers per the supplied pattern or brightnesses,
-            and transition times. """
+            and transition times.  Return a future that completes
+            once the commands are sent. """
         assert pattern is None or len(pattern) == LIGHT_COUNT
         assert not (pattern and brightnesses), "Specify either pattern or brightnesses."
         if pattern is not None:
@@ -138,7 +155,7 @@ class LightSet:
             updates = [t for t in zip(self.dimmer_channels, brightnesses, transitions)]
         else:
             updates = self._updates_needed(brightnesses, transitions)
-        self.execute_dimmer_commands(updates)
+        return self.execute_dimmer_commands(updates, transport)
 
     def set_dimmer_subset(
             self,
@@ -159,21 +176,28 @@ class LightSet:
     def execute_dimmer_commands(
             self,
             updates: list[tuple[DimmerChannel, int, float]],
-    ):
-        """"""
+            transport: str | None = None,
+    ) -> Future:
+        """Queue commands for the updates, keeping only the latest
+           unsent command per channel.  Return a future that
+           completes once they are sent."""
         commands = [
             c.make_set_command(
                 brightness=b,
                 transition=t,
+                transport=transport,
             )
             for c, b, t in updates
         ]
-        asyncio.run(ShellyDimmer.execute_multiple_commands(commands))
-        for command in commands:
-            command.channel.brightness = command.params['brightness']
+        return self._track(ShellyDimmer.submit_latest(commands))
+
+    def close(self):
+        """Finish any queued relay writes, then close the relays.
+           The dimmers are closed by ShellyDimmer.close_all."""
+        self.relays.close()
 
     @property
-    def relay_pattern(self) -> str:
+    def relay_pattern(self) -> Pattern:
         """Return the active light pattern."""
         return self._relay_pattern
     
@@ -57,6 +57,7 @@ def main():
                 exec.execute(**args)
             except Shutdown:
                 print("Shutting down.")
+                exec.print_stats()
                 os.system("sudo shutdown --halt")
     finally:
         try:
@@ -3,6 +3,7 @@
 from abc import ABC
 from collections.abc import Callable
 import time
+from typing import TYPE_CHECKING
 
 from basemode import BaseMode
 from buttons import Button
@@ -12,9 +13,13 @@ from definitions import (
     DimmerParams, MirrorParams, SpecialParams,
 )
 from dimmers import TRANSITION_DEFAULT
-from music import set_player
+from music import Timeline, play_timeline, set_player
 from player_interface import PlayerInterface
-from sequences import rotate_build_flip
+from schedulers import DeadlineScheduler
+from sequences import cycle_of, frame_buffer, rotate_build_flip
+
+if TYPE_CHECKING:
+    from compositor import Layer  # Needs numpy, so imported when used
 
 @dataclass
 class Mode(BaseMode, ABC):
@@ -147,6 +152,13 @@ class PlaySequenceMode(PlayMode):
         self.stop = stop
         self.post_delay = post_delay
         self.kwargs = kwargs
+        self.frames = frame_buffer(sequence, kwargs)
+        # Passes may run together only if nothing happens between them
+        seamless = (
+            stop is None and post_delay == 0.0
+            and not isinstance(pace, tuple)
+        )
+        self.cycle = cycle_of(sequence, kwargs) if seamless else None
         if isinstance(special, DimmerParams):
             default_trans = (
                 pace if isinstance(pace, float) else
@@ -162,10 +174,13 @@ class PlaySequenceMode(PlayMode):
         )
 
     def play_sequence_once(self):
-        """Play established sequence once."""
-        self.player.replace_kwarg_values(self.kwargs)
+        """Play established sequence once,
+           from its frame buffer if it has one."""
         self.player.play_sequence(
-            sequence=self.sequence(**self.kwargs),
+            sequence=(
+                self.sequence(**self.kwargs) if self.frames is None else
+                self.frames
+            ),
             pace=self.pace,
             stop=self.stop,
             post_delay=self.post_delay,
@@ -173,10 +188,57 @@ class PlaySequenceMode(PlayMode):
         )
 
     def execute(self):
-        """Play the mode."""
+        """Play the mode: its cycle endlessly on a single schedule,
+           if it has one, otherwise one pass at a time."""
+        if self.cycle is not None:
+            self.player.play_sequence(
+                sequence=self.cycle.frames_from(),
+                pace=self.pace,
+                special=self.special,
+            )
         while True:
             self.play_sequence_once()
 
+class PlayLayersMode(PlayMode):
+    """Plays layers of sequences at once, each at its own pace,
+       blended by a Compositor."""
+    def __init__(
+        self,
+        player: PlayerInterface,
+        name: str,
+        layers: tuple["Layer", ...],
+        special: SpecialParams | None = None,
+    ):
+        """Initialize."""
+        from compositor import Compositor
+        super().__init__(player, name, special)
+        self.compositor = Compositor(*layers)
+        self.preset_devices(
+            dimmers = not isinstance(special, DimmerParams),
+            relays = isinstance(special, DimmerParams),
+        )
+
+    def execute(self):
+        """Play the mode: set the lights to the blended layers,
+           the relays from their lit lights, or the dimmers
+           from their levels if special is DimmerParams."""
+        lights = self.player.lights
+        schedule = DeadlineScheduler(self.player.speed_factor)
+        for offset in self.compositor.steps():
+            self.player.wait_until(schedule.deadline_ns(offset))
+            if isinstance(self.special, DimmerParams):
+                lights.set_dimmers(
+                    brightnesses=self.compositor.brightnesses(
+                        lights.brightness_factor
+                    ),
+                    transitions=float(self.special.transition_on),
+                    transport=self.special.transport,
+                )
+            else:
+                lights.set_relays(
+                    self.compositor.pattern(), special=self.special,
+                )
+
 @dataclass
 class PlayMusicMode(PlayMode):
     """Mode for playing music."""
@@ -188,3 +250,24 @@ class PlayMusicMode(PlayMode):
         #     relays = isinstance(self.special, DimmerParams),
         # )
         set_player(self.player)
+
+    def play_song(self, timeline: Timeline) -> int:
+        """Play timeline over the player's song range,
+           ending at the song's end if the range goes past it.
+           Return the end deadline."""
+        song_range = self.player.song_range
+        count = len(timeline.measure_starts)
+        if not 1 <= song_range.first <= count:
+            raise ValueError(
+                f"Song has {count} measures; "
+                f"cannot start at measure {song_range.first}."
+            )
+        last = min(song_range.last or count, count)
+        if (song_range.first, last) != (1, count):
+            print(f"Playing measures {song_range.first} - {last}")
+        return play_timeline(
+            timeline,
+            start=timeline.measure_start(song_range.first),
+            end=timeline.measure_start(last + 1),
+            loop=song_range.loop,
+        )
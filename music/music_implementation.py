@@ -1,11 +1,20 @@
 """Marquee Lighted Sign Project - music_implementation"""
 
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator
+import bisect
 from dataclasses import dataclass, field, replace
+from functools import cache, partial
+import hashlib
+import heapq
+import inspect
 import itertools
-import time
+import math
+from operator import attrgetter
+import os
+import pickle
 from typing import Any, ClassVar
+import weakref
 
 from definitions import (
     ActionParams, DimmerParams, SpecialParams,
@@ -14,12 +23,159 @@ from instruments import (
     Instrument, ActionInstrument, BellSet, DrumSet, RestInstrument,
 )
 from player_interface import PlayerInterface
+from schedulers import DeadlineScheduler, NS_PER_SECOND
+from sequences import looped
+
+DEVICES = ('lights', 'dimmers', 'bells', 'drums')
+TIMELINE_CACHE_DIR = os.path.expanduser("~/.cache/marquee/timelines")
+TIMELINE_FORMAT = 4  # Change whenever Timeline's pickled form changes
+
+_timelines: dict[str, "Timeline"] = {}  # Compiled timelines by key
+_streams: "weakref.WeakSet[Stream]" = weakref.WeakSet()  # Rewound per play
 
 def _set_player(the_player: PlayerInterface):
     """Set the Player object used throughout this module."""
     global player
     player = the_player
 
+@dataclass(frozen=True)
+class DeviceAction:
+    """Callable action, tagged with the device it drives.
+       sets_state if it sets the device's entire state,
+       so that the latest such action restores that state."""
+    device: str
+    func: Callable
+    sets_state: bool = False
+
+    def __call__(self, *args):
+        """Perform the action."""
+        return self.func(*args)
+
+@dataclass(frozen=True)
+class TimedEvent:
+    """Device action at a time within a timeline."""
+    time: float  # seconds from the start, before speed_factor
+    device: str
+    action: Callable
+
+class Stream:
+    """Patterns of a streamed (e.g. random) sequence played in a loop,
+       drawn only as they are played, so that what is compiled
+       is the same every time and can be cached.
+       Pickles as just the sequence, kwargs and offset."""
+
+    def __init__(
+            self, sequence: Callable, kwargs: dict[str, Any], offset: int = 0,
+        ):
+        """Initialize."""
+        self.sequence = sequence
+        self.kwargs = kwargs
+        self.offset = offset
+        self._patterns: Iterator | None = None
+        _streams.add(self)
+
+    def __getstate__(self) -> tuple:
+        """Return the state to pickle."""
+        return self.sequence, self.kwargs, self.offset
+
+    def __setstate__(self, state: tuple):
+        """Restore from the pickled state."""
+        self.__init__(*state)
+
+    def rewind(self):
+        """Start again from pattern offset."""
+        self._patterns = None
+
+    def next_pattern(self) -> Any:
+        """Return the next pattern."""
+        if self._patterns is None:
+            self._patterns = looped(self.sequence, self.kwargs, self.offset)
+        return next(self._patterns)
+
+class Timeline:
+    """Flat, time-ordered events of one or more sections.
+       Events are drawn from their source only as they are first
+       needed (e.g. played), then kept, so the timeline is
+       complete once it has been played through.
+       Pickles as its complete events, duration and measure starts."""
+
+    def __init__(
+            self,
+            events: Iterable[TimedEvent],
+            duration: float,
+            measure_starts: tuple[float, ...] = (),
+        ):
+        """Initialize, drawing none of events yet."""
+        self.duration = duration  # seconds, before speed_factor
+        self.measure_starts = measure_starts  # seconds, before speed_factor
+        self.cache_key: str | None = None  # Cached on disk under, once complete
+        self._events: list[TimedEvent] = []
+        self._source: Iterator[TimedEvent] | None = iter(events)
+
+    def __getstate__(self) -> tuple:
+        """Return the state to pickle."""
+        return self.events, self.duration, self.measure_starts
+
+    def __setstate__(self, state: tuple):
+        """Restore from the pickled state."""
+        self.__init__(*state)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every event has been drawn."""
+        return self._source is None
+
+    @property
+    def events(self) -> tuple[TimedEvent, ...]:
+        """Every event, drawing any not yet drawn."""
+        while self._event(len(self._events)) is not None:
+            pass
+        return tuple(self._events)
+
+    def _event(self, i: int) -> TimedEvent | None:
+        """Return event i, drawing events up to it,
+           or None if there are not that many."""
+        while i >= len(self._events):
+            if self._source is None:
+                return None
+            event = next(self._source, None)
+            if event is None:
+                self._source = None
+            else:
+                self._events.append(event)
+        return self._events[i]
+
+    def _index(self, time: float) -> int:
+        """Return the index of the first event at or after time,
+           drawing events up to it."""
+        i = bisect.bisect_left(self._events, time, key=attrgetter('time'))
+        while (event := self._event(i)) is not None and event.time < time:
+            i += 1
+        return i
+
+    def events_before(self, time: float) -> list[TimedEvent]:
+        """Return the events before time seconds."""
+        return self._events[:self._index(time)]
+
+    def events_between(self, start: float, end: float) -> Iterator[TimedEvent]:
+        """Yield the events from start up to end seconds,
+           drawing each only as it is needed."""
+        i = self._index(start)
+        while (event := self._event(i)) is not None and event.time < end:
+            yield event
+            i += 1
+
+    def measure_start(self, measure: int) -> float:
+        """Return the time measure (counted from 1) starts,
+           or the duration for the measure after the last."""
+        if not 1 <= measure <= len(self.measure_starts) + 1:
+            raise ValueError(
+                f"No measure {measure} of {len(self.measure_starts)}."
+            )
+        if measure > len(self.measure_starts):
+            return self.duration
+        return self.measure_starts[measure - 1]
+
 @dataclass(frozen=True)
 class Element(ABC):
     """Base for all musical items."""
@@ -57,6 +213,7 @@ class ActionNote(BaseNote):
 class BellNote(BaseNote):
     """Note to strike 1 or more bells."""
     instrument: ClassVar[type[Instrument]] = BellSet
+    device: ClassVar[str] = 'bells'
     pitches: set[int]
 
     def play(self, player: PlayerInterface):
@@ -67,6 +224,7 @@ class BellNote(BaseNote):
 class DrumNote(BaseNote):
     """Note to sound relays."""
     instrument: ClassVar[type[Instrument]] = DrumSet
+    device: ClassVar[str] = 'drums'
     accent: int
     pitches: set
     
@@ -81,9 +239,9 @@ class NoteGroup(Element):
     duration: float = 0.0
 
     def play(self, player: PlayerInterface):
-        """Play all notes in group."""
-        for note in self.notes:
-            note.play(player)
+        """Play all notes in group, one action per device."""
+        for _, action in _device_actions(self):
+            action()
 
 @dataclass(frozen=True)
 class Measure(Element):
@@ -91,6 +249,10 @@ class Measure(Element):
     elements: tuple[Element, ...]
     beats: int
 
+    def each_element(self) -> Iterator[Element]:
+        """Yield each element of the measure, in order."""
+        return iter(self.elements)
+
 @dataclass(frozen=True)
 class SequenceMeasure(Measure):
     """Defines a measure with a sequence of light events."""
@@ -100,11 +262,51 @@ class SequenceMeasure(Measure):
     count: int
     special: SpecialParams | None
     beats: int
+    offset: int = 0
     patterns: Iterator = field(init=False)
 
     def __post_init__(self):
         """Create iterator."""
-        object.__setattr__(self, 'patterns', itertools.cycle(self.sequence(**self.kwargs)))
+        object.__setattr__(
+            self, 'patterns', looped(self.sequence, self.kwargs, self.offset),
+        )
+
+    def each_element(self) -> Iterator[Element]:
+        """Yield an ActionNote per step, as it is needed,
+           setting the lights to the sequence's next pattern.
+           The patterns of a cycled sequence recur, so the note
+           for each is made once, then yielded each time it recurs.
+           A streamed sequence's patterns are drawn as it is played."""
+        if getattr(self.sequence, 'streamed', False):
+            stream = Stream(self.sequence, self.kwargs, self.offset)
+            note = ActionNote(
+                duration=self.step_duration,
+                actions=(_streamed_light(stream, self.special),),
+            )
+            for _ in range(self.count):
+                yield note
+            return
+        notes: dict[int, tuple[Any, ActionNote]] = {}
+        for _, pattern in zip(range(self.count), self.patterns):
+            try:
+                _, note = notes[id(pattern)]
+            except KeyError:
+                note = ActionNote(
+                    duration=self.step_duration,
+                    actions=(_light(pattern, self.special),),
+                )
+                notes[id(pattern)] = pattern, note
+            yield note
+
+@dataclass(frozen=True)
+class MergedMeasure(Measure):
+    """Concurrent measures of a section's parts,
+       merged element by element as they are played."""
+    concurrent: tuple[Measure, ...] = ()
+
+    def each_element(self) -> Iterator[Element]:
+        """Yield each element of the merged measures, as it is needed."""
+        return Section._merged_elements(self.concurrent)
 
 @dataclass(frozen=True)
 class Sequence(Element):
@@ -113,11 +315,28 @@ class Sequence(Element):
     special: SpecialParams | None
     measures: int
     kwargs: dict[str, Any]
+    offset: int = 0
     iter: Iterator = field(init=False)
+    stream: Stream | None = field(init=False)
 
     def __post_init__(self):
-        """Create iterator."""
-        object.__setattr__(self, 'iter', itertools.cycle(self.sequence(**self.kwargs)))
+        """Create iterator, or stream if the sequence is streamed."""
+        object.__setattr__(
+            self, 'iter', looped(self.sequence, self.kwargs, self.offset),
+        )
+        object.__setattr__(
+            self, 'stream',
+            Stream(self.sequence, self.kwargs, self.offset)
+                if getattr(self.sequence, 'streamed', False) else
+            None,
+        )
+
+    def next_action(self) -> Callable:
+        """Return callable to effect the sequence's next pattern,
+           drawn now, or as it is played if the sequence is streamed."""
+        if self.stream is not None:
+            return _streamed_light(self.stream, self.special)
+        return _light(next(self.iter), self.special)
 
 @dataclass(frozen=True)
 class Part(Element):
@@ -157,9 +376,13 @@ class Section(Element):
             self._apply_beats(self.beats, self.parts)
         object.__setattr__(self, 'measures', self._prepare_parts(self.parts))
 
-    def play(self, tempo: int = 0):
-        """Play already-generated measures comprising Section."""
-        _play_measures(*self.measures, tempo = tempo or self.tempo)
+    def play(self, tempo: int = 0, start_ns: int | None = None) -> int:
+        """Play the measures comprising Section, at tempo if specified,
+           starting at start_ns if specified (e.g. the end of
+           the previous section).  Return the end deadline."""
+        return _play_measures(
+            *self.measures, tempo=tempo or self.tempo, start_ns=start_ns,
+        )
 
     @staticmethod
     def _apply_beats(beats: int, parts: tuple[Part, ...]):
@@ -175,15 +398,14 @@ class Section(Element):
     def _prepare_parts(
             parts: tuple[Part, ...], 
     ) -> tuple[Measure, ...]:
-        """ Expand SequenceMeasures.
-            Make all parts the same length.
-            Merge parts into single sequence of Measures."""
-        for part in parts:
-            _expand_sequence_measures(part.measures)
+        """ Make all parts the same length.
+            Merge parts into single sequence of Measures,
+            each merged, expanding SequenceMeasures step by step,
+            only as it is played."""
         _make_parts_equal_length(parts)
         concurrent_measures = zip(*(part.measures for part in parts))
         return tuple(
-            Section._merge_concurrent_measures(measure_set)
+            MergedMeasure((), measure_set[0].beats, measure_set)
             for measure_set in concurrent_measures
         )
 
@@ -191,21 +413,17 @@ class Section(Element):
     def _merge_concurrent_measures(measures: tuple[Measure, ...]) -> Measure:
         """Convert measure from each part into single measure
         of (non-rest) notes with 0 duration, padded with rests."""
+        return Measure(
+            tuple(Section._merged_elements(measures)),
+            beats=measures[0].beats,
+        )
 
-        def get_concurrent_notes(beat: float) -> list[BaseNote]:
-            """Return all notes occuring on beat."""
-            result = []
-            for i, _ in enumerate(measures):
-                if beat_next[i] == beat:
-                    element = next(elements_in[i], None)
-                    if element is None:
-                        beat_next[i] = None
-                    else:
-                        assert isinstance(element, BaseNote)
-                        beat_next[i] = beat + element.duration
-                        if not isinstance(element, Rest):
-                            result.append(replace(element, duration=0))
-            return result
+    @staticmethod
+    def _merged_elements(measures: tuple[Measure, ...]) -> Iterator[Element]:
+        """Yield the elements of the measure from each part merged:
+        (non-rest) notes with 0 duration, padded with rests.
+        Parts are merged through a heap of (beat of next element, part),
+        so each element costs O(log parts)."""
 
         def concurrent_note_output(concurrent: list[BaseNote]) -> Element | None:
             """Return concurrent notes as single object."""
@@ -219,47 +437,35 @@ class Section(Element):
 
         beats = measures[0].beats
         assert all(m.beats == beats for m in measures)
-        elements_in: list[Iterator] = [iter(m.elements) for m in measures]
-        elements_out: list[Element] = []
-        beat_next: list[float | None] = [0.0 for _ in measures]
+        elements_in: list[Iterator] = [m.each_element() for m in measures]
+        beat_next: list[tuple[float, int]] = [
+            (0.0, i) for i, _ in enumerate(measures)
+        ]  # Already a heap
         beat, rest_accumulated = 0.0, 0.0
-        while any(bn is not None for bn in beat_next):
-            concurrent = get_concurrent_notes(beat)
+        while beat_next:
+            # Parts whose next element is on beat, in part order.
+            due = []
+            while beat_next and beat_next[0][0] == beat:
+                due.append(heapq.heappop(beat_next)[1])
+            concurrent = []
+            for i in due:
+                element = next(elements_in[i], None)
+                if element is not None:
+                    assert isinstance(element, BaseNote)
+                    heapq.heappush(beat_next, (beat + element.duration, i))
+                    if not isinstance(element, Rest):
+                        concurrent.append(replace(element, duration=0))
             out = concurrent_note_output(concurrent)
             if out is not None:
                 if rest_accumulated:
-                    elements_out.append(Rest(rest_accumulated))
+                    yield Rest(rest_accumulated)
                     rest_accumulated = 0.0
-                elements_out.append(out)
-            next_beat = min(
-                (bn for bn in beat_next if bn is not None),
-                default=beats
-            )
+                yield out
+            next_beat = beat_next[0][0] if beat_next else beats
             rest_accumulated += next_beat - beat
             beat = next_beat
         if rest_accumulated:
-            elements_out.append(Rest(rest_accumulated))
-        return Measure(tuple(elements_out), beats=beats)
-
-def _expand_sequence_measures(measures: tuple[Measure, ...]):
-    """Populate SequenceMeasures with ActionNotes."""
-    for measure in measures:
-        if not isinstance(measure, SequenceMeasure):
-            continue
-        assert isinstance(measure, SequenceMeasure)
-        elements = tuple(
-            ActionNote(
-                duration=measure.step_duration,
-                actions=(
-                    _light(
-                        next(measure.patterns),
-                        measure.special,
-                    ),
-                )
-            )
-            for _ in range(measure.count)
-        )
-        object.__setattr__(measure, 'elements', elements)
+            yield Rest(rest_accumulated)
 
 @staticmethod
 def _make_parts_equal_length(parts: tuple[Part, ...]):
@@ -274,47 +480,326 @@ def _make_parts_equal_length(parts: tuple[Part, ...]):
             )
             object.__setattr__(part, 'measures', measures)
 
-def _play_measure(measure: Measure):
-    """Play all notes in measure."""
-    start = time.time()
-    beat = 0
-    for element in measure.elements:
-        assert isinstance(element, (BaseNote, NoteGroup))
-        element.play(player)
-        if element.duration:
-            wait_dur = (element.duration) * player.pace
-            player.wait(wait_dur, time.time() - start)
-            start = time.time()
-        beat += element.duration
-        if beat > measure.beats:
-            raise ValueError("Too many actual beats in measure.")
-    # Play implied rests at end of measure
-    wait_dur = (measure.beats - beat) * player.pace 
-    player.wait(wait_dur, time.time() - start)
-
-def _play_measures(*measures: Measure, tempo: int):
-    """Play a series of measures."""
-    _expand_sequence_measures(measures)
-    player.pace = 60 / tempo
+def _measure_elements(measures: Iterable[Measure]) -> Iterator[tuple[float, Element]]:
+    """Yield each element of measures with its beat,
+       counted from the start of the first measure."""
+    start = 0.0
     for measure in measures:
-        _play_measure(measure)
+        beat = 0.0
+        for element in measure.each_element():
+            assert isinstance(element, (BaseNote, NoteGroup))
+            yield start + beat, element
+            beat += element.duration
+            if beat > measure.beats:
+                raise ValueError("Too many actual beats in measure.")
+        start += measure.beats
+
+def _device_actions(element: Element) -> Iterator[tuple[str, Callable]]:
+    """Yield each device driven by element, with the action
+       that plays element's part on that device.
+       The drum notes in a group are merged into one action,
+       as are the bell notes, so each board gets a single write.
+       Every action only queues its device I/O on that device's
+       own worker, so the devices of a group start together."""
+    match element:
+        case NoteGroup():
+            drums = [n for n in element.notes if isinstance(n, DrumNote)]
+            bells = [n for n in element.notes if isinstance(n, BellNote)]
+            for note in element.notes:
+                if not isinstance(note, (DrumNote, BellNote)):
+                    yield from _device_actions(note)
+            if drums:
+                yield DrumNote.device, partial(
+                    _play_drum_hits,
+                    tuple((n.accent, n.pitches) for n in drums),
+                )
+            if bells:
+                yield BellNote.device, partial(
+                    _play_bells, set().union(*(n.pitches for n in bells)),
+                )
+        case ActionNote():
+            for action in element.actions:
+                yield getattr(action, 'device', 'lights'), action
+        case BellNote() | DrumNote():
+            yield element.device, partial(_play_note, element)
+
+def _compile_measures(
+        measures: tuple[Measure, ...], tempo: int, start: float = 0.0,
+    ) -> Iterator[TimedEvent]:
+    """Yield the events of measures played at tempo,
+       starting start seconds into the timeline."""
+    pace = 60 / tempo
+    for beat, element in _measure_elements(measures):
+        for device, action in _device_actions(element):
+            yield TimedEvent(start + beat * pace, device, action)
+
+def _measure_starts(
+        measures: tuple[Measure, ...], tempo: int, start: float = 0.0,
+    ) -> Iterator[float]:
+    """Yield the time each of measures starts when played at tempo,
+       starting start seconds into the timeline."""
+    pace = 60 / tempo
+    beats = itertools.accumulate((m.beats for m in measures), initial=0)
+    for _, beat in zip(measures, beats):
+        yield start + beat * pace
+
+def _compile_sections(sections: Iterable[Section], tempo: int = 0) -> Timeline:
+    """Return the timeline of sections played one after another,
+       each at tempo if specified, otherwise at its own tempo.
+       Its events are compiled only as they are needed."""
+    compiled: list[Iterator[TimedEvent]] = []
+    measure_starts: list[float] = []
+    start = 0.0
+    for section in sections:
+        section_tempo = tempo or section.tempo
+        compiled.append(
+            _compile_measures(section.measures, section_tempo, start)
+        )
+        measure_starts.extend(
+            _measure_starts(section.measures, section_tempo, start)
+        )
+        start += sum(m.beats for m in section.measures) * 60 / section_tempo
+    return Timeline(
+        itertools.chain.from_iterable(compiled), start, tuple(measure_starts),
+    )
+
+@cache
+def _code_digest() -> bytes:
+    """Return a hash of the code of every module of the project,
+       the music package's and all that songs' actions reference."""
+    digest = hashlib.sha256()
+    package = os.path.dirname(__file__)
+    for directory in (package, os.path.dirname(package)):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.py'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    digest.update(f.read())
+    return digest.digest()
+
+def _timeline_key(source: Any, tempo: int) -> str:
+    """Return the cache key of source compiled at tempo:
+       a hash of source's code and of the project's code."""
+    digest = hashlib.sha256(f"{TIMELINE_FORMAT}:{tempo}".encode())
+    digest.update(inspect.getsource(source).encode())
+    digest.update(_code_digest())
+    return digest.hexdigest()
+
+def _load_timeline(key: str) -> Timeline | None:
+    """Return the timeline cached on disk under key, if any."""
+    try:
+        with open(os.path.join(TIMELINE_CACHE_DIR, key), 'rb') as f:
+            timeline = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Discarding cached timeline {key}: {e!r}")
+        return None
+    return timeline if isinstance(timeline, Timeline) else None
+
+def _save_if_complete(timeline: Timeline):
+    """Cache timeline on disk, once, if all its events are compiled."""
+    if timeline.cache_key is not None and timeline.complete:
+        _save_timeline(timeline.cache_key, timeline)
+        timeline.cache_key = None
+
+def _save_timeline(key: str, timeline: Timeline):
+    """Cache timeline on disk under key, if it can be."""
+    try:
+        data = pickle.dumps(timeline)
+    except Exception as e:
+        print(f"Timeline not cached on disk: {e!r}")
+        return
+    os.makedirs(TIMELINE_CACHE_DIR, exist_ok=True)
+    path = os.path.join(TIMELINE_CACHE_DIR, key)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+def _compiled_sections(
+        build: Callable[[], Iterable[Section]], source: Any, tempo: int = 0,
+    ) -> Timeline:
+    """Return the timeline of the sections returned by build,
+       compiled once per version of the code, and cached in memory,
+       and on disk once all its events are compiled (e.g. played).
+       Streamed (e.g. random) sequences are drawn as it is played."""
+    key = _timeline_key(source, tempo)
+    timeline = _timelines.get(key)
+    if timeline is None:
+        timeline = _load_timeline(key)
+        if timeline is None:
+            timeline = _compile_sections(build(), tempo)
+            timeline.cache_key = key
+        _timelines[key] = timeline
+    else:
+        _save_if_complete(timeline)
+    return timeline
+
+def _play_timeline(
+        timeline: Timeline,
+        start_ns: int | None = None,
+        start: float = 0.0,
+        end: float | None = None,
+        loop: bool = False,
+    ) -> int:
+    """Play timeline from start to end seconds (default all of it),
+       repeating that range if loop, starting at start_ns
+       (default now).  Device state at start is first rebuilt
+       from the timeline, and streamed sequences start afresh.
+       Events are compiled only as they are played, the first time.
+       Return the absolute monotonic end deadline
+       (of the last pass, if loop)."""
+    for stream in list(_streams):
+        stream.rewind()
+    end = timeline.duration if end is None else end
+    end_ns = start_ns
+    while True:
+        if start > 0:
+            _restore_state(timeline.events_before(start))
+        end_ns = _play_events(
+            timeline.events_between(start, end), start, end, end_ns,
+        )
+        _save_if_complete(timeline)
+        if not loop:
+            return end_ns
+
+def _restore_state(events: list[TimedEvent]):
+    """Put each device into the state that events leave it in,
+       by performing the latest of them that sets its entire state."""
+    latest: dict[str, TimedEvent] = {}
+    for event in reversed(events):
+        if getattr(event.action, 'sets_state', False):
+            latest.setdefault(event.device, event)
+            if len(latest) == len(DEVICES):
+                break
+    for event in sorted(latest.values(), key=lambda e: e.time):
+        event.action()
+
+def _in_issue_order(
+        events: Iterable[TimedEvent], lead: dict[str, float],
+    ) -> Iterator[TimedEvent]:
+    """Yield time-ordered events in the order they are issued:
+       each ahead of its time by its device's lead time.
+       Events are drawn only as far ahead as the longest lead."""
+    longest = max(lead.values())
+    order = itertools.count()  # Keeps events of equal issue time in order
+    pending: list[tuple[float, int, TimedEvent]] = []  # Heap by issue time
+    for event in itertools.chain(events, (None,)):
+        if event is None:
+            horizon = math.inf
+        else:
+            issue = event.time - lead[event.device] / player.speed_factor
+            heapq.heappush(pending, (issue, next(order), event))
+            horizon = event.time - longest / player.speed_factor
+        while pending and pending[0][0] <= horizon:
+            yield heapq.heappop(pending)[2]
+
+def _play_events(
+        events: Iterable[TimedEvent],
+        start: float,
+        end: float,
+        start_ns: int | None,
+    ) -> int:
+    """Play time-ordered events, which lie from start to end seconds
+       into their timeline, drawing each only shortly before it is
+       issued.  Each device's actions are issued ahead of their time
+       by that device's lead time, so that all devices physically
+       change on the beat.  Every event is scheduled from start_ns
+       (default now), so timing error does not accumulate.
+       A change to the player's speed_factor takes effect from
+       the next event, with the schedule restarted there.
+       Return the absolute monotonic end deadline."""
+    lead = {device: player.lead_time(device) for device in DEVICES}
+    lead_ns = {
+        device: round(seconds * NS_PER_SECOND)
+        for device, seconds in lead.items()
+    }
+    schedule = DeadlineScheduler(player.speed_factor, start_ns)
+    origin = position = start
+    for event in _in_issue_order(events, lead):
+        if player.speed_factor != schedule.speed_factor:
+            schedule = DeadlineScheduler(
+                player.speed_factor, schedule.deadline_ns(position - origin),
+            )
+            origin = position
+        player.wait_until(
+            schedule.deadline_ns(event.time - origin) - lead_ns[event.device]
+        )
+        event.action()
+        position = max(position, event.time)
+    # Play implied rests at end of last measure
+    end_ns = schedule.deadline_ns(end - origin)
+    player.wait_until(end_ns)
+    return end_ns
+
+def _play_measures(
+        *measures: Measure, tempo: int, start_ns: int | None = None,
+    ) -> int:
+    """Play a series of measures from start_ns (default now),
+       expanding each into events only as it is played.
+       Return the absolute monotonic end deadline."""
+    duration = sum(measure.beats for measure in measures) * 60 / tempo
+    return _play_events(
+        _compile_measures(measures, tempo), 0.0, duration, start_ns,
+    )
+
+def _play_note(note: BaseNote):
+    """Play a single bell or drum note."""
+    note.play(player)
+
+def _play_drum_hits(hits: tuple[tuple[int, set[int]], ...]):
+    """Sound several drum notes at once."""
+    player.drums.play_hits(hits)
+
+def _play_bells(pitches: set[int]):
+    """Strike several bells at once."""
+    player.bells.play(pitches)
+
+def _set_dimmers(pattern: str):
+    """Set dimmers per pattern."""
+    player.lights.set_dimmers(pattern)
+
+def _set_dimmer_subset(brightness: int, transition: float, lights: list[int]):
+    """Set lights (indexes) to brightness."""
+    player.lights.set_dimmer_subset(lights, brightness, transition)
+
+def _flip_dimmer_subset(transition: float, lights: list[int]):
+    """Flip lights (indexes) between off and full brightness."""
+    brightness = 0 if player.lights.dimmer_brightnesses()[lights[0]] else 100
+    player.lights.set_dimmer_subset(lights, brightness, transition)
+
+def _set_lights(pattern: Any, special: SpecialParams | None):
+    """Set lights per pattern and special."""
+    player.lights.set_relays(light_pattern=pattern, special=special)
 
 def _dimmer(pattern: str) -> Callable:
     """Return callable to effect dimmer pattern."""
-    return lambda: player.lights.set_dimmers(pattern)
+    return DeviceAction(
+        'dimmers', partial(_set_dimmers, pattern), sets_state=True,
+    )
 
 def _dimmer_sequence(brightness: int, transition: float) -> Callable:
     """Return callable to effect state of specified dimmers."""
-    def func(lights: list[int]):
-        player.lights.set_dimmer_subset(lights, brightness, transition)
-    return func
+    return DeviceAction(
+        'dimmers', partial(_set_dimmer_subset, brightness, transition),
+    )
 
 def _dimmer_sequence_flip(transition: float) -> Callable:
     """Return callable to flip state of specified dimmers."""
-    def func(lights: list[int]):
-        brightness = 0 if player.lights.dimmer_brightnesses()[lights[0]] else 100
-        player.lights.set_dimmer_subset(lights, brightness, transition)
-    return func
+    return DeviceAction('dimmers', partial(_flip_dimmer_subset, transition))
+
+def _play_stream(stream: Stream, special: SpecialParams | None):
+    """Effect the next pattern of stream."""
+    _light(stream.next_pattern(), special)()
+
+def _streamed_light(
+    stream: Stream,
+    special: SpecialParams | None = None,
+) -> Callable:
+    """Return callable to effect the next pattern of stream,
+       drawn as it is played."""
+    return replace(
+        _light(None, special), func=partial(_play_stream, stream, special),
+    )
 
 def _light(
     pattern: Any,
@@ -327,10 +812,14 @@ def _light(
         if special.transition_on is None:
             special.transition_on = TRANSITION_DEFAULT
     if isinstance(special, ActionParams):
-        result = lambda: special.action(pattern)
+        result = DeviceAction(
+            getattr(special.action, 'device', 'lights'),
+            partial(special.action, pattern),
+        )
     else:
-        result = lambda: player.lights.set_relays(
-            light_pattern=pattern,
-            special=special,
+        result = DeviceAction(
+            'dimmers' if isinstance(special, DimmerParams) else 'lights',
+            partial(_set_lights, pattern, special),
+            sets_state=True,
         )
     return result
@@ -1,15 +1,15 @@
 """Marquee Lighted Sign Project - music_interface"""
 
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field, replace
 from typing import Any
 
 from definitions import SpecialParams
 from music.music_implementation import (
-    Element, Measure, Part, Section, Sequence, 
-    _dimmer, _dimmer_sequence, _dimmer_sequence_flip,
-    _light, _play_measures, _set_player
+    Element, Measure, Part, Section, Sequence, Timeline,
+    _compiled_sections, _dimmer, _dimmer_sequence, _dimmer_sequence_flip,
+    _light, _play_measures, _play_timeline, _set_player
 )
 from player_interface import PlayerInterface
 
@@ -17,9 +17,33 @@ def set_player(the_player: PlayerInterface):
     """Set the Player object used throughout this module."""
     _set_player(the_player)
 
-def play(*measures: Measure, tempo: int):
-    """Play a series of measures."""
-    _play_measures(*measures, tempo=tempo)
+def play(*measures: Measure, tempo: int, start_ns: int | None = None) -> int:
+    """Play a series of measures, starting at start_ns if specified.
+       Return the end deadline."""
+    return _play_measures(*measures, tempo=tempo, start_ns=start_ns)
+
+def compile_sections(
+    build: Callable[[], Iterable[Section]],
+    source: Any,
+    tempo: int = 0,
+) -> Timeline:
+    """Return the timeline of the sections returned by build,
+       each at tempo if specified.  build is only called when
+       source's code (e.g. the song's class) has changed."""
+    return _compiled_sections(build, source, tempo)
+
+def play_timeline(
+    timeline: Timeline,
+    start_ns: int | None = None,
+    start: float = 0.0,
+    end: float | None = None,
+    loop: bool = False,
+) -> int:
+    """Play a compiled timeline from start to end seconds
+       (default all of it), repeatedly if loop,
+       starting at start_ns if specified.
+       Return the end deadline."""
+    return _play_timeline(timeline, start_ns, start, end, loop)
 
 def measure(*elements: Element, beats: int = 4) -> Measure:
     """Produce Measure."""
@@ -45,10 +69,12 @@ def sequence(
     seq: Callable,
     measures: int = 1,
     special: SpecialParams | None = None,
+    offset: int = 0,
     **kwargs,
 ) -> Sequence:
-    """Return callable to effect each step in sequence."""
-    sequence_obj = Sequence(seq, special, measures, kwargs)
+    """Return callable to effect each step in sequence,
+       starting at pattern offset."""
+    sequence_obj = Sequence(seq, special, measures, kwargs, offset)
     return sequence_obj
 
 def dimmer(pattern: str) -> Callable:
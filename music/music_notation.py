@@ -1,12 +1,14 @@
 """Marquee Lighted Sign Project - music_notation"""
 
 from collections.abc import Callable, Iterator
+from functools import lru_cache
+
 from .music_implementation import (
     ActionNote, BaseNote, BellNote, DrumNote,
     Measure, Part, Rest,
     Sequence, SequenceMeasure, SpecialParams,
 )
-from .music_interface import light, part
+from .music_interface import part
 
 note_duration: dict[str, float] = {
     '𝅝': 4,     '𝅗𝅥': 2,      '♩': 1,
@@ -20,46 +22,66 @@ symbol_duration = note_duration | rest_duration
 drum_accent_map = {
     '': 0, '-': 1, '>': 2, '^': 3,
 }
+drum_pitch_map = {
+    'h': 0, 'l': 1,
+}
+bell_pitch_map = {
+    'e': 7, 'd': 6,
+    'c': 5, 'b': 4,
+    'a': 3, 
+    'G': 2, # F#
+    'E': 1, 'D': 0,
+}
+SYMBOLS_CACHE_SIZE = 1024  # Distinct symbol sets parsed and remembered
 
 def _interpret_symbols(
     symbols: str, 
     accent_map: dict = {},
     pitch_map: dict = {},
-) -> tuple[float, set, int, bool]:
+) -> tuple[float, frozenset, int, bool]:
     """Return duration, pitches, accent, and is_rest
        from a single set of symbols. """
-    def interpret(symbols: str):
-        symbols = symbols.replace(' ', '')
-        if not symbols:
-            raise ValueError("Invalid (empty) symbol.")
-        elif symbols[0] == '3':
-            duration, pitches, accent, is_rest = interpret(symbols[1:])
-            duration *= 2/3
-        elif symbols[-1] in accent_map:
-            duration, pitches, accent, is_rest = interpret(symbols[:-1])
-            accent = accent_map[symbols[-1]]
-        elif symbols[0] in pitch_map:
-            duration, pitches, accent, is_rest = interpret(symbols[1:])
-            pitches = {pitch_map[symbols[0]]} | pitches
+    return _parse_symbols(
+        symbols, tuple(accent_map.items()), tuple(pitch_map.items()),
+    )
+
+@lru_cache(maxsize=SYMBOLS_CACHE_SIZE)
+def _parse_symbols(
+    symbols: str,
+    accents: tuple[tuple[str, int], ...],
+    pitches: tuple[tuple[str, int], ...],
+) -> tuple[float, frozenset, int, bool]:
+    """Tokenize symbols in a single pass:
+       any triplet prefixes ('3') and pitch letters,
+       then duration glyphs, then any accents (the last one counts)."""
+    accent_map, pitch_map = dict(accents), dict(pitches)
+    symbols = symbols.replace(' ', '')
+    start, end = 0, len(symbols)
+    triplets, note_pitches = 0, set()
+    while start < end and (symbols[start] == '3' or symbols[start] in pitch_map):
+        if symbols[start] == '3':
+            triplets += 1
         else:
-            if any(
-                s not in symbol_duration 
-                for s in symbols
-            ):
-                raise ValueError(f"Invalid symbol in '{symbols}'.")
-            if any(
-                s1 in rest_duration and s2 in note_duration 
-                for s1 in symbols for s2 in symbols
-            ):
-                raise ValueError("Cannot mix note and rest symbols.")
-            is_rest: bool = symbols[0] in rest_duration
-            duration = sum(
-                (rest_duration if is_rest else note_duration)[s]
-                for s in symbols
-            )
-            pitches, accent = set(), 0
-        return duration, pitches, accent, is_rest
-    return interpret(symbols)
+            note_pitches.add(pitch_map[symbols[start]])
+        start += 1
+    accent = 0
+    if start < end and symbols[-1] in accent_map:
+        accent = accent_map[symbols[-1]]
+        while start < end and symbols[end - 1] in accent_map:
+            end -= 1
+    glyphs = symbols[start:end]
+    if not glyphs:
+        raise ValueError("Invalid (empty) symbol.")
+    if any(s not in symbol_duration for s in glyphs):
+        raise ValueError(f"Invalid symbol in '{glyphs}'.")
+    is_rest = glyphs[0] in rest_duration
+    durations = rest_duration if is_rest else note_duration
+    if any(s not in durations for s in glyphs):
+        raise ValueError("Cannot mix note and rest symbols.")
+    duration = sum(durations[s] for s in glyphs)
+    for _ in range(triplets):
+        duration *= 2/3
+    return duration, frozenset(note_pitches), accent, is_rest
 
 def _each_notation_measure(notation: str) -> Iterator[str]:
     """Yield non-empty measures of notation."""
@@ -116,7 +138,7 @@ def act_part(
     ) -> Part:
     """Produce act part from notation."""
     def func(symbols: str):
-        return act(symbols, lambda: next(acts), pre_call_actions=True)
+        return act(symbols, acts.__next__, pre_call_actions=True)
     acts = iter(actions)
     return part(
         *_interpret_notation(func, notation, beats)
@@ -125,14 +147,7 @@ def act_part(
 def bell(symbols: str) -> BellNote | Rest:
     """Validate symbols and return BellNote or Rest."""
     duration, pitches, accent, is_rest = _interpret_symbols(
-        symbols,
-        pitch_map={
-            'e': 7, 'd': 6,
-            'c': 5, 'b': 4,
-            'a': 3, 
-            'G': 2, # F#
-            'E': 1, 'D': 0,
-        }
+        symbols, pitch_map=bell_pitch_map,
     )
     if is_rest:
         return rest(symbols)
@@ -151,11 +166,7 @@ def bell_part(notation: str, beats=4) -> Part:
 def drum(symbols: str) -> DrumNote | Rest:
     """Validate symbols and return DrumNote or Rest."""
     duration, pitches, accent, is_rest = _interpret_symbols(
-        symbols, 
-        accent_map=drum_accent_map,
-        pitch_map={
-            'h': 0, 'l': 1,
-        }
+        symbols, accent_map=drum_accent_map, pitch_map=drum_pitch_map,
     )
     if is_rest:
         return rest(symbols)
@@ -176,9 +187,10 @@ def sequence_measure(
     sequence: Callable,
     special: SpecialParams | None = None,
     beats: int = 4,
+    offset: int = 0,
     **kwargs,
     ) -> SequenceMeasure:
-    """Produce a SequenceMeasure."""
+    """Produce a SequenceMeasure, starting at pattern offset."""
     step_duration, _, _, _ = _interpret_symbols(symbols)
     return SequenceMeasure(
         elements=(),
@@ -188,6 +200,7 @@ def sequence_measure(
         step_duration=step_duration, 
         count=count, 
         special=special,
+        offset=offset,
     )
 
 def sequence_part(
@@ -206,15 +219,12 @@ def sequence_part(
             yield sequence
 
     def func(s: str) -> ActionNote | Rest:
-        """Return a callable that returns an ActionNote."""
-        return act(
-            s, 
-            lambda: light(
-                next(sequence.iter), 
-                sequence.special,
-            ),
-            pre_call_actions=True,
-        )
+        """Return an ActionNote that sets the lights to
+           the sequence's next pattern, or a Rest."""
+        duration, _, _, is_rest = _interpret_symbols(s)
+        if is_rest:
+            return rest(s)
+        return ActionNote(duration, (sequence.next_action(),))
     each_sequence = sequence_gen()
     measures = []
     for notation in _each_notation_measure(notation):
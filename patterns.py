@@ -0,0 +1,149 @@
+"""Marquee Lighted Sign Project - patterns"""
+
+from collections.abc import Iterable, Iterator
+from typing import ClassVar, Union
+
+class Pattern:
+    """Immutable on / off state of a row of devices,
+       held as an int bitmask with device 0 as the most significant bit,
+       so that int(pattern_string, 2) == Pattern(pattern_string).bits.
+       Instances are interned: equal patterns are the same object.
+       Compares equal to, and hashes as, its '0' / '1' string form,
+       and iterates / indexes as that string's characters,
+       so it may be used wherever a pattern string was."""
+
+    __slots__ = ('bits', 'width', '_str', '_hash')
+    _interned: ClassVar[dict[int, "Pattern"]] = {}
+
+    bits: int
+    width: int
+
+    def __new__(cls, value: "PatternLike", width: int | None = None):
+        """Return the pattern for value: an int bitmask of width bits,
+           or a pattern string or sequence of '0' / '1' / 0 / 1."""
+        if isinstance(value, Pattern):
+            return value
+        if isinstance(value, int):
+            assert width is not None
+            bits = value
+        else:
+            if not isinstance(value, str):
+                value = ''.join(str(e) for e in value)
+            width = len(value)
+            bits = int(value, 2) if value else 0
+        assert bits >= 0 and bits >> width == 0
+        key = bits | 1 << width
+        try:
+            return cls._interned[key]
+        except KeyError:
+            pass
+        pattern = object.__new__(cls)
+        object.__setattr__(pattern, 'bits', bits)
+        object.__setattr__(pattern, 'width', width)
+        string = f"{bits:0{width}b}" if width else ''
+        object.__setattr__(pattern, '_str', string)
+        object.__setattr__(pattern, '_hash', hash(string))
+        return cls._interned.setdefault(key, pattern)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pattern is immutable.")
+
+    def __reduce__(self):
+        return Pattern, (self.bits, self.width)
+
+    def __str__(self):
+        return self._str
+
+    def __repr__(self):
+        return f"Pattern('{self._str}')"
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, Pattern):
+            return self is other
+        if isinstance(other, str):
+            return self._str == other
+        return NotImplemented
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._str)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Pattern(self._str[index])
+        return self._str[index]
+
+    def __add__(self, other: "PatternLike") -> "Pattern":
+        """Return the concatenation of self and other."""
+        other = Pattern(other)
+        return Pattern(
+            self.bits << other.width | other.bits, self.width + other.width,
+        )
+
+    def __invert__(self) -> "Pattern":
+        """Return the opposite of self."""
+        return Pattern(self.bits ^ self._mask(), self.width)
+
+    def __xor__(self, other: "PatternLike") -> "Pattern":
+        """Return the devices whose state differs between self and other."""
+        return Pattern(self.bits ^ Pattern(other).bits, self.width)
+
+    def __and__(self, other: "PatternLike") -> "Pattern":
+        return Pattern(self.bits & Pattern(other).bits, self.width)
+
+    def __or__(self, other: "PatternLike") -> "Pattern":
+        return Pattern(self.bits | Pattern(other).bits, self.width)
+
+    def _mask(self) -> int:
+        """Return all width bits set."""
+        return (1 << self.width) - 1
+
+    @staticmethod
+    def bit(index: int, width: int) -> int:
+        """Return the bitmask of device index."""
+        return 1 << (width - 1 - index)
+
+    @classmethod
+    def of(cls, indices: Iterable[int], width: int) -> "Pattern":
+        """Return the pattern with the devices at indices on."""
+        bits = 0
+        for i in indices:
+            bits |= cls.bit(i, width)
+        return cls(bits, width)
+
+    def count(self) -> int:
+        """Return the number of devices on."""
+        return self.bits.bit_count()
+
+    def diff(self, other: "PatternLike") -> "Pattern":
+        """Return the devices whose state differs between self and other."""
+        return self ^ other
+
+    def flip(self, *indices: int) -> "Pattern":
+        """Return self with the devices at indices flipped."""
+        bits = self.bits
+        for i in indices:
+            bits ^= self.bit(i, self.width)
+        return Pattern(bits, self.width)
+
+    def rotate(self, n: int) -> "Pattern":
+        """Return self rotated n devices toward device 0,
+           i.e. pattern[n:] + pattern[:n]."""
+        if not self.width:
+            return self
+        n %= self.width
+        bits = self.bits
+        return Pattern(
+            (bits << n | bits >> (self.width - n)) & self._mask(), self.width,
+        )
+
+    def indices(self, state: str = '1') -> list[int]:
+        """Return the indices of devices in state."""
+        return [i for i, s in enumerate(self._str) if s == state]
+
+PatternLike = Union[Pattern, str, Iterable]
@@ -7,7 +7,7 @@ from typing import Any
 
 from basemode import AutoMode
 from buttonsets import ButtonSet
-from definitions import SpecialParams, ModeConstructor
+from definitions import SpecialParams, ModeConstructor, SongRange
 from instruments import BellSet, DrumSet
 from lightsets import LightSet
 
@@ -20,6 +20,7 @@ class PlayerInterface(ABC):
     drums: DrumSet
     lights: LightSet
     speed_factor: float
+    song_range: SongRange = field(default_factory=SongRange)
     auto_mode: AutoMode | None = field(init=False)
     current_mode: int = field(init=False)
     pace: float = field(init=False)
@@ -58,6 +59,14 @@ class PlayerInterface(ABC):
     ):
         """"""
 
+    @abstractmethod
+    def wait_until(self, deadline_ns: int | None):
+        """Wait until the absolute monotonic deadline_ns."""
+
+    @abstractmethod
+    def lead_time(self, device: str) -> float:
+        """Return seconds to issue device's actions ahead of the beat."""
+
     @abstractmethod
     def click(self):
         """Generate a small click sound by flipping
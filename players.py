@@ -3,13 +3,17 @@
 from collections.abc import Iterable
 from dataclasses import dataclass
 import itertools
+import statistics
 import time
 from typing import Any
 
 from basemode import AutoMode, BaseMode
+from configuration import LATENCY_OFFSETS
 from definitions import ActionParams, DimmerParams, SpecialParams, Shutdown
+from jitter import JitterRecorder
 from modes import Mode
 from buttons import Button, ButtonPressed
+from schedulers import DeadlineScheduler, NS_PER_SECOND
 
 from player_interface import PlayerInterface
 
@@ -26,6 +30,7 @@ class Player(PlayerInterface):
         self.auto_mode = None
         self.current_mode = -1
         self.pace = 0.0
+        self.jitter: JitterRecorder | None = None
 
     def close(self):
         """Clean up."""
@@ -67,8 +72,12 @@ class Player(PlayerInterface):
             if isinstance(mode_instance, AutoMode):
                 self.auto_mode = mode_instance
             self.current_mode = new_mode
+            self.jitter = JitterRecorder.named(mode.name)
+            self.lights.jitter = self.jitter
             print(f"Executing mode {self.current_mode} {mode.name}")
             new_mode = self._play_mode_until_changed(mode_instance)
+            self.jitter.abandon()
+            print(f"Frame timing: {self.jitter}")
             if new_mode == 222:
                 new_mode = self.mode_ids['section_1']
 
@@ -111,12 +120,13 @@ class Player(PlayerInterface):
             pace_iter = itertools.cycle(pace)
         else:
             pace_iter = itertools.repeat(pace)
+        schedule = DeadlineScheduler(self.speed_factor)
+        offset = 0.0
         for _ in range(count):
             for i, lights in enumerate(sequence):
                 if stop is not None and i == stop:
                     break
                 p = next(pace_iter)
-                before = time.time()
                 if p is not None:
                     if isinstance(special, DimmerParams):
                         special.speed_factor = self.speed_factor
@@ -127,38 +137,86 @@ class Player(PlayerInterface):
                         lights, 
                         special=special,
                     )
-                after = time.time()
-                self.wait(p, after - before)
-        self.wait(post_delay)
+                if p is None:
+                    # Until a button is pressed; the schedule
+                    # then restarts from the pattern after.
+                    self.wait_until(None)
+                    schedule = DeadlineScheduler(self.speed_factor)
+                    offset = 0.0
+                    continue
+                offset += p
+                self.wait_until(schedule.deadline_ns(offset))
+        if post_delay is None:
+            self.wait_until(None)
+        else:
+            self.wait_until(schedule.deadline_ns(offset + post_delay))
 
     def wait(self, seconds: float | None, elapsed: float = 0):
         """Wait the specified seconds after adjusting for
            speed_factor and time already elapsed."""
-        if (self.auto_mode is not None and
-            self.auto_mode.trigger_time < time.time()
-        ):
-            raise AutoModeDue
         if seconds is None:
-            duration = None
+            self.wait_until(None)
         else:
-            duration = seconds * self.speed_factor - elapsed
-            if duration <= 0:
-                # print("!!!!!", seconds, elapsed, duration)
-                return
-        Button.wait(duration)
+            self.wait_until(
+                DeadlineScheduler(self.speed_factor).deadline_ns(
+                    seconds - elapsed / self.speed_factor
+                )
+            )
+
+    def wait_until(self, deadline_ns: int | None):
+        """Wait until the absolute monotonic deadline_ns
+           (indefinitely if None) or until any button is pressed.
+           Raise AutoModeDue once the auto mode deadline is reached,
+           if that comes first.  Record the end of the loop
+           iteration for the frame that ends (its device I/O
+           completes asynchronously, and is recorded by lights),
+           and the timing of the frame that starts."""
+        now_ns = time.monotonic_ns()
+        if self.jitter is not None:
+            self.jitter.end_iteration(now_ns, deadline_ns)
+        if self.auto_mode is not None:
+            trigger_ns = self.auto_mode.trigger_ns
+            if deadline_ns is None or trigger_ns <= max(deadline_ns, now_ns):
+                Button.wait(max(0, trigger_ns - now_ns) / NS_PER_SECOND)
+                raise AutoModeDue
+        if deadline_ns is None:
+            Button.wait(None)
+            return
+        if deadline_ns > now_ns:
+            Button.wait((deadline_ns - now_ns) / NS_PER_SECOND)
+            now_ns = time.monotonic_ns()
+        if self.jitter is not None:
+            self.jitter.dispatch(deadline_ns, now_ns)
+
+    def lead_time(self, device: str) -> float:
+        """Return seconds to issue device's actions ahead of the beat:
+           the manual offset if configured, otherwise the median
+           of its live round-trip latency estimates."""
+        if (offset := LATENCY_OFFSETS.get(device)) is not None:
+            return offset
+        match device:
+            case 'lights':
+                histograms = [self.lights.relays.round_trips]
+            case 'dimmers':
+                histograms = [
+                    channel.round_trips
+                    for channel in self.lights.dimmer_channels
+                ]
+            case 'bells':
+                histograms = [self.bells.relays.round_trips]
+            case 'drums':
+                histograms = [self.drums.relays.round_trips]
+            case _:
+                raise ValueError(f"Unrecognized device {device}.")
+        estimates = [h.percentile(50) for h in histograms if h.count]
+        return statistics.median(estimates) if estimates else 0.0
 
     def _flip_extra_relays(self, *indices: int):
         """"""
-        def flip(s):
-            return '0' if s == '1' else '1'
         assert all(0 <= i < len(self.lights.extra_pattern) for i in indices)
-        extra = ''.join(
-            flip(e) if i in indices else e
-            for i, e in enumerate(self.lights.extra_pattern)
-        )
         self.lights.set_relays(
             light_pattern=self.lights.relay_pattern, 
-            extra_pattern=extra,
+            extra_pattern=self.lights.extra_pattern.flip(*indices),
         )
 
     def click(self):
@@ -4,7 +4,7 @@ from basemode import AutoMode
 from configuration import LIGHT_COUNT
 from definitions import DimmerParams, MirrorParams
 from executors import Executor
-from modes import SelectMode
+from modes import PlayLayersMode, SelectMode
 from custom_modes import (
     BellTest, BuildBrightness, EvenOddFade, FillBulbs, RotateReversible, 
     RandomFade, RapidFade, RotateRewind, SilentFadeBuild,
@@ -14,6 +14,10 @@ from sequences import (
     all_off,
     blink_all,
     blink_alternate,
+    concat,
+    mapped,
+    of,
+    repeat,
     rotate,
     random_flip,
     rotate_sides,
@@ -112,6 +116,23 @@ def register_modes(exec: Executor):
     # exec.add_mode("rotate_rewind_1", RotateRewind, 
     #     pattern="100000100000", special=MirrorParams(),
     # )
+    # exec.add_sequence_mode("rotate_and_back", 
+    #     concat(
+    #         repeat(of(rotate, pattern="110000000000"), 3),
+    #         mapped(of(rotate, pattern="110000000000", clockwise=False)),
+    #     ),
+    #     pace=0.25,
+    # )
+    # Needs numpy, and: from compositor import Layer
+    # exec.add_mode("rotate_over_blink_all_fade", PlayLayersMode,
+    #     layers=(
+    #         Layer(blink_all, pace=10, brightness_off=20),
+    #         Layer(rotate, pace=0.5, blend='max',
+    #             kwargs={'pattern': '110000000000'},
+    #         ),
+    #     ),
+    #     special=DimmerParams(transition_on=0.5),
+    # )
 
     # ********** SILENT SIGN **********
     exec.add_sequence_mode("silent_blink_alternate_slow",
@@ -1,37 +1,80 @@
 """Marquee Lighted Sign Project - relays"""
 
 from abc import ABC, abstractmethod
-from collections.abc import Mapping, Sequence
-from typing import ClassVar
+from collections import deque
+from collections.abc import Callable, Mapping, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import queue
+import threading
+import time
+from typing import Any, ClassVar
 
 import serial  # type: ignore
 
+from latency import LatencyHistogram
+from patterns import Pattern, PatternLike
+
+RELAY_QUEUE_SIZE = 16  # Requests queued per board before callers block
+# Streaming mode
+PIPELINE_DEPTH = 4  # Writes sent ahead of their echo
+ECHO_POLL_INTERVAL = 0.005  # seconds
+ECHO_TIMEOUT = 0.5  # seconds
+WRITE_ECHO_SUFFIX = b"\n\r>"  # Board output after a writeall command echo
+
 class RelayModuleInterface(ABC):
     """Interface for any relay module."""
     
     @abstractmethod
-    def set_state_of_devices(self, device_pattern: Sequence):
+    def set_state_of_devices(self, device_pattern: PatternLike) -> Future | None:
         """Set state of each relay per device_pattern."""
 
     @abstractmethod
-    def get_state_of_devices(self) -> str:
+    def get_state_of_devices(self) -> Pattern:
         """Get state of each relay, output device pattern."""
 
+    def close(self):
+        """Finish any queued requests, then clean up."""
+
+@dataclass
+class _RelayRequest:
+    """Work for a board's writer thread: a write of the device
+       bitmask bits, or (if bits is None) func,
+       with the future for its result."""
+    bits: int | None
+    func: Callable[[], Any] | None = None
+    future: Future = field(default_factory=Future)
+
 class NumatoUSBRelayModule(RelayModuleInterface):
-    """Supports Numato USB Relay Modules."""
+    """Supports Numato USB Relay Modules.
+       All serial I/O happens on a dedicated writer thread per board,
+       so callers never block on the board's echo."""
 
     relay_count: ClassVar[int]  # Abstract
 
-    def __init__(self, port_address: str, device_mapping: Mapping[int, int] = {}):
+    def __init__(
+            self,
+            port_address: str,
+            device_mapping: Mapping[int, int] = {},
+            coalesce: bool = False,
+            streaming: bool = False,
+        ):
         """Create the object, where device_mapping
            maps device indices to relay indices.
+           If coalesce, a write not yet sent is replaced by any
+           later write, rather than both being sent.
+           If streaming, writes are sent back to back, with their
+           echoes checked as they arrive rather than awaited.
            Establish connection to relay module via serial port."""
         self.port_address = port_address
+        self.coalesce = coalesce
+        self.streaming = streaming
         self._serial_port = serial.Serial(
             self.port_address, 
             timeout=2,
         )
         print(f"Initializing {self}")
+        self.round_trips = LatencyHistogram.named(str(self))
         if device_mapping:
             assert len(device_mapping) == self.relay_count
             self.device_mapping = device_mapping
@@ -43,71 +86,216 @@ class NumatoUSBRelayModule(RelayModuleInterface):
             self.relay_pattern_hex_len = hex_lengths[self.device_count]
         except LookupError:
             raise ValueError("Unrecognized device count")
-        self._device_to_bit = {
-            l: self.relay_count - 1 - r
-            for l, r in self.device_mapping.items()
-        }
-        self._bit_to_device = {
-            v: k for k, v in self._device_to_bit.items()
-        }
+        self._build_tables()
+        self._queue: queue.Queue[_RelayRequest | None] = queue.Queue(
+            RELAY_QUEUE_SIZE
+        )
+        self._queue_lock = threading.Lock()
+        self._unsent_write: _RelayRequest | None = None
+        self.coalesced_count = 0
+        # Streaming state, used only by the writer thread.
+        self._echoes: deque[tuple[bytes, float, Future]] = deque()
+        self._echo_buffer = b''
+        self._last_write_bits = 0
+        self.resync_count = 0
+        self._closed = False
+        self._writer = threading.Thread(
+            target=self._write_requests, name=f"{self} writer", daemon=True,
+        )
+        self._writer.start()
 
     def __str__(self):
         """__str__."""
         return f"{type(self).__name__} @ {self.port_address}"
     
     def close(self):
-        """Clean up."""
+        """Finish queued requests, waiting for the writer thread
+           to send them and check their echoes, then clean up.
+           Later calls do nothing."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
         self._serial_port.close()
 
-    def set_state_of_devices(self, device_pattern: Sequence):
-        """Set the physical relays per device_pattern."""
+    def set_state_of_devices(self, device_pattern: PatternLike) -> Future:
+        """Queue setting the physical relays per device_pattern.
+           Return a future that completes once they are set."""
+        device_pattern = Pattern(device_pattern)
         assert len(device_pattern) == self.device_count
-        relay_pattern_hex = self._devices_to_relays(device_pattern)
-        self._set_relays(relay_pattern_hex)
+        with self._queue_lock:
+            if self.coalesce and (write := self._unsent_write) is not None:
+                write.bits = device_pattern.bits
+                self.coalesced_count += 1
+                return write.future
+            request = _RelayRequest(device_pattern.bits)
+            if self.coalesce:
+                self._unsent_write = request
+        self._queue.put(request)
+        return request.future
 
-    def get_state_of_devices(self) -> str:
+    def get_state_of_devices(self) -> Pattern:
         """Get the state of all devices and output a device pattern."""
-        relays = self._get_relays()
-        return self._relays_to_devices(relays)
+        request = _RelayRequest(None, self._get_relays)
+        with self._queue_lock:
+            # Later writes must not be merged into earlier ones.
+            self._unsent_write = None
+        self._queue.put(request)
+        return self._relays_to_devices(request.future.result())
 
-    def _send_command(self, command: str):
-        """Send command and read resulting echo."""
+    def _write_requests(self):
+        """Perform queued requests in order until closed."""
+        while True:
+            try:
+                request = self._queue.get(
+                    timeout=ECHO_POLL_INTERVAL if self._echoes else None
+                )
+            except queue.Empty:
+                self._check_echoes(wait=False)
+                continue
+            if request is None:
+                self._check_echoes(wait=True)
+                return
+            with self._queue_lock:
+                if request is self._unsent_write:
+                    self._unsent_write = None
+                bits = request.bits
+            try:
+                if request.func is not None:
+                    self._check_echoes(wait=True)
+                    request.future.set_result(request.func())
+                elif self.streaming:
+                    assert bits is not None
+                    self._stream_write(bits, request.future)
+                else:
+                    assert bits is not None
+                    self._send_command(self._write_commands[bits])
+                    request.future.set_result(None)
+            except Exception as e:
+                print(f"{self}: {e!r}")
+                self._echo_buffer = b''
+                for _, _, future in self._echoes:
+                    if not future.done():
+                        future.set_exception(e)
+                self._echoes.clear()
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+    def _stream_write(self, bits: int, future: Future):
+        """Send the write of device bitmask bits without waiting
+           for its echo, unless PIPELINE_DEPTH echoes are already
+           outstanding.  future completes once the echo is checked."""
+        command = self._write_commands[bits]
+        self._serial_port.write(command)
+        self._last_write_bits = bits
+        self._echoes.append((command, time.monotonic(), future))
+        self._check_echoes(wait=len(self._echoes) > PIPELINE_DEPTH)
+
+    def _check_echoes(self, wait: bool):
+        """Match the board's output to the echoes expected
+           from streamed writes.  If wait, read until all have arrived.
+           Resync on a mismatched or missing echo."""
+        if not self._echoes:
+            return
+        if wait:
+            expected = sum(
+                len(command) + len(WRITE_ECHO_SUFFIX)
+                for command, _, _ in self._echoes
+            )
+            size = expected - len(self._echo_buffer)
+        else:
+            size = self._serial_port.in_waiting
+        if size > 0:
+            self._echo_buffer += self._serial_port.read(size)
+        now = time.monotonic()
+        while self._echoes:
+            command, sent, future = self._echoes[0]
+            size = len(command) + len(WRITE_ECHO_SUFFIX)
+            if len(self._echo_buffer) < size:
+                if wait or now - sent > ECHO_TIMEOUT:
+                    self.round_trips.record_timeout()
+                    self._resync(f"no echo for {command!r}")
+                return
+            if not (
+                self._echo_buffer.startswith(command) and
+                self._echo_buffer.startswith(WRITE_ECHO_SUFFIX, len(command))
+            ):
+                self._resync(
+                    f"expected {command!r}, got {self._echo_buffer[:size]!r}"
+                )
+                return
+            self._echo_buffer = self._echo_buffer[size:]
+            self._echoes.popleft()
+            self.round_trips.record(now - sent)
+            future.set_result(None)
+
+    def _resync(self, reason: str):
+        """Discard the echo stream, then read back the relays
+           and rewrite the last streamed state if they differ."""
+        print(f"{self} resyncing: {reason}")
+        self.resync_count += 1
+        self._echo_buffer = b''
         self._serial_port.reset_input_buffer()
-        command_b = bytes(command + '\r', 'utf-8')
-        self._serial_port.write(command_b)
-        self._serial_port.read(len(command_b) + 1)
+        if self._device_masks[self._get_relays()] != self._last_write_bits:
+            self._send_command(self._write_commands[self._last_write_bits])
+            # Consume the rest of the prompt, so that the echo
+            # of the next streamed write starts the input.
+            self._serial_port.read(len(WRITE_ECHO_SUFFIX) - 1)
+        while self._echoes:
+            _, _, future = self._echoes.popleft()
+            future.set_result(None)
+
+    def _build_tables(self):
+        """Precompute, for every possible device bitmask,
+           the command that sets the corresponding relays,
+           and for every relay bitmask, the device bitmask.
+           Device bitmasks are Pattern bits."""
+        relay_bits = [0] * self.device_count
+        device_bits = [0] * self.relay_count
+        for d, r in self.device_mapping.items():
+            relay_bits[self.device_count - 1 - d] = 1 << r
+            device_bits[r] = 1 << (self.device_count - 1 - d)
+        self._write_commands = [
+            bytes(
+                f"relay writeall {relays:0{self.relay_pattern_hex_len}x}\r",
+                'utf-8',
+            )
+            for relays in _translate_masks(relay_bits)
+        ]
+        self._device_masks = _translate_masks(device_bits)
 
-    def _set_relays(self, relay_pattern_hex: str):
-        """Send command to relay board to set all relays."""
-        self._send_command(f"relay writeall {relay_pattern_hex}")
+    def _send_command(self, command: bytes):
+        """Send command and read resulting echo."""
+        start = time.monotonic()
+        self._serial_port.reset_input_buffer()
+        self._serial_port.write(command)
+        echo = self._serial_port.read(len(command) + 1)
+        if len(echo) < len(command) + 1:
+            self.round_trips.record_timeout()
+        else:
+            self.round_trips.record(time.monotonic() - start)
 
-    def _get_relays(self) -> str:
-        """Get the state of all relays and output a relay pattern."""
+    def _get_relays(self) -> int:
+        """Get the state of all relays and output a relay bitmask."""
         self._serial_port.reset_input_buffer()
-        self._send_command("relay readall")
+        self._send_command(b"relay readall\r")
         # Response example: b'0000\n\r>'
         response = self._serial_port.read(self.relay_pattern_hex_len + 3)
-        val = response[:self.relay_pattern_hex_len].decode('utf-8')
-        val = bin(int(val, base=16))[2:]
-        return f"{val:>0{self.relay_count}}"
-
-    def _devices_to_relays(self, device_pattern: Sequence) -> str:
-        """Return relay hex pattern corresponding to device_pattern."""
-        relay_pattern = ''.join(
-            str(device_pattern[self._bit_to_device[b]])
-            if b in self._bit_to_device else '0'
-            for b in range(self.relay_count)
-        )
-        val = hex(int(''.join(str(e) for e in relay_pattern), 2))[2:]
-        return f"{val:>0{self.relay_pattern_hex_len}}"
-
-    def _relays_to_devices(self, relay_pattern: Sequence) -> str:
-        """Convert a relay pattern to a device pattern."""
-        device_pattern = ''.join(
-            relay_pattern[self._device_to_bit[d]]
-            for d in range(self.device_count)
-        )
-        return device_pattern
+        return int(response[:self.relay_pattern_hex_len], base=16)
+
+    def _relays_to_devices(self, relays: int) -> Pattern:
+        """Convert a relay bitmask to a device pattern."""
+        return Pattern(self._device_masks[relays], self.device_count)
+
+def _translate_masks(bits: Sequence[int]) -> list[int]:
+    """Return, for every bitmask m over len(bits) bits,
+       the OR of bits[i] for each bit i set in m."""
+    table = [0] * (1 << len(bits))
+    for m in range(1, len(table)):
+        low = m & -m
+        table[m] = table[m ^ low] | bits[low.bit_length() - 1]
+    return table
 
 class NumatoRL160001(NumatoUSBRelayModule):
     """Supports the Numato RL160001 16 Channel USB 
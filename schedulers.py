@@ -0,0 +1,27 @@
+"""Marquee Lighted Sign Project - schedulers"""
+
+import time
+
+NS_PER_SECOND = 1_000_000_000
+
+class DeadlineScheduler:
+    """Computes the absolute target time of every frame from the
+       start of a section, on the monotonic clock.  Waiting error
+       therefore never accumulates from frame to frame,
+       and wall-clock (NTP) adjustments have no effect."""
+
+    def __init__(self, speed_factor: float = 1.0, start_ns: int | None = None):
+        """Start the schedule now, or at start_ns if specified
+           (e.g. the end of the previous section)."""
+        self.speed_factor = speed_factor
+        self.start_ns = time.monotonic_ns() if start_ns is None else start_ns
+
+    def deadline_ns(self, offset: float) -> int:
+        """Return the absolute target time of the frame
+           offset seconds (before speed_factor) after the start."""
+        return self.start_ns + round(offset * self.speed_factor * NS_PER_SECOND)
+
+    @staticmethod
+    def seconds_until(deadline_ns: int) -> float:
+        """Return seconds from now until deadline_ns; negative if past."""
+        return (deadline_ns - time.monotonic_ns()) / NS_PER_SECOND
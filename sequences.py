@@ -1,19 +1,220 @@
 """Marquee Lighted Sign Project - sequences"""
 
-from collections.abc import Iterator, Sequence
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from functools import cached_property, reduce
 import itertools
+import math
+import operator
 import random
+from typing import Any
 
 from configuration import (
     ALL_OFF, ALL_ON, LIGHT_COUNT, 
     LIGHTS_BY_COL, LIGHTS_BY_ROW, LIGHTS_CLOCKWISE, 
     LIGHTS_BY_SIDE, LIGHTS_BOTTOM, LIGHTS_LEFT, LIGHTS_RIGHT, LIGHTS_TOP
 )
+from patterns import Pattern
 
-def opposite(pattern: Sequence) -> str:
+FRAME_BUFFER_LIMIT = 4096  # Most patterns compiled into a frame buffer
+FRAME_CACHE_SIZE = 256  # Sequences whose frame buffers are remembered
+
+class LRUCache(OrderedDict):
+    """Dict that keeps only its maxsize most recently used entries."""
+
+    def __init__(self, maxsize: int):
+        """Initialize."""
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        """Return the value of key, marking it most recently used."""
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        """Set the value of key, discarding the least recently used
+           entry if there are then more than maxsize."""
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+# By sequence and kwargs
+_frame_buffers: LRUCache = LRUCache(FRAME_CACHE_SIZE)
+_cycles: LRUCache = LRUCache(FRAME_CACHE_SIZE)
+
+def streamed(sequence: Callable) -> Callable:
+    """Mark sequence as generated afresh each time it is played,
+       rather than compiled into a frame buffer,
+       because it is random or does not end on its own.
+       Other sequences are played in a loop from their first pass,
+       kept in memory; a streamed one keeps none of its patterns,
+       but regenerates them on every pass."""
+    sequence.streamed = True  # type: ignore
+    return sequence
+
+def frame_buffer(sequence: Callable, kwargs: dict[str, Any]) -> tuple | None:
+    """Return the patterns of sequence(**kwargs), compiled once
+       into an immutable buffer shared by every caller.
+       Return None if sequence must be streamed instead:
+       it is marked streamed, kwargs are unhashable,
+       or it yields more than FRAME_BUFFER_LIMIT patterns."""
+    if getattr(sequence, 'streamed', False):
+        return None
+    try:
+        key = (sequence, frozenset(kwargs.items()))
+        return _frame_buffers[key]
+    except KeyError:
+        pass
+    except TypeError:
+        return None
+    frames = tuple(
+        itertools.islice(sequence(**kwargs), FRAME_BUFFER_LIMIT + 1)
+    )
+    if len(frames) > FRAME_BUFFER_LIMIT:
+        frames = None
+    _frame_buffers[key] = frames
+    return frames
+
+class Cycle:
+    """The shortest run of patterns (frames) that, repeated,
+       gives a sequence played in a loop."""
+
+    __slots__ = ('frames',)
+
+    def __init__(self, frames: tuple):
+        """Initialize."""
+        assert frames, "A cycle must have at least one pattern."
+        self.frames = frames
+
+    @property
+    def period(self) -> int:
+        """Patterns after which the sequence repeats."""
+        return len(self.frames)
+
+    def frame_at(self, i: int) -> Any:
+        """Return pattern i of the sequence played in a loop."""
+        return self.frames[i % len(self.frames)]
+
+    def frames_from(self, start: int = 0) -> Iterator:
+        """Yield the patterns of the sequence played in a loop,
+           endlessly, from pattern start."""
+        frames, period = self.frames, len(self.frames)
+        i = start % period
+        while True:
+            yield frames[i]
+            i += 1
+            if i == period:
+                i = 0
+
+def period(frames: Sequence) -> int:
+    """Return the shortest period of frames played in a loop:
+       the least p that divides len(frames)
+       and with each frame equal to the one p before it."""
+    # Longest proper prefix of frames[:i + 1] that is also its suffix
+    border = [0] * len(frames)
+    for i in range(1, len(frames)):
+        k = border[i - 1]
+        while k and frames[i] != frames[k]:
+            k = border[k - 1]
+        border[i] = k + 1 if frames[i] == frames[k] else 0
+    p = len(frames) - border[-1]
+    return p if len(frames) % p == 0 else len(frames)
+
+def cycle_of(sequence: Callable, kwargs: dict[str, Any]) -> Cycle | None:
+    """Return the Cycle of sequence(**kwargs) played in a loop,
+       detected once from its frame buffer (or, if it is an endless
+       Combined of known period, its first period of patterns),
+       and shared by every caller.
+       Return None if it must be streamed instead."""
+    try:
+        key = (sequence, frozenset(kwargs.items()))
+        return _cycles[key]
+    except KeyError:
+        pass
+    except TypeError:
+        return None
+    if isinstance(sequence, Combined) and sequence.endless:
+        length = sequence.period
+        if length is None or length > FRAME_BUFFER_LIMIT:
+            frames = None
+        else:
+            frames = tuple(itertools.islice(sequence(), length))
+    else:
+        frames = frame_buffer(sequence, kwargs)
+    cycle = Cycle(frames[:period(frames)]) if frames else None
+    _cycles[key] = cycle
+    return cycle
+
+def looped(
+        sequence: Callable, kwargs: dict[str, Any], start: int = 0,
+    ) -> Iterator:
+    """Yield the patterns of sequence(**kwargs) played in a loop,
+       endlessly, from pattern start, generating none until needed.
+       Play from its Cycle if it is cached.  Otherwise generate its
+       first pass as needed, then cache its Cycle and play on from
+       that, so each pass repeats the first, even if random.
+       A streamed sequence is instead generated afresh each pass,
+       as is one with unhashable kwargs or a pass too long to keep."""
+    try:
+        key = (sequence, frozenset(kwargs.items()))
+    except TypeError:
+        yield from itertools.islice(_passes(sequence, kwargs), start, None)
+        return
+    if key in _cycles or getattr(sequence, 'streamed', False):
+        cycle = cycle_of(sequence, kwargs)
+        if cycle is None:
+            yield from itertools.islice(_passes(sequence, kwargs), start, None)
+        else:
+            yield from cycle.frames_from(start)
+        return
+    frames: list | None = []
+    position = 0
+    for pattern in sequence(**kwargs):
+        if frames is not None:
+            frames.append(pattern)
+            if len(frames) > FRAME_BUFFER_LIMIT:
+                frames = None
+                _frame_buffers[key] = _cycles[key] = None
+        if position >= start:
+            yield pattern
+        position += 1
+    if frames is None:
+        yield from itertools.islice(
+            _passes(sequence, kwargs), max(start - position, 0), None,
+        )
+        return
+    buffer = tuple(frames)
+    cycle = Cycle(buffer[:period(buffer)]) if buffer else None
+    _frame_buffers[key], _cycles[key] = buffer, cycle
+    if cycle is not None:
+        yield from cycle.frames_from(max(start, position))
+
+def _passes(sequence: Callable, kwargs: dict[str, Any]) -> Iterator:
+    """Yield the patterns of sequence(**kwargs) endlessly,
+       calling it again each time it ends, so that,
+       unlike itertools.cycle, no pattern is retained."""
+    while True:
+        empty = True
+        for pattern in sequence(**kwargs):
+            empty = False
+            yield pattern
+        if empty:
+            return
+
+def opposite(pattern: Sequence) -> str | Pattern:
     """Return pattern or element with the state(s) flipped."""
+    if isinstance(pattern, Pattern):
+        return ~pattern
     return "".join("1" if str(p) == "0" else "0" for p in pattern)
 
+def _lights(lights: Iterable[int], pattern: str = "1") -> Pattern:
+    """Return lights set to pattern, and all others to its opposite."""
+    selected = Pattern.of(lights, LIGHT_COUNT)
+    return selected if pattern == "1" else ~selected
+
 def pp(p: Sequence):
     """Pretty print pattern p."""
     print(
@@ -24,15 +225,15 @@ def pp(p: Sequence):
         f"  {p[8]} {p[7]} {p[6]}\n"
     )
 
-def all_on() -> Iterator[str]:
+def all_on() -> Iterator[Pattern]:
     """All lights on."""
-    yield ALL_ON
+    yield Pattern(ALL_ON)
 
-def all_off() -> Iterator[str]:
+def all_off() -> Iterator[Pattern]:
     """All lights off."""
-    yield ALL_OFF
+    yield Pattern(ALL_OFF)
 
-def blink_all(on_first=True) -> Iterator[str]:
+def blink_all(on_first=True) -> Iterator[Pattern]:
     """All lights on and then off."""
     if on_first:
         yield next(all_on())
@@ -41,27 +242,23 @@ def blink_all(on_first=True) -> Iterator[str]:
         yield next(all_off())
         yield next(all_on())
 
-def even_on() -> Iterator[str]:
+def even_on() -> Iterator[Pattern]:
     """Even-numbered lights on; others off."""
-    yield ''.join('1' if y % 2 else '0' for y in range(LIGHT_COUNT))
+    yield _lights(range(1, LIGHT_COUNT, 2))
 
-def even_off() -> Iterator[str]:
+def even_off() -> Iterator[Pattern]:
     """Even-numbered lights off; others on."""
-    yield opposite(next(even_on()))
+    yield ~next(even_on())
 
-def blink_alternate() -> Iterator[str]:
+def blink_alternate() -> Iterator[Pattern]:
     """Every other light on and then off."""
     yield next(even_on())
     yield next(even_off())
 
-def each_row(pattern="1") -> Iterator[str]:
+def each_row(pattern="1") -> Iterator[Pattern]:
     """Each row, starting at the top."""
-    opp = opposite(pattern)
     for row in LIGHTS_BY_ROW:
-        yield ''.join(
-            pattern if i in row else opp
-            for i in range(LIGHT_COUNT)
-        )
+        yield _lights(row, pattern)
 
 def lights_in_groups(rows=True, from_top_left=True) -> Iterator[list[int]]:
     """Return lights in each group section."""
@@ -74,37 +271,32 @@ def lights_in_groups(rows=True, from_top_left=True) -> Iterator[list[int]]:
     for group in groups:
         yield group
     
-def build(pattern="1", rows=True, from_top_left=True) -> Iterator[str]:
+def build(pattern="1", rows=True, from_top_left=True) -> Iterator[Pattern]:
     """Successive rows or cols on / off."""
     assert len(pattern) == 1
-    lights = [opposite(pattern)] * LIGHT_COUNT
+    lights: list[int] = []
     for group in lights_in_groups(rows, from_top_left):
-        for light in group:
-            lights[light] = pattern
-        yield ''.join(l for l in lights)
+        lights += group
+        yield _lights(lights, pattern)
 
-def rotate(pattern="1"+"0"*(LIGHT_COUNT-1), clockwise=True) -> Iterator[str]:
+def rotate(pattern="1"+"0"*(LIGHT_COUNT-1), clockwise=True) -> Iterator[Pattern]:
     """Rotate a pattern of lights counter/clockwise.
-       Pattern is a string of length LIGHT_COUNT containing 0 and 1."""
+       Pattern is of length LIGHT_COUNT containing 0 and 1."""
     if clockwise:
         light_range = range(LIGHT_COUNT, 0, -1)
     else:  # counterclockwise
         light_range = range(0, LIGHT_COUNT, 1)
+    pattern = Pattern(pattern)
     for i in light_range:
-        rotated_pattern = pattern[i:] + pattern[:i]
-        yield rotated_pattern
+        yield pattern.rotate(i)
 
-def rotate_sides(pattern="1", clockwise=True) -> Iterator[str]:
+def rotate_sides(pattern="1", clockwise=True) -> Iterator[Pattern]:
     """ """
     sequence = LIGHTS_BY_SIDE if clockwise else reversed(LIGHTS_BY_SIDE)
-    opp = opposite(pattern)
     for lights in sequence:
-        yield ''.join(
-            pattern if i in lights else opp
-            for i in range(LIGHT_COUNT)
-        )
+        yield _lights(lights, pattern)
 
-def opposite_corner_pairs() -> Iterator[str]:
+def opposite_corner_pairs() -> Iterator[Pattern]:
     """Alternate the lights in 2 diagonally-opposite corners
        with the other 2 diagonally-opposite corners."""
     corners_clockwise = [
@@ -118,40 +310,35 @@ def opposite_corner_pairs() -> Iterator[str]:
         corners_clockwise[1] + corners_clockwise[3],
     ]
     for lights in opposite_corners:
-        pattern = ''.join(
-            "0" if i in lights else "1"
-            for i in range(LIGHT_COUNT)
-        )
-        yield pattern
-        yield ALL_ON
+        yield _lights(lights, "0")
+        yield Pattern(ALL_ON)
 
-def rotate_build(clockwise=True) -> Iterator[str]:
+def rotate_build(clockwise=True) -> Iterator[Pattern]:
     """Successive lights on, rotating around."""
     if clockwise:
         light_range = LIGHTS_CLOCKWISE
     else:  # counterclockwise
         light_range = reversed(LIGHTS_CLOCKWISE)
-    lights = ['0'] * LIGHT_COUNT
+    lights = Pattern(0, LIGHT_COUNT)
     for l in light_range:
-        lights[l] = '1'
-        yield ''.join(e for e in lights)
+        lights |= Pattern.of((l,), LIGHT_COUNT)
+        yield lights
 
-def rotate_build_flip(*, count: int, clockwise=True) -> Iterator[str]:
+def rotate_build_flip(*, count: int, clockwise=True) -> Iterator[Pattern]:
     """Successive lights on / off, rotating around."""
     if clockwise:
         light_range = LIGHTS_CLOCKWISE
     else:  # counterclockwise
         light_range = reversed(LIGHTS_CLOCKWISE)
-    lights = ['0'] * LIGHT_COUNT
+    lights = Pattern(0, LIGHT_COUNT)
     for c in range(count):
-        i = c % LIGHT_COUNT
-        lights[i] = opposite(lights[i])
-        yield ''.join(e for e in lights)
+        lights = lights.flip(c % LIGHT_COUNT)
+        yield lights
 
-def center_alternate() -> Iterator[str]:
+def center_alternate() -> Iterator[Pattern]:
     """Alternate the top and bottom center lights."""
-    yield "010000000000"
-    yield "000000010000"
+    yield Pattern("010000000000")
+    yield Pattern("000000010000")
 
 @staticmethod
 def _random_light_gen() -> Iterator[int]:
@@ -164,31 +351,27 @@ def _random_light_gen() -> Iterator[int]:
             new = random.randrange(LIGHT_COUNT)
         yield new
 
-def random_flip_start_blank(*, pattern: str = "1") -> Iterator[str]:
+@streamed
+def random_flip_start_blank(*, pattern: str = "1") -> Iterator[Pattern]:
     """Random light on / off, never immediately repeating a light.
        Starts with setting all lights to the opposite of pattern.
        This sequence does not end on its own."""
-    opp = opposite(pattern)
     random_gen = _random_light_gen()
     while True:
-        index = next(random_gen)
-        yield ''.join(
-            opp * index +
-            pattern +
-            opp * (LIGHT_COUNT - index - 1)
-        )
+        yield _lights((next(random_gen),), pattern)
 
-def random_flip(*, light_pattern) -> Iterator[str]:
+@streamed
+def random_flip(*, light_pattern) -> Iterator[Pattern]:
     """Random light on / off, never immediately repeating a light.
        Pass in current / starting state of lights.
        This sequence does not end on its own."""
-    lights = list(light_pattern)
+    lights = Pattern(light_pattern)
     random_gen = _random_light_gen()
     while True:
-        index = next(random_gen)
-        lights[index] = opposite(lights[index])
-        yield ''.join(e for e in lights)
+        lights = lights.flip(next(random_gen))
+        yield lights
 
+@streamed
 def random_once_each() -> Iterator[list[int]]:
     """Return random light index until all light indexes 
        have been returned exactly once."""
@@ -197,7 +380,194 @@ def random_once_each() -> Iterator[list[int]]:
     while indices:
         yield [indices.pop()]
 
+@streamed
 def random_each() -> Iterator[list[int]]:
     """"""
     for index in itertools.cycle(random_once_each()):
         yield index
+
+class Combined:
+    """A sequence built lazily from other sequences (parts).
+       Calling it returns a fresh iterator that generates its patterns
+       one at a time, so memory does not grow with its length.
+       length: patterns in one pass; None if endless,
+       or unknown without playing it.
+       period: patterns after which an endless sequence repeats,
+       if known; None otherwise."""
+
+    def __init__(
+            self,
+            patterns: Callable[[], Iterator],
+            parts: tuple["Combined", ...] = (),
+            length: Callable[[], int | None] = lambda: None,
+            period: Callable[[], int | None] = lambda: None,
+            endless: bool = False,
+        ):
+        """Initialize.  length and period are only evaluated
+           when first asked for."""
+        self._patterns = patterns
+        self._length = length
+        self._period = period
+        self.endless = endless
+        self.streamed = endless or any(p.streamed for p in parts)
+
+    def __call__(self) -> Iterator:
+        """Return a fresh iterator of the patterns."""
+        return self._patterns()
+
+    @cached_property
+    def length(self) -> int | None:
+        """Patterns in one pass, if known."""
+        return None if self.endless else self._length()
+
+    @cached_property
+    def period(self) -> int | None:
+        """Patterns after which an endless sequence repeats, if known."""
+        return self._period() if self.endless else None
+
+def of(sequence: Callable, **kwargs) -> Combined:
+    """Return sequence(**kwargs) as a Combined.  Unless sequence
+       is streamed, its length is measured from its frame buffer."""
+    def length() -> int | None:
+        frames = frame_buffer(sequence, kwargs)
+        return None if frames is None else len(frames)
+    combined = Combined(lambda: sequence(**kwargs), length=length)
+    combined.streamed = getattr(sequence, 'streamed', False)
+    return combined
+
+def _part(sequence: Callable) -> Combined:
+    """Return sequence as a Combined."""
+    return sequence if isinstance(sequence, Combined) else of(sequence)
+
+def _finite_lengths(parts: Iterable[Combined]) -> list[int | None]:
+    """Return the lengths of the parts that end."""
+    return [p.length for p in parts if not p.endless]
+
+def _periods(parts: Iterable[Combined]) -> list[int | None]:
+    """Return the periods of the endless parts."""
+    return [p.period for p in parts if p.endless]
+
+def _known(values: list[int | None], func: Callable) -> int | None:
+    """Return func(values), or None if any value is unknown."""
+    return None if None in values else func(values)
+
+def concat(*sequences: Callable) -> Combined:
+    """Each sequence in turn."""
+    parts = tuple(_part(s) for s in sequences)
+    return Combined(
+        lambda: itertools.chain.from_iterable(p() for p in parts),
+        parts,
+        length=lambda: _known([p.length for p in parts], sum),
+        endless=any(p.endless for p in parts),
+    )
+
+def repeat(sequence: Callable, n: int | None = None) -> Combined:
+    """sequence n times in a row, or endlessly if n is None.
+       An endless repeat ends if a pass yields nothing."""
+    part = _part(sequence)
+
+    def patterns() -> Iterator:
+        for _ in itertools.count() if n is None else range(n):
+            empty = True
+            for pattern in part():
+                empty = False
+                yield pattern
+            if empty:
+                return
+
+    def period() -> int | None:
+        if part.endless:
+            return part.period
+        return None if part.streamed else part.length
+    return Combined(
+        patterns, (part,),
+        length=lambda: _known([part.length], lambda l: l[0] * n),
+        period=period,
+        endless=n is None or part.endless,
+    )
+
+def reverse(sequence: Callable) -> Combined:
+    """sequence backwards.  It must end, as each pass is held in full:
+       its frame buffer if it has one, otherwise a copy."""
+    part = _part(sequence)
+    if part.endless:
+        raise ValueError("Cannot reverse an endless sequence.")
+
+    def patterns() -> Iterator:
+        frames = frame_buffer(part, {})
+        return reversed(tuple(part()) if frames is None else frames)
+    return Combined(patterns, (part,), length=lambda: part.length)
+
+def interleave(*sequences: Callable) -> Combined:
+    """The next pattern of each sequence in turn,
+       until any of them ends."""
+    parts = tuple(_part(s) for s in sequences)
+
+    def patterns() -> Iterator:
+        for group in zip(*(p() for p in parts)):
+            yield from group
+    return Combined(
+        patterns, parts,
+        length=lambda: _known(
+            _finite_lengths(parts), lambda l: len(parts) * min(l),
+        ),
+        period=lambda: _known(
+            _periods(parts), lambda p: len(parts) * math.lcm(*p),
+        ),
+        endless=all(p.endless for p in parts),
+    )
+
+def stretch(sequence: Callable, k: int) -> Combined:
+    """Each pattern of sequence k times in a row."""
+    part = _part(sequence)
+    return Combined(
+        lambda: (p for p in part() for _ in range(k)),
+        (part,),
+        length=lambda: _known([part.length], lambda l: l[0] * k),
+        period=lambda: _known([part.period], lambda p: p[0] * k),
+        endless=part.endless,
+    )
+
+def mapped(
+        sequence: Callable,
+        func: Callable[[Pattern], Pattern | str] = opposite,
+    ) -> Combined:
+    """func of each pattern of sequence; its opposite by default."""
+    part = _part(sequence)
+    return Combined(
+        lambda: map(func, part()),
+        (part,),
+        length=lambda: part.length,
+        period=lambda: part.period,
+        endless=part.endless,
+    )
+
+def take(sequence: Callable, n: int) -> Combined:
+    """The first n patterns of sequence."""
+    part = _part(sequence)
+
+    def length() -> int | None:
+        if part.endless:
+            return n
+        return _known([part.length], lambda l: min(l[0], n))
+    return Combined(
+        lambda: itertools.islice(part(), n), (part,), length=length,
+    )
+
+def overlay(
+        *sequences: Callable,
+        blend: Callable[[Pattern, Pattern], Pattern] = operator.or_,
+    ) -> Combined:
+    """The next patterns of all sequences at once, combined by blend
+       (on in any of them by default), until any of them ends."""
+    parts = tuple(_part(s) for s in sequences)
+
+    def patterns() -> Iterator[Pattern]:
+        for group in zip(*(p() for p in parts)):
+            yield reduce(blend, map(Pattern, group))
+    return Combined(
+        patterns, parts,
+        length=lambda: _known(_finite_lengths(parts), min),
+        period=lambda: _known(_periods(parts), lambda p: math.lcm(*p)),
+        endless=all(p.endless for p in parts),
+    )
@@ -5,7 +5,7 @@ import time
 from configuration import ALL_OFF, ALL_LOW, ALL_ON
 from modes import PlayMusicMode
 from music import (
-    dimmer_sequence_flip, section, sequence,
+    compile_sections, dimmer_sequence_flip, light, section, sequence,
 )
 from music import(
     act_part, bell_part, drum_part, sequence_part
@@ -21,15 +21,17 @@ class SignsSong(PlayMusicMode):
         self.player.lights.set_dimmers(ALL_LOW, force_update=True)
         time.sleep(0.75)
         self.player.lights.set_relays(ALL_ON)
-        sections = [
+        self.play_song(compile_sections(self.sections, SignsSong, tempo=75))
+        self.player.wait(None)
+
+    def sections(self):
+        """Signs song sections, in order."""
+        return [
             self.intro(),
             self.refrain(1),
             self.transition(),
             self.refrain(2),
         ]
-        for section in sections:
-            section.play(tempo=75)
-        self.player.wait(None)
 
     def intro(self):
         """Signs song intro."""
@@ -88,8 +90,8 @@ class SignsSong(PlayMusicMode):
             ),
             act_part(
                     '  𝄻  |  ' * 10 + '  ♩ ♩  |  ',
-                    lambda: self.player.lights.set_relays(ALL_OFF),
-                    lambda: self.player.lights.set_relays(ALL_ON, special=DimmerParams()),
+                    light(ALL_OFF),
+                    light(ALL_ON, DimmerParams()),
             ),
         )
 
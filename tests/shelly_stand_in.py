@@ -0,0 +1,94 @@
+"""Stand-in Shelly device shared by the transport and dimmer tests."""
+
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web
+
+class StandInShelly:
+    """Minimal stand-in for a Shelly Gen2 device's RPC endpoints."""
+
+    def __init__(self):
+        self.brightness = {0: 10, 1: 20}
+        self.http_calls: list[str] = []
+        self.ws_calls: list[str] = []
+        self.udp_calls: list[str] = []
+        self.drop_udp = False
+        self.delay = 0.0
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get('/rpc', self._websocket)
+        app.router.add_get('/rpc/{method}', self._http)
+        runner = web.AppRunner(app)
+        self.loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        self.address = f"127.0.0.1:{runner.addresses[0][1]}"
+        endpoint, _ = self.loop.run_until_complete(
+            self.loop.create_datagram_endpoint(
+                lambda: _UdpRpc(self), local_addr=('127.0.0.1', 0),
+            )
+        )
+        self.udp_port = endpoint.get_extra_info('sockname')[1]
+        ready.set()
+        self.loop.run_forever()
+
+    def _invoke(self, method: str, params: dict):
+        if method == 'Shelly.GetStatus':
+            return {
+                f'light:{id}': {'brightness': b}
+                for id, b in self.brightness.items()
+            }
+        if method == 'Light.Set':
+            self.brightness[int(params['id'])] = int(params['brightness'])
+            return None
+        raise LookupError(method)
+
+    async def _http(self, request: web.Request):
+        method = request.match_info['method']
+        self.http_calls.append(method)
+        await asyncio.sleep(self.delay)
+        try:
+            return web.json_response(self._invoke(method, dict(request.query)))
+        except LookupError:
+            return web.json_response({'code': 404}, status=404)
+
+    async def _websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for message in ws:
+            frame = message.json()
+            self.ws_calls.append(frame['method'])
+            try:
+                result = {'result': self._invoke(frame['method'], frame['params'])}
+            except LookupError:
+                result = {'error': {'code': 404}}
+            await ws.send_json({'id': frame['id'], 'dst': frame['src']} | result)
+        return ws
+
+class _UdpRpc(asyncio.DatagramProtocol):
+    """UDP RPC endpoint of the stand-in; never replies."""
+
+    def __init__(self, shelly: StandInShelly):
+        self.shelly = shelly
+
+    def datagram_received(self, data: bytes, addr):
+        if self.shelly.drop_udp:
+            return
+        frame = json.loads(data)
+        self.shelly.udp_calls.append(frame['method'])
+        self.shelly._invoke(frame['method'], frame['params'])
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
@@ -61,3 +61,11 @@ def test_validate_speed_factor_negative():
 def test_validate_speed_factor_too_large():
     with pytest.raises(ValueError, match="speed factor"):
         arguments.validate_speed_factor('5.0001')
+
+def test_validate_measure_invalid():
+    with pytest.raises(ValueError, match="measure"):
+        arguments.validate_measure('q')
+
+def test_validate_measure_zero():
+    with pytest.raises(ValueError, match="measure"):
+        arguments.validate_measure('0')
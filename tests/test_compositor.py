@@ -0,0 +1,164 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from compositor import Compositor, Layer
+from definitions import DimmerParams
+import frame_arrays
+from modes import PlayLayersMode
+from sequences import blink_all, rotate, random_flip
+
+def blended(compositor, count):
+    return [
+        (offset, str(compositor.pattern()), compositor.brightnesses())
+        for offset in itertools.islice(compositor.steps(), count)
+    ]
+
+def two(first, second):
+    return lambda: iter([first, second])
+
+@pytest.mark.parametrize('blend, patterns, levels', [
+    ('or', ['111000000000', '100000000000'], [100] * 3 + [0] * 9),
+    ('and', ['100000000000', '000000000000'], [100] + [0] * 11),
+    ('xor', ['011000000000', '100000000000'], [0, 100, 100] + [0] * 9),
+    ('max', ['1' * 12, '1' * 12], [100] * 3 + [20] * 9),
+    ('add', ['1' * 12, '1' * 12], [100, 100, 100] + [20] * 9),
+])
+def test_blend_modes(blend, patterns, levels):
+    compositor = Compositor(
+        Layer(two('110000000000', '100000000000'), pace=1),
+        Layer(
+            two('101000000000', '000000000000'), pace=1, blend=blend,
+            brightness_off=20,
+        ),
+    )
+    steps = blended(compositor, 2)
+    assert [pattern for _, pattern, _ in steps] == patterns
+    assert steps[0][2] == levels
+
+@pytest.mark.parametrize('blend', ['and', 'xor'])
+def test_logical_blends_turn_off_unlit_levels(blend):
+    compositor = Compositor(
+        Layer(blink_all, pace=1), Layer(blink_all, pace=1, blend=blend),
+    )
+    steps = blended(compositor, 2)
+    lit = '1' * 12 if blend == 'and' else '0' * 12
+    assert steps[0][1:] == (lit, [int(lit[0]) * 100] * 12)
+    assert steps[1][1:] == ('0' * 12, [0] * 12)
+
+def test_add_saturates():
+    compositor = Compositor(
+        Layer(lambda: iter([[60] * 12]), pace=1),
+        Layer(lambda: iter([[30] * 6 + [60] * 6]), pace=1, blend='add'),
+    )
+    next(compositor.steps())
+    assert compositor.brightnesses() == [90] * 6 + [100] * 6
+    assert compositor.brightnesses(0.5) == [45] * 6 + [50] * 6
+
+def test_layers_change_at_own_pace():
+    compositor = Compositor(
+        Layer(blink_all, pace=1.5),
+        Layer(rotate, pace=0.5, blend='xor',
+            kwargs={'pattern': '100000000000'},
+        ),
+    )
+    assert blended(compositor, 5) == [
+        (0.0, '011111111111', [0] + [100] * 11),
+        (0.5, '101111111111', [100, 0] + [100] * 10),
+        (1.0, '110111111111', [100] * 2 + [0] + [100] * 9),
+        (1.5, '000100000000', [0] * 3 + [100] + [0] * 8),
+        (2.0, '000010000000', [0] * 4 + [100] + [0] * 7),
+    ]
+
+def test_finite_layers_repeat_and_share_buffers():
+    layers = [
+        Layer(rotate, pace=1, kwargs={'clockwise': False}),
+        Layer(rotate, pace=1, kwargs={'clockwise': False}),
+    ]
+    assert layers[0].buffered_rows() is layers[1].buffered_rows()
+    steps = blended(Compositor(layers[0]), 13)
+    assert steps[12][1] == steps[0][1]
+
+def test_streamed_layer():
+    compositor = Compositor(
+        Layer(random_flip, pace=1, kwargs={'light_pattern': '0' * 12}),
+    )
+    steps = blended(compositor, 20)
+    for (_, before, _), (_, after, _) in zip(steps, steps[1:]):
+        flipped = [a != b for a, b in zip(before, after)]
+        assert flipped.count(True) == 1
+
+def test_brightness_layer_from_frame_arrays():
+    fade = frame_arrays.as_sequence(frame_arrays.fade, brightness=True)
+    compositor = Compositor(
+        Layer(fade, pace=1, kwargs={'start': 0, 'end': 100, 'steps': 3}),
+    )
+    assert [levels[0] for _, _, levels in blended(compositor, 4)] == [
+        0, 50, 100, 0,
+    ]
+    assert blended(compositor, 1)[0][1] == '0' * 12
+
+def test_blend_does_not_allocate_levels():
+    compositor = Compositor(
+        Layer(blink_all, pace=1), Layer(blink_all, pace=2, blend='add'),
+    )
+    lit, levels = compositor.lit, compositor.levels
+    list(itertools.islice(compositor.steps(), 4))
+    assert compositor.lit is lit and compositor.levels is levels
+    assert isinstance(compositor.levels, np.ndarray)
+
+def test_invalid_layers():
+    with pytest.raises(ValueError, match="blend"):
+        Layer(blink_all, pace=1, blend='multiply')
+    with pytest.raises(ValueError, match="pace"):
+        Layer(blink_all, pace=0)
+    with pytest.raises(ValueError, match="no frames"):
+        next(Compositor(Layer(lambda: iter([]), pace=1)).steps())
+    with pytest.raises(ValueError):
+        Compositor()
+
+class FakeLights:
+    brightness_factor = 0.5
+
+    def __init__(self):
+        self.log = []
+
+    def set_relays(self, light_pattern, special=None):
+        self.log.append(str(light_pattern))
+
+    def set_dimmers(self, pattern=None, brightnesses=None, **kwargs):
+        self.log.append(brightnesses or pattern)
+
+class FakePlayer:
+    speed_factor = 1.0
+
+    def __init__(self, frames):
+        self.lights = FakeLights()
+        self.frames = frames
+
+    def wait_until(self, deadline_ns):
+        if len(self.lights.log) > self.frames:
+            raise StopIteration
+
+def play_layers_mode(special):
+    player = FakePlayer(frames=2)
+    mode = PlayLayersMode(
+        player, 'layers',
+        layers=(
+            Layer(blink_all, pace=1e-3),
+            Layer(two('1' + '0' * 11, '0' * 12), pace=1e-3, blend='xor'),
+        ),
+        special=special() if special else None,
+    )
+    with pytest.raises(StopIteration):
+        mode.execute()
+    return player.lights.log
+
+def test_play_layers_mode_sets_relays():
+    assert play_layers_mode(None) == [
+        'AAAAAAAAAAAA', '0' + '1' * 11, '0' * 12,
+    ]
+
+def test_play_layers_mode_sets_dimmers():
+    assert play_layers_mode(DimmerParams)[1:] == [[0] + [50] * 11, [0] * 12]
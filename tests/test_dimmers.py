@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import dimmers
+
+from shelly_stand_in import StandInShelly, wait_for
+
+def test_set_coalesces_unsent_commands():
+    shelly = StandInShelly()
+    dimmer = dimmers.ShellyProDimmer2PM(0, shelly.address, transport='http')
+    try:
+        channel = dimmer.channels[0]
+        shelly.delay = 0.2
+        channel.set(brightness=30)
+        wait_for(lambda: 'Light.Set' in shelly.http_calls)
+        for brightness in range(31, 40):
+            channel.set(brightness=brightness)
+        assert channel.brightness == 39
+        wait_for(lambda: channel.sent_count == 2)
+        assert channel.coalesced_count == 8
+        assert shelly.brightness[0] == 39
+        assert shelly.http_calls.count('Light.Set') == 2
+    finally:
+        dimmers.ShellyDimmer.close_all()
+
+def test_submit_latest_completes_once_sent():
+    shelly = StandInShelly()
+    dimmer = dimmers.ShellyProDimmer2PM(0, shelly.address, transport='http')
+    try:
+        commands = [
+            channel.make_set_command(brightness=70, transition=1.0)
+            for channel in dimmer.channels
+        ]
+        dimmers.ShellyDimmer.submit_latest(commands).result(timeout=2)
+        assert shelly.brightness == {0: 70, 1: 70}
+        assert [c.sent_count for c in dimmer.channels] == [1, 1]
+    finally:
+        dimmers.ShellyDimmer.close_all()
+
+def test_dimmers_created_at_once_share_one_event_loop():
+    shellies = [StandInShelly() for _ in range(6)]
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        created = list(pool.map(
+            lambda item: dimmers.ShellyProDimmer2PM(
+                item[0], item[1].address, transport='http',
+            ),
+            enumerate(shellies),
+        ))
+    try:
+        assert len({id(d.transport.event_loop) for d in created}) == 1
+        assert dimmers.ShellyDimmer._dimmers == created
+    finally:
+        dimmers.ShellyDimmer.close_all()
+    assert dimmers.ShellyDimmer._dimmers == []
@@ -0,0 +1,56 @@
+from concurrent.futures import Future
+import threading
+import time
+
+import executors
+from executors import Executor, start_devices
+
+def test_start_devices_concurrently():
+    def slow_device(name):
+        def create():
+            time.sleep(0.2)
+            return name
+        return create
+    start = time.monotonic()
+    devices = start_devices({
+        name: slow_device(name) for name in ("a", "b", "c", "d")
+    })
+    assert time.monotonic() - start < 0.5
+    assert devices == {"a": "a", "b": "b", "c": "c", "d": "d"}
+
+class ClosingDevice:
+    def __init__(self, log, name):
+        self.log, self.name = log, name
+
+    def close(self):
+        self.log.append(self.name)
+
+def test_close_closes_devices_after_player(monkeypatch):
+    log = []
+    monkeypatch.setattr(
+        executors.ShellyDimmer, 'close_all', lambda: log.append('dimmers'),
+    )
+    executor = Executor(None, None)
+    executor.player = ClosingDevice(log, 'player')
+    executor.bells = ClosingDevice(log, 'bells')
+    executor.drums = ClosingDevice(log, 'drums')
+    executor.lights = ClosingDevice(log, 'lights')
+    executor.close()
+    assert log == ['player', 'dimmers', 'bells', 'drums', 'lights']
+
+def test_close_without_player_or_devices(monkeypatch):
+    monkeypatch.setattr(executors.ShellyDimmer, 'close_all', lambda: None)
+    Executor(None, None).close()
+
+def test_off_waits_for_relays():
+    future = Future()
+
+    class Lights:
+        def set_relays(self, light_pattern, extra_pattern):
+            threading.Timer(0.05, future.set_result, (None,)).start()
+            return future
+
+    executor = Executor(None, None)
+    executor.lights = Lights()
+    executor.command_off()
+    assert future.done()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import frame_arrays
+from frame_arrays import as_sequence, brightness_lists, patterns
+import sequences
+
+@pytest.mark.parametrize('name, kwargs', [
+    ('rotate', {}),
+    ('rotate', {'pattern': '110000100000', 'clockwise': False}),
+    ('build', {}),
+    ('build', {'pattern': '0', 'rows': False, 'from_top_left': False}),
+    ('each_row', {'pattern': '0'}),
+    ('rotate_sides', {'clockwise': False}),
+    ('opposite_corner_pairs', {}),
+])
+def test_frames_match_sequences(name, kwargs):
+    frames = getattr(frame_arrays, name)(**kwargs)
+    assert frames.dtype == np.uint8
+    assert patterns(frames) == list(getattr(sequences, name)(**kwargs))
+
+def test_random_flip():
+    start = '101010101010'
+    frames = frame_arrays.random_flip(
+        start, 1000, rng=np.random.default_rng(1),
+    )
+    changed = frames ^ np.vstack([frame_arrays._row(start), frames[:-1]])
+    assert (changed.sum(axis=1) == 1).all()
+    lights = changed.argmax(axis=1)
+    assert (lights[1:] != lights[:-1]).all()
+    assert set(lights) == set(range(12))
+
+def test_random_flip_start_blank():
+    frames = frame_arrays.random_flip_start_blank(
+        100, pattern='0', rng=np.random.default_rng(2),
+    )
+    assert (frames.sum(axis=1) == 11).all()
+
+def test_brightness_frames():
+    assert brightness_lists(frame_arrays.fade(0, [100] * 6 + [50] * 6, 3)) == [
+        [0] * 12, [50] * 6 + [25] * 6, [100] * 6 + [50] * 6,
+    ]
+    rotated = frame_arrays.rotate([90] + [10] * 11)
+    assert rotated.shape == (12, 12)
+    assert (rotated.max(axis=1) == 90).all()
+    assert brightness_lists(
+        frame_arrays.brightnesses(frame_arrays.each_row()[:1], 80, 5)
+    ) == [[80, 80, 80] + [5] * 9]
+
+def test_as_sequence():
+    rotate = as_sequence(frame_arrays.rotate)
+    assert rotate.__name__ == 'rotate'
+    assert list(rotate(pattern='1' * 6 + '0' * 6)) == list(
+        sequences.rotate(pattern='1' * 6 + '0' * 6)
+    )
+    assert sequences.frame_buffer(
+        as_sequence(frame_arrays.random_flip),
+        {'light_pattern': '0' * 12, 'count': 10},
+    ) is None
+    fades = as_sequence(frame_arrays.fade, brightness=True)
+    assert next(fades(start=0, end=100, steps=2)) == [0] * 12
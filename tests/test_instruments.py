@@ -1,3 +1,5 @@
+import time
+
 
 from instruments import *
 from relays import *
@@ -20,3 +22,48 @@ ri = RI(relays=RMI())
 ri.pattern = "01010101"
 assert ri.select_relays('0', 4) == {0, 2, 4, 6}
 assert ri.select_relays('1', 4) == {1, 3, 5, 7}
+
+class RecordingRelays(RMI):
+    def __init__(self):
+        self.log = []
+    def set_state_of_devices(self, p):
+        self.log.append((str(p), time.monotonic()))
+
+def test_bell_strikes_release_without_blocking():
+    relays = RecordingRelays()
+    bells = BellSet(relays)
+    start = time.monotonic()
+    bells.play({0})
+    assert time.monotonic() - start < 0.02
+    time.sleep(0.05)
+    bells.play({3})
+    time.sleep(0.2)
+    expected = [
+        ('10000000', 0.0),
+        ('10010000', 0.05),
+        ('00010000', 0.1),
+        ('00000000', 0.15),
+    ]
+    assert [p for p, _ in relays.log[1:]] == [p for p, _ in expected]
+    for (_, t), (_, due) in zip(relays.log[1:], expected):
+        assert abs(t - start - due) < 0.02
+
+def test_drum_hits_merge_into_one_write():
+    relays = RecordingRelays()
+    relays.relay_count = 16
+    relays.get_state_of_devices = lambda: "0" * 16
+    drums = DrumSet(relays)
+    drums.play_hits(((1, {0}), (1, {0})))
+    assert len(relays.log) == 2  # Initial reset, then one write
+    assert drums.pattern.count() == 8
+
+def test_bell_close_releases_pending_strikes():
+    relays = RecordingRelays()
+    closed = []
+    relays.close = lambda: closed.append(relays.log[-1][0])
+    bells = BellSet(relays)
+    bells.play({2, 5})
+    bells.close()
+    assert not bells._releaser.is_alive()
+    assert [p for p, _ in relays.log[1:]] == ['00100100', '00000000']
+    assert closed == ['00000000']
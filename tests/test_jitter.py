@@ -0,0 +1,62 @@
+from concurrent.futures import Future
+
+from jitter import JitterRecorder
+from schedulers import NS_PER_SECOND
+
+MS = NS_PER_SECOND // 1000
+
+def test_frames_and_late_iterations():
+    r = JitterRecorder("test")
+    for frame in range(10):
+        intended = frame * 100 * MS
+        if frame:
+            # Frame 5's iteration runs 30 ms past frame 6's intended time.
+            r.end_iteration(intended + (30 * MS if frame == 6 else -50 * MS), intended)
+        r.dispatch(intended, intended + frame * MS)
+    r.abandon()
+    assert r.count == 10
+    assert [r.lateness[i] > 0 for i in r.frames()].count(True) == 1
+    assert r.iteration_end[9] == 0
+    assert str(r) == (
+        "test: n=10 jitter p50=5.0 p95=9.0 max=9.0 ms, "
+        "loop p95=125.0 ms, 1 late iterations (max 30.0 ms)"
+    )
+
+def test_ring_buffer_keeps_most_recent():
+    r = JitterRecorder("test", size=4)
+    for frame in range(10):
+        r.dispatch(frame, frame + 1)
+    assert r.count == 10
+    assert sorted(r.intended[i] for i in r.frames()) == [6, 7, 8, 9]
+
+def test_report_all():
+    JitterRecorder.reset_all()
+    JitterRecorder.named("signs").dispatch(0, MS)
+    assert JitterRecorder.named("signs") is JitterRecorder.named("signs")
+    assert JitterRecorder.report_all() == ["signs: n=1 jitter p50=1.0 p95=1.0 max=1.0 ms"]
+    JitterRecorder.reset_all()
+    assert JitterRecorder.report_all() == []
+
+def test_device_completion_and_overruns():
+    r = JitterRecorder("test")
+    futures = []
+    for frame in range(3):
+        r.end_iteration(frame * 100 * MS, frame * 100 * MS)
+        r.dispatch(frame * 100 * MS, frame * 100 * MS)
+        futures.append(Future())
+        r.track(futures[-1])
+    untracked = Future()
+    r.abandon()
+    r.track(untracked)
+    for future in futures:
+        future.set_result(None)
+    untracked.set_result(None)
+    assert all(r.completed[i] for i in r.frames())
+    r.completed[0] = 130 * MS  # Past frame 1's intended time
+    r.completed[1] = 150 * MS
+    r.completed[2] = 260 * MS  # Latest; no next frame to overrun
+    assert str(r) == (
+        "test: n=3 jitter p50=0.0 p95=0.0 max=0.0 ms, "
+        "device p95=130.0 ms, 1 overruns (max 30.0 ms), "
+        "loop p95=100.0 ms, 0 late iterations"
+    )
@@ -0,0 +1,40 @@
+import pytest
+
+from latency import BUCKET_MINIMUM, LatencyHistogram
+
+def test_percentiles():
+    h = LatencyHistogram("test")
+    for ms in range(1, 101):
+        h.record(ms / 1000)
+    assert h.count == 100
+    assert h.max == 0.1
+    assert h.percentile(50) == pytest.approx(0.050, rel=0.1)
+    assert h.percentile(95) == pytest.approx(0.095, rel=0.1)
+    assert h.percentile(99) == pytest.approx(0.099, rel=0.1)
+    assert h.percentile(100) == 0.1
+
+def test_out_of_range_samples():
+    h = LatencyHistogram("test")
+    h.record(0.0)
+    h.record(60.0)
+    assert h.percentile(50) == BUCKET_MINIMUM
+    assert h.percentile(100) == 60.0
+
+def test_measure_timeout():
+    h = LatencyHistogram("test")
+    with h.measure():
+        pass
+    with pytest.raises(TimeoutError):
+        with h.measure():
+            raise TimeoutError
+    assert (h.count, h.timeouts) == (1, 1)
+    assert "1 timeouts" in str(h)
+
+def test_named_and_report():
+    LatencyHistogram.reset_all()
+    h = LatencyHistogram.named("test board")
+    assert LatencyHistogram.named("test board") is h
+    h.record(0.002)
+    assert any(line.startswith("test board: n=1") for line in LatencyHistogram.report_all())
+    LatencyHistogram.reset_all()
+    assert not any(line.startswith("test board") for line in LatencyHistogram.report_all())
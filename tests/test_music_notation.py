@@ -0,0 +1,39 @@
+import pytest
+
+from music.music_notation import (
+    _interpret_symbols, _parse_symbols, bell, drum,
+    drum_accent_map, drum_pitch_map,
+)
+from music.music_implementation import BellNote, DrumNote, Rest
+
+def test_interpret_symbols():
+    assert _interpret_symbols('♩\U0001D161') == (1.25, set(), 0, False)  # ♩𝅘𝅥𝅯
+    assert _interpret_symbols('3♪') == (1/3, set(), 0, False)
+    assert _interpret_symbols('𝄻 𝄽') == (5, set(), 0, True)
+    assert _interpret_symbols(
+        'h3l♩>^', accent_map=drum_accent_map, pitch_map=drum_pitch_map,
+    ) == (2/3, {0, 1}, 3, False)
+
+@pytest.mark.parametrize('symbols, message', [
+    ('', 'empty'),
+    ('h>', 'empty'),
+    ('♩h', 'Invalid symbol'),
+    ('♩3', 'Invalid symbol'),
+    ('♩𝄻', 'Cannot mix'),
+])
+def test_interpret_symbols_invalid(symbols, message):
+    with pytest.raises(ValueError, match=message):
+        _interpret_symbols(
+            symbols, accent_map=drum_accent_map, pitch_map=drum_pitch_map,
+        )
+
+def test_interpret_symbols_is_cached():
+    _parse_symbols.cache_clear()
+    assert drum('lh♪>') == drum('lh♪>') == DrumNote(0.5, 2, {0, 1})
+    assert _parse_symbols.cache_info().hits == 1
+
+def test_notes():
+    assert bell('aD♩') == BellNote(1, {3, 0})
+    assert bell('𝄾') == Rest(0.5)
+    with pytest.raises(ValueError, match="pitch"):
+        bell('♩')
@@ -0,0 +1,437 @@
+import io
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from definitions import ActionParams, DimmerParams, SongRange
+from music import (
+    act, compile_sections, dimmer_sequence_flip, drum, light, measure, part,
+    play, play_timeline, section, sequence_measure, set_player,
+)
+import modes
+import music.music_implementation
+from music.music_implementation import BellNote, DrumNote, NoteGroup
+from schedulers import NS_PER_SECOND
+from sequences import random_each
+
+TOLERANCE = 0.015  # seconds of scheduling error allowed
+
+def approx(seconds):
+    return pytest.approx(seconds, abs=TOLERANCE)
+
+class FakeDrums:
+    def __init__(self, log):
+        self.log = log
+        self.jitter = 0.0
+
+    def play(self, accent, pitches):
+        self.play_hits(((accent, pitches),))
+
+    def play_hits(self, hits):
+        self.log.append(('drums', time.monotonic()))
+        self.hits = hits
+        time.sleep(self.jitter)
+
+class FakeBells:
+    def __init__(self, log):
+        self.log = log
+
+    def play(self, pitches):
+        self.log.append(('bells', time.monotonic()))
+        self.pitches = pitches
+
+class FakePlayer:
+    """Records when each device is driven; waits like Player.wait_until."""
+
+    def __init__(self, leads):
+        self.log = []
+        self.patterns = []
+        self.leads = leads
+        self.pace = 0.0
+        self.speed_factor = 1.0
+        self.drums = FakeDrums(self.log)
+        self.bells = FakeBells(self.log)
+        self.lights = self
+
+    def set_relays(self, light_pattern, special=None):
+        device = 'dimmers' if isinstance(special, DimmerParams) else 'lights'
+        self.log.append((device, time.monotonic()))
+        self.patterns.append(light_pattern)
+
+    def lead_time(self, device):
+        return self.leads.get(device, 0.0)
+
+    def wait_until(self, deadline_ns):
+        duration = (deadline_ns - time.monotonic_ns()) / NS_PER_SECOND
+        if duration > 0:
+            time.sleep(duration)
+
+def play_beats(leads):
+    player = FakePlayer(leads)
+    set_player(player)
+    start = time.monotonic()
+    play(
+        measure(drum('h♩'), drum('h♩'), beats=2),
+        measure(
+            act('♩', light('1' * 12, DimmerParams())),
+            act('♩', light('0' * 12)),
+            beats=2,
+        ),
+        tempo=300,  # 0.2 s per beat
+    )
+    return [(device, approx(t - start)) for device, t in player.log]
+
+def test_play_without_lead():
+    assert play_beats({}) == [
+        ('drums', 0.0), ('drums', 0.2), ('dimmers', 0.4), ('lights', 0.6),
+    ]
+
+def test_play_issues_devices_ahead_by_lead_time():
+    assert play_beats({'dimmers': 0.05, 'lights': 0.1}) == [
+        ('drums', 0.0), ('drums', 0.2), ('dimmers', 0.35), ('lights', 0.5),
+    ]
+
+def test_play_does_not_drift_with_jitter():
+    player = FakePlayer({})
+    player.drums.jitter = 0.015  # Each drum action overruns by 15 ms
+    set_player(player)
+    start_ns = time.monotonic_ns()
+    end_ns = start_ns
+    for _ in range(2):
+        end_ns = play(
+            measure(*(drum('h♪') for _ in range(16)), beats=8),
+            tempo=480,  # 0.0625 s per eighth
+            start_ns=end_ns,
+        )
+    assert end_ns == start_ns + 2 * NS_PER_SECOND
+    assert abs(time.monotonic_ns() - end_ns) < 0.01 * NS_PER_SECOND
+    last_drum = player.log[-1][1] * NS_PER_SECOND - start_ns
+    assert abs(last_drum - 1.9375 * NS_PER_SECOND) < 0.01 * NS_PER_SECOND
+
+def test_play_generates_sequence_patterns_as_played():
+    player = FakePlayer({})
+    set_player(player)
+    generated = []
+
+    def counting():
+        for i in range(4):
+            generated.append(time.monotonic())
+            yield f'{i:012b}'
+
+    start = time.monotonic()
+    play(
+        measure(drum('h♩'), beats=1),
+        sequence_measure('♩', 4, counting, beats=4),
+        tempo=600,  # 0.1 s per beat
+    )
+    played = [t - start for _, t in player.log]
+    assert played == [approx(t) for t in (0.0, 0.1, 0.2, 0.3, 0.4)]
+    # Each pattern is generated only once the event before it is played.
+    assert [t - start for t in generated] == [approx(t) for t in played[:-1]]
+
+def test_play_repeats_first_pass_of_random_sequence():
+    player = FakePlayer({})
+    set_player(player)
+    calls = []
+
+    def shuffled():
+        calls.append(None)
+        lights = list(range(12))
+        random.shuffle(lights)
+        for light in lights[:3]:
+            yield '0' * light + '1' + '0' * (11 - light)
+
+    play(sequence_measure('♩', 9, shuffled, beats=9), tempo=1200)
+    assert player.patterns[3:6] == player.patterns[6:] == player.patterns[:3]
+    assert len(calls) == 1
+
+def test_note_group_merges_notes_per_device():
+    player = FakePlayer({})
+    set_player(player)
+    NoteGroup((
+        DrumNote(0, accent=0, pitches={0}),
+        BellNote(0, pitches={1}),
+        act('♩', light('0' * 12)),
+        DrumNote(0, accent=2, pitches={1}),
+        BellNote(0, pitches={5}),
+    )).play(player)
+    assert sorted(device for device, _ in player.log) == [
+        'bells', 'drums', 'lights',
+    ]
+    assert player.drums.hits == ((0, {0}), (2, {1}))
+    assert player.bells.pitches == {1, 5}
+
+class Song:
+    """Song whose source is hashed for the timeline cache."""
+    builds = 0
+
+    @classmethod
+    def sections(cls):
+        cls.builds += 1
+        return [
+            section(
+                part(measure(drum('h♩'), drum('l♩'), beats=2)),
+                part(measure(
+                    act('♩', light('1' * 12, DimmerParams())), beats=2,
+                )),
+                beats=2,
+                tempo=300,
+            ),
+            section(
+                part(measure(act('♩', light(
+                    [0, 1], ActionParams(action=dimmer_sequence_flip(1)),
+                )), beats=1)),
+                beats=1,
+                tempo=60,
+            ),
+        ]
+
+def test_compiled_timeline_is_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    timeline = compile_sections(Song.sections, Song)
+    assert [(e.time, e.device) for e in timeline.events] == [
+        (0.0, 'dimmers'), (0.0, 'drums'), (0.2, 'drums'), (0.4, 'dimmers'),
+    ]
+    assert timeline.duration == 1.4
+    assert compile_sections(Song.sections, Song) is timeline
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    from_disk = compile_sections(Song.sections, Song)
+    assert from_disk is not timeline
+    assert [e.time for e in from_disk.events] == [0.0, 0.0, 0.2, 0.4]
+    assert Song.builds == 1
+    compile_sections(Song.sections, Song, tempo=120)
+    assert Song.builds == 2
+
+class RandomSong:
+    """Song with a streamed (random) sequence."""
+    builds = 0
+
+    @classmethod
+    def sections(cls):
+        cls.builds += 1
+        return [section(
+            part(sequence_measure('♩', 4, random_each)), tempo=600,
+        )]
+
+def test_streamed_timeline_is_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    player = FakePlayer({})
+    set_player(player)
+    first = compile_sections(RandomSong.sections, RandomSong)
+    assert len(first.events) == 4
+    assert compile_sections(RandomSong.sections, RandomSong) is first
+    assert RandomSong.builds == 1
+    assert len(list(tmp_path.iterdir())) == 1
+    # Patterns are drawn as played, each a different light.
+    assert player.patterns == []
+    play_timeline(first)
+    assert len({light for light, in player.patterns}) == 4
+
+def test_signs_song_timeline_is_cached(monkeypatch, tmp_path):
+    from signs_song import SignsSong
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    song = object.__new__(SignsSong)
+    first = compile_sections(song.sections, SignsSong, tempo=75)
+    assert compile_sections(song.sections, SignsSong, tempo=75) is first
+    assert len(first.events) == 265
+    compile_sections(song.sections, SignsSong, tempo=75)  # Now complete
+    assert len(list(tmp_path.iterdir())) == 1
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    from_disk = compile_sections(song.sections, SignsSong, tempo=75)
+    assert from_disk is not first
+    assert len(from_disk.events) == len(first.events)
+
+def test_play_timeline_compiles_events_as_played(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    generated = []
+
+    def counting():
+        for i in range(8):
+            generated.append(i)
+            yield f'{i:012b}'
+
+    timeline = compile_sections(
+        lambda: [section(
+            part(sequence_measure('♩', 8, counting, beats=8)),
+            beats=8,
+            tempo=1200,  # 0.05 s per beat
+        )],
+        counting,
+    )
+    assert generated == []
+    player = PatternLog({})
+    issued = []
+    player.set_relays = lambda light_pattern, special=None: issued.append(
+        (len(generated), timeline.complete)
+    )
+    set_player(player)
+    play_timeline(timeline)
+    assert issued[0] == (1, False)
+    assert len(issued) == 8 and timeline.complete
+    assert len(list(tmp_path.iterdir())) == 1
+
+def test_timeline_key_covers_referenced_modules(monkeypatch):
+    key = music.music_implementation._timeline_key(Song, 0)
+    original = open
+    def edited(path, *args, **kwargs):
+        f = original(path, *args, **kwargs)
+        if path.endswith('sequences.py'):
+            return io.BytesIO(f.read() + b'# edited')
+        return f
+    music.music_implementation._code_digest.cache_clear()
+    monkeypatch.setattr('builtins.open', edited)
+    try:
+        assert music.music_implementation._timeline_key(Song, 0) != key
+    finally:
+        music.music_implementation._code_digest.cache_clear()
+
+def test_play_timeline(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    player = FakePlayer({})
+    set_player(player)
+    timeline = compile_sections(
+        lambda: [section(
+            part(measure(drum('h♩'), drum('l♩'))), beats=2, tempo=300,
+        )],
+        FakePlayer,
+    )
+    start = time.monotonic()
+    play_timeline(timeline)
+    assert [(d, approx(t - start)) for d, t in player.log] == [
+        ('drums', 0.0), ('drums', 0.2),
+    ]
+
+def four_measures():
+    """Each measure sets the lights, then sounds a drum."""
+    return [section(
+        part(*(
+            measure(act('♩', light(f'{m:012b}')), drum('h♩'), beats=2)
+            for m in range(4)
+        )),
+        beats=2,
+        tempo=600,  # 0.1 s per beat
+    )]
+
+class PatternLog(FakePlayer):
+    def set_relays(self, light_pattern, special=None):
+        self.log.append((light_pattern, time.monotonic()))
+
+def play_range(monkeypatch, tmp_path, **kwargs):
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    player = PatternLog({})
+    set_player(player)
+    timeline = compile_sections(four_measures, PatternLog)
+    start = time.monotonic()
+    end_ns = play_timeline(timeline, **kwargs)
+    return timeline, player, start, end_ns
+
+def test_timeline_measure_starts(monkeypatch, tmp_path):
+    timeline, _, _, _ = play_range(monkeypatch, tmp_path, end=0.0)
+    assert timeline.measure_starts == (0.0, 0.2, 0.4, 0.6000000000000001)
+    assert timeline.measure_start(2) == 0.2
+    assert timeline.measure_start(5) == timeline.duration
+    with pytest.raises(ValueError, match="measure 6"):
+        timeline.measure_start(6)
+
+def test_play_timeline_seeks_and_restores_state(monkeypatch, tmp_path):
+    timeline, player, start, end_ns = play_range(
+        monkeypatch, tmp_path,
+        start=timeline_start(3), end=timeline_start(4),
+    )
+    assert [(d, approx(t - start)) for d, t in player.log] == [
+        ('000000000001', 0.0),  # Restored state at the end of measure 2
+        ('000000000010', 0.0),
+        ('drums', 0.1),
+    ]
+    assert abs(end_ns / NS_PER_SECOND - start - 0.2) < 0.01
+
+def timeline_start(measure):
+    return (measure - 1) * 0.2
+
+def test_play_timeline_loops(monkeypatch, tmp_path):
+    player = PatternLog({})
+
+    def stop_after_two_passes(deadline_ns):
+        FakePlayer.wait_until(player, deadline_ns)
+        if len(player.log) == 6:
+            raise StopIteration
+
+    player.wait_until = stop_after_two_passes
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    set_player(player)
+    timeline = compile_sections(four_measures, PatternLog)
+    start = time.monotonic()
+    with pytest.raises(StopIteration):
+        play_timeline(timeline, start=0.2, end=0.4, loop=True)
+    assert [(d, approx(t - start)) for d, t in player.log] == [
+        ('000000000000', 0.0),
+        ('000000000001', 0.0),
+        ('drums', 0.1),
+        ('000000000000', 0.2),
+        ('000000000001', 0.2),
+        ('drums', 0.3),
+    ]
+
+def test_play_timeline_follows_speed_change(monkeypatch, tmp_path):
+    player = PatternLog({})
+
+    def slow_down(pattern):
+        player.speed_factor = 2.0
+
+    monkeypatch.setattr(
+        music.music_implementation, 'TIMELINE_CACHE_DIR', str(tmp_path),
+    )
+    monkeypatch.setattr(music.music_implementation, '_timelines', {})
+    set_player(player)
+    start = time.monotonic()
+    play(
+        measure(
+            drum('h♩'), act('♩', light('0' * 12, ActionParams(slow_down))),
+            drum('h♩'), drum('h♩'), beats=4,
+        ),
+        tempo=600,  # 0.1 s per beat
+    )
+    assert [(d, approx(t - start)) for d, t in player.log] == [
+        ('drums', 0.0), ('drums', 0.3), ('drums', 0.5),  # 0.2 s per beat
+    ]
+    assert approx(time.monotonic() - start) == 0.7
+
+def play_song_range(monkeypatch, song_range):
+    played = []
+    monkeypatch.setattr(
+        modes, 'play_timeline',
+        lambda timeline, start, end, loop: played.append((start, end)),
+    )
+    mode = SimpleNamespace(player=SimpleNamespace(song_range=song_range))
+    timeline = music.music_implementation.Timeline((), 3.0, (0.0, 1.0, 2.0))
+    modes.PlayMusicMode.play_song(mode, timeline)
+    return played
+
+def test_play_song_clamps_range_to_song(monkeypatch):
+    assert play_song_range(monkeypatch, SongRange(2, 10)) == [(1.0, 3.0)]
+    assert play_song_range(monkeypatch, SongRange(3)) == [(2.0, 3.0)]
+    with pytest.raises(ValueError, match="3 measures; cannot start at measure 4"):
+        play_song_range(monkeypatch, SongRange(4))
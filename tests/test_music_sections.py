@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+from music import (
+    measure, part, section, sequence, sequence_measure, set_player,
+)
+from music import drum as drum_note
+from music.music_implementation import (
+    DrumNote, Measure, NoteGroup, Rest, Section,
+)
+from sequences import rotate, streamed
+
+def drum(duration, pitch=0):
+    return DrumNote(duration, accent=0, pitches={pitch})
+
+def test_merge_concurrent_measures():
+    merged = Section._merge_concurrent_measures((
+        Measure((drum(1), drum(1), Rest(2)), beats=4),
+        Measure((Rest(0.5), drum(0.5, 1), drum(1, 1)), beats=4),
+        Measure((drum(2),), beats=4),
+    ))
+    assert merged == Measure((
+        NoteGroup((drum(0), drum(0))),
+        Rest(0.5),
+        drum(0, 1),
+        Rest(0.5),
+        NoteGroup((drum(0), drum(0, 1))),
+        Rest(3),
+    ), beats=4)
+
+def test_merge_orders_group_notes_by_part():
+    merged = Section._merge_concurrent_measures((
+        Measure((Rest(1), drum(1, 1)), beats=2),
+        Measure((drum(1), drum(1)), beats=2),
+    ))
+    assert merged.elements[-2] == NoteGroup((drum(0, 1), drum(0)))
+
+def test_merge_empty_measures():
+    merged = Section._merge_concurrent_measures((
+        Measure((), beats=3), Measure((), beats=3),
+    ))
+    assert merged == Measure((Rest(3),), beats=3)
+
+def test_sequence_measure_expands_lazily():
+    yielded = []
+
+    def counting(*, length):
+        for i in range(length):
+            yielded.append(i)
+            yield f'{i:012b}'
+
+    seq = sequence_measure('♩', 6, counting, beats=6, length=4)
+    assert yielded == []
+    steps = seq.each_element()
+    first = next(steps)
+    assert yielded == [0]
+    assert first.actions[0].func.args[0] == '000000000000'
+    rest = list(steps)
+    assert len(rest) == 5
+    # Cycled from the first pass, rather than restarted.
+    assert yielded == [0, 1, 2, 3]
+    assert rest[-1].actions[0].func.args[0] == '000000000001'
+    assert rest[-1] is rest[0]  # Note made once per pattern
+
+def test_sequence_measure_restarts_streamed_sequence():
+    yielded = []
+
+    @streamed
+    def counting(*, length):
+        for i in range(length):
+            yielded.append(i)
+            yield f'{i:012b}'
+
+    played = []
+    set_player(SimpleNamespace(lights=SimpleNamespace(
+        set_relays=lambda light_pattern, special: played.append(light_pattern),
+    )))
+    seq = sequence_measure('♩', 6, counting, beats=6, length=4)
+    steps = list(seq.each_element())
+    assert yielded == []  # Drawn only as played
+    for step in steps:
+        step.play(None)
+    # Restarted rather than cycled, so no pattern is retained.
+    assert yielded == [0, 1, 2, 3, 0, 1]
+    assert played[-1] == '000000000001'
+
+def patterns_of(seq_measure):
+    return [e.actions[0].func.args[0] for e in seq_measure.each_element()]
+
+def test_sequence_measure_plays_cached_cycle_from_offset():
+    calls = []
+
+    def twice(*, pattern):
+        calls.append(pattern)
+        yield from rotate(pattern=pattern)
+        yield from rotate(pattern=pattern)
+
+    seq = sequence_measure(
+        '♩', 8, twice, beats=8, offset=22, pattern='100000100000',
+    )
+    cycle = [
+        '100000100000', '010000010000', '001000001000',
+        '000100000100', '000010000010', '000001000001',
+    ]
+    assert [str(p) for p in patterns_of(seq)] == cycle[4:] + cycle
+    again = sequence_measure('♩', 2, twice, beats=2, pattern='100000100000')
+    assert [str(p) for p in patterns_of(again)] == cycle[:2]
+    assert calls == ['100000100000']
+
+def test_sequence_starts_at_offset():
+    seq = sequence(rotate, offset=13, pattern='100000000000')
+    assert str(next(seq.iter)) == '010000000000'
+
+def test_section_merges_sequence_measures():
+    merged = section(
+        part(sequence_measure(
+            '♪', 4, lambda: iter(['1' * 12, '0' * 12]), beats=2,
+        )),
+        part(measure(drum_note('h♩'), beats=2)),
+        beats=2,
+    ).measures[0]
+    assert [type(e).__name__ for e in merged.each_element()] == [
+        'NoteGroup', 'Rest', 'ActionNote', 'Rest', 'ActionNote', 'Rest',
+        'ActionNote', 'Rest',
+    ]
@@ -0,0 +1,38 @@
+import pickle
+
+from patterns import Pattern
+
+def test_interned_and_string_compatible():
+    p = Pattern("0110")
+    assert Pattern(0b0110, 4) is p
+    assert Pattern(['0', 1, '1', 0]) is p
+    assert Pattern(p) is p
+    assert p == "0110" and str(p) == "0110" and len(p) == 4
+    assert hash(p) == hash("0110")
+    assert list(p) == ['0', '1', '1', '0']
+    assert p[1] == '1' and p[1:] is Pattern("110")
+    assert Pattern("0110") != Pattern("00110")
+    assert pickle.loads(pickle.dumps(p)) is p
+
+def test_operations():
+    p = Pattern("100000000011")
+    assert p.count() == 3
+    assert ~p == "011111111100"
+    assert p.diff("100000000001") == "000000000010"
+    assert p.flip(0, 1) == "010000000011"
+    assert p + "01" == "10000000001101"
+    assert Pattern.of([0, 11], 12) == "100000000001"
+    assert p.indices() == [0, 10, 11]
+    for n in range(-13, 14):
+        s = str(p)
+        k = n % 12
+        assert p.rotate(n) == s[k:] + s[:k]
+
+def test_immutable():
+    p = Pattern("01")
+    try:
+        p.bits = 3
+    except AttributeError:
+        pass
+    else:
+        assert False
@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from players import Player
+
+class StandInPlayer:
+    """Records what play_sequence does; waits return at once."""
+    speed_factor = 1.0
+
+    def __init__(self):
+        self.log = []
+        self.lights = SimpleNamespace(
+            set_relays=lambda lights, special=None: self.log.append(lights),
+        )
+
+    def wait_until(self, deadline_ns):
+        self.log.append('wait' if deadline_ns is None else 'deadline')
+
+def test_play_sequence_waits_for_button_when_pace_is_none():
+    player = StandInPlayer()
+    Player.play_sequence(
+        player, ['a', 'b'], pace=(None, 0.0), post_delay=None,
+    )
+    assert player.log == ['a', 'wait', 'b', 'deadline', 'wait']
@@ -0,0 +1,189 @@
+import time
+import threading
+
+import pytest
+
+from configuration import ALL_RELAYS
+import relays
+from patterns import Pattern
+from relays import NumatoRL160001, NumatoSSR80001
+
+class FakeSerial:
+    """Echoes commands; reports relay state as set by writeall."""
+
+    def __init__(self, port, timeout):
+        self.written: list[bytes] = []
+        self.state = b'0000'
+        self.response = b''
+        self.garble = False
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.response)
+
+    def reset_input_buffer(self):
+        self.response = b''
+
+    def write(self, data: bytes):
+        self.written.append(data)
+        if data.startswith(b'relay writeall '):
+            self.state = data.split()[2]
+            output = b'\n\r>'
+        else:
+            output = b'\n' + self.state + b'\n\r>'
+        if self.garble:
+            data = data.upper()
+        self.response += data + output
+
+    def read(self, size: int) -> bytes:
+        data, self.response = self.response[:size], self.response[size:]
+        return data
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def lights(monkeypatch):
+    monkeypatch.setattr(relays.serial, 'Serial', FakeSerial)
+    return NumatoRL160001('/dev/null', ALL_RELAYS)
+
+def relays_hex(device_pattern: str) -> str:
+    """Encoding per the device to relay mapping, one device at a time."""
+    value = sum(
+        1 << ALL_RELAYS[d] for d, state in enumerate(device_pattern)
+        if state == '1'
+    )
+    return f"{value:04x}"
+
+@pytest.mark.parametrize('pattern', [
+    '0' * 16, '1' * 16, '1' + '0' * 15, '0' * 15 + '1',
+    '1010110001110100', '0101001110001011',
+])
+def test_write_encoding(lights, pattern):
+    lights.set_state_of_devices(pattern).result()
+    assert lights._serial_port.written[-1] == (
+        f"relay writeall {relays_hex(pattern)}\r".encode()
+    )
+    assert lights.get_state_of_devices() == pattern
+
+def test_list_patterns(lights):
+    lights.set_state_of_devices(['1'] * 4 + [0] * 12).result()
+    assert lights.get_state_of_devices() == '1111' + '0' * 12
+
+def test_default_mapping(monkeypatch):
+    monkeypatch.setattr(relays.serial, 'Serial', FakeSerial)
+    bells = NumatoSSR80001('/dev/null')
+    bells.set_state_of_devices('10000001').result()
+    assert bells._serial_port.written[-1] == b"relay writeall 81\r"
+    bells.set_state_of_devices('01000000').result()
+    assert bells._serial_port.written[-1] == b"relay writeall 02\r"
+
+class BlockingSerial(FakeSerial):
+    """Holds each write until released."""
+
+    def __init__(self, port, timeout):
+        super().__init__(port, timeout)
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, data: bytes):
+        self.writing.set()
+        self.release.wait()
+        super().write(data)
+
+@pytest.mark.parametrize('coalesce', [False, True])
+def test_writes_are_queued(monkeypatch, coalesce):
+    monkeypatch.setattr(relays.serial, 'Serial', BlockingSerial)
+    board = NumatoSSR80001('/dev/null', coalesce=coalesce)
+    port = board._serial_port
+    first = board.set_state_of_devices('10000000')
+    port.writing.wait()
+    # Writer is busy; these queue without blocking the caller.
+    futures = [
+        board.set_state_of_devices(Pattern.of([i], 8)) for i in range(1, 8)
+    ]
+    assert not first.done()
+    port.release.set()
+    for future in futures:
+        future.result(timeout=2)
+    if coalesce:
+        assert port.written == [
+            b"relay writeall 01\r", b"relay writeall 80\r",
+        ]
+        assert board.coalesced_count == 6
+    else:
+        assert len(port.written) == 8
+    assert board.get_state_of_devices() == '00000001'
+    board.close()
+
+def test_streaming_writes(monkeypatch):
+    monkeypatch.setattr(relays.serial, 'Serial', FakeSerial)
+    board = NumatoSSR80001('/dev/null', streaming=True)
+    port = board._serial_port
+    futures = [
+        board.set_state_of_devices(Pattern.of([i], 8)) for i in range(8)
+    ]
+    for future in futures:
+        future.result(timeout=2)
+    assert len(port.written) == 8
+    assert board.resync_count == 0
+    assert board.round_trips.count >= 8
+    assert board.get_state_of_devices() == '00000001'
+    board.close()
+
+def test_streaming_resyncs_on_bad_echo(monkeypatch):
+    monkeypatch.setattr(relays.serial, 'Serial', FakeSerial)
+    board = NumatoSSR80001('/dev/null', streaming=True)
+    port = board._serial_port
+    board.set_state_of_devices('11000000').result(timeout=2)
+    port.garble = True
+    board.set_state_of_devices('00000011').result(timeout=2)
+    port.garble = False
+    assert board.resync_count == 1
+    assert port.written[-1] == b"relay readall\r"
+    assert board.get_state_of_devices() == '00000011'
+    board.close()
+
+class SlowSerial(FakeSerial):
+    def write(self, data: bytes):
+        time.sleep(0.02)
+        super().write(data)
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_close_sends_queued_writes(monkeypatch, streaming):
+    monkeypatch.setattr(relays.serial, 'Serial', SlowSerial)
+    board = NumatoSSR80001('/dev/null', coalesce=True, streaming=streaming)
+    for i in range(4):
+        last = board.set_state_of_devices(Pattern.of([i], 8))
+    board.set_state_of_devices('0' * 8)
+    board.close()
+    assert not board._writer.is_alive()
+    assert board._serial_port.written[-1] == b"relay writeall 00\r"
+    assert last.done()
+    board.close()
+
+class DroppingSerial(FakeSerial):
+    """Loses the next drop writeall commands, echoing garbage."""
+    drop = 0
+
+    def write(self, data: bytes):
+        if self.drop and data.startswith(b'relay writeall '):
+            self.drop -= 1
+            self.written.append(data)
+            self.response += b'?' + data
+            return
+        super().write(data)
+
+def test_streaming_resync_rewrite_leaves_no_echo_behind(monkeypatch):
+    monkeypatch.setattr(relays.serial, 'Serial', DroppingSerial)
+    board = NumatoSSR80001('/dev/null', streaming=True)
+    port = board._serial_port
+    port.drop = 1
+    board.set_state_of_devices('00000011').result(timeout=2)
+    assert board.resync_count == 1
+    assert port.state == b'c0'  # Rewritten by the resync
+    board.set_state_of_devices('00001111').result(timeout=2)
+    board.set_state_of_devices('11110000').result(timeout=2)
+    assert board.resync_count == 1
+    assert board.get_state_of_devices() == '11110000'
+    board.close()
@@ -0,0 +1,16 @@
+import time
+
+from schedulers import DeadlineScheduler, NS_PER_SECOND
+
+def test_deadlines_are_absolute_from_start():
+    schedule = DeadlineScheduler(speed_factor=0.5, start_ns=1000)
+    assert schedule.deadline_ns(0) == 1000
+    assert schedule.deadline_ns(2.0) == 1000 + NS_PER_SECOND
+    # Does not depend on when, or how often, it is asked.
+    time.sleep(0.01)
+    assert schedule.deadline_ns(2.0) == 1000 + NS_PER_SECOND
+
+def test_seconds_until():
+    deadline = time.monotonic_ns() + NS_PER_SECOND
+    assert 0.9 < DeadlineScheduler.seconds_until(deadline) <= 1.0
+    assert DeadlineScheduler.seconds_until(0) < 0
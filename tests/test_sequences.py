@@ -0,0 +1,169 @@
+import itertools
+import operator
+import tracemalloc
+
+import pytest
+
+import sequences
+from sequences import frame_buffer, random_flip, rotate
+
+def test_frame_buffer_is_compiled_once():
+    frames = frame_buffer(rotate, {'pattern': '110000000000'})
+    assert frames == tuple(rotate(pattern='110000000000'))
+    assert frame_buffer(rotate, {'pattern': '110000000000'}) is frames
+    assert frame_buffer(rotate, {'pattern': '100000000000'}) != frames
+
+def test_frame_buffer_streams_random_sequences():
+    assert frame_buffer(random_flip, {'light_pattern': '0' * 12}) is None
+
+def test_frame_buffer_streams_unhashable_kwargs():
+    assert frame_buffer(lambda lights: iter(lights), {'lights': ['1']}) is None
+
+def test_frame_buffer_streams_endless_sequences(monkeypatch):
+    monkeypatch.setattr(sequences, 'FRAME_BUFFER_LIMIT', 10)
+    assert frame_buffer(lambda: itertools.repeat('1' * 12), {}) is None
+
+def strings(combined, n=None):
+    return [str(p) for p in itertools.islice(combined(), n)]
+
+def test_concat():
+    combined = sequences.concat(sequences.blink_all, sequences.even_on)
+    assert strings(combined) == ['1' * 12, '0' * 12, '010101010101']
+    assert combined.length == 3 and not combined.endless
+    assert frame_buffer(combined, {}) == tuple(combined())
+
+def test_repeat():
+    assert strings(sequences.repeat(sequences.blink_all, 2)) == [
+        '1' * 12, '0' * 12, '1' * 12, '0' * 12,
+    ]
+    endless = sequences.repeat(sequences.of(rotate, clockwise=False))
+    assert endless.endless and endless.streamed
+    assert endless.length is None and endless.period == 12
+    assert strings(endless, 14)[12:] == strings(endless, 2)
+    assert sequences.repeat(random_flip_kwargs()).period is None
+    assert strings(sequences.repeat(lambda: iter([]))) == []
+
+def random_flip_kwargs():
+    return sequences.of(random_flip, light_pattern='0' * 12)
+
+def test_reverse():
+    combined = sequences.reverse(sequences.build)
+    assert strings(combined) == strings(sequences.of(sequences.build))[::-1]
+    assert combined.length == 5
+    with pytest.raises(ValueError, match="endless"):
+        sequences.reverse(sequences.repeat(rotate))
+
+def test_interleave_and_stretch():
+    combined = sequences.interleave(
+        sequences.stretch(sequences.blink_all, 2), sequences.even_on,
+    )
+    assert strings(combined) == ['1' * 12, '010101010101']
+    assert combined.length == 2
+    endless = sequences.interleave(
+        sequences.repeat(rotate), sequences.stretch(
+            sequences.repeat(sequences.blink_all), 3,
+        ),
+    )
+    assert endless.period == 2 * 12  # lcm(12, 6)
+
+def test_mapped_and_take():
+    combined = sequences.take(sequences.mapped(rotate), 2)
+    assert strings(combined) == ['011111111111', '101111111111']
+    assert combined.length == 2 and not combined.endless
+    assert sequences.take(random_flip_kwargs(), 5).streamed
+
+def test_overlay():
+    combined = sequences.overlay(
+        rotate, sequences.of(rotate, clockwise=False),
+    )
+    assert strings(combined, 3) == [
+        '100000000000', '010000000001', '001000000010',
+    ]
+    assert combined.length == 12
+    anded = sequences.overlay(
+        sequences.repeat(sequences.blink_all), sequences.even_on,
+        blend=operator.and_,
+    )
+    assert strings(anded) == ['010101010101'] and anded.length == 1
+
+def test_combinators_stream_in_constant_memory():
+    endless = sequences.stretch(sequences.repeat(random_flip_kwargs()), 2)
+    patterns = endless()
+    for _ in range(100_000):  # Until every Pattern has been interned
+        next(patterns)
+    tracemalloc.start()
+    for _ in range(100_000):
+        next(patterns)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 64 * 1024
+    assert frame_buffer(endless, {}) is None
+
+def test_period():
+    assert sequences.period('abab') == 2
+    assert sequences.period('abcabcab') == 8  # Would not loop seamlessly
+    assert sequences.period('aaaa') == 1
+    assert sequences.period('abcabc') == 3
+
+def test_cycle_of_finite_sequence():
+    cycle = sequences.cycle_of(rotate, {'pattern': '100100100100'})
+    assert cycle.period == 3
+    assert cycle is sequences.cycle_of(rotate, {'pattern': '100100100100'})
+    assert str(cycle.frame_at(3001)) == '010010010010'
+    assert strings(lambda: cycle.frames_from(5), 4) == [
+        '001001001001', '100100100100', '010010010010', '001001001001',
+    ]
+
+def test_cycle_of_endless_combined():
+    endless = sequences.stretch(sequences.repeat(sequences.blink_all), 2)
+    cycle = sequences.cycle_of(endless, {})
+    assert [str(f) for f in cycle.frames] == [
+        '1' * 12, '1' * 12, '0' * 12, '0' * 12,
+    ]
+
+def test_cycle_of_streamed_sequences():
+    assert sequences.cycle_of(random_flip, {'light_pattern': '0' * 12}) is None
+    assert sequences.cycle_of(lambda: iter([]), {}) is None
+    assert sequences.cycle_of(lambda lights: iter(lights), {'lights': []}) is None
+
+def test_looped_cycles_first_pass_as_generated():
+    generated = []
+
+    def counting(*, n):
+        for i in range(n):
+            generated.append(i)
+            yield i
+
+    frames = sequences.looped(counting, {'n': 3}, start=1)
+    assert generated == []
+    assert list(itertools.islice(frames, 4)) == [1, 2, 0, 1]
+    assert generated == [0, 1, 2]
+    assert sequences.cycle_of(counting, {'n': 3}).frames == (0, 1, 2)
+    again = sequences.looped(counting, {'n': 3}, start=5)
+    assert list(itertools.islice(again, 2)) == [2, 0]
+    assert generated == [0, 1, 2]
+
+def test_looped_streamed_sequence_restarts():
+    calls = []
+
+    @sequences.streamed
+    def counting():
+        calls.append(None)
+        yield from range(2)
+
+    frames = sequences.looped(counting, {}, start=3)
+    assert list(itertools.islice(frames, 3)) == [1, 0, 1]
+    assert len(calls) == 3
+
+def test_frame_caches_are_bounded(monkeypatch):
+    monkeypatch.setattr(sequences, '_frame_buffers', sequences.LRUCache(2))
+    monkeypatch.setattr(sequences, '_cycles', sequences.LRUCache(2))
+    patterns = ['100000000000', '110000000000', '111000000000']
+    for pattern in patterns:
+        sequences.cycle_of(rotate, {'pattern': pattern})
+    sequences.cycle_of(rotate, {'pattern': patterns[1]})
+    sequences.cycle_of(rotate, {'pattern': patterns[0]})
+    assert len(sequences._frame_buffers) == 2
+    assert [dict(kwargs)['pattern'] for _, kwargs in sequences._cycles] == [
+        patterns[1], patterns[0],
+    ]
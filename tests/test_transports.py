@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+import dimmers
+from eventloops import BackgroundEventLoop
+import transports
+from transports import (
+    HttpTransport, ShellyRpcError, UdpTransport, WebSocketTransport,
+)
+
+from shelly_stand_in import StandInShelly, wait_for
+
+@pytest.fixture
+def event_loop_thread():
+    event_loop = BackgroundEventLoop()
+    yield event_loop
+    event_loop.close()
+
+def test_http_transport(event_loop_thread):
+    shelly = StandInShelly()
+    transport = HttpTransport(shelly.address, event_loop_thread)
+    event_loop_thread.run(
+        transport.call('Light.Set', {'id': 1, 'brightness': 55, 'on': True})
+    )
+    status = event_loop_thread.run(transport.call('Shelly.GetStatus', {}))
+    assert status['light:1'] == {'brightness': 55}
+    with pytest.raises(ShellyRpcError):
+        event_loop_thread.run(transport.call('Bogus', {}))
+
+def test_websocket_transport_pipelines_calls(event_loop_thread):
+    shelly = StandInShelly()
+    transport = WebSocketTransport(shelly.address, event_loop_thread)
+
+    async def pipeline():
+        return await asyncio.gather(*(
+            transport.call('Light.Set', {'id': i % 2, 'brightness': i})
+            for i in range(20)
+        ), transport.call('Shelly.GetStatus', {}))
+
+    results = event_loop_thread.run(pipeline())
+    assert results[-1]['light:0'] == {'brightness': 18}
+    assert results[-1]['light:1'] == {'brightness': 19}
+    assert len(shelly.ws_calls) == 21
+    assert not shelly.http_calls
+    with pytest.raises(ShellyRpcError):
+        event_loop_thread.run(transport.call('Bogus', {}))
+    event_loop_thread.run(transport.close())
+
+def test_websocket_transport_falls_back_to_http(event_loop_thread):
+    shelly = StandInShelly()
+    transport = WebSocketTransport(shelly.address + '/missing', event_loop_thread)
+    transport.fallback = HttpTransport(shelly.address, event_loop_thread)
+    status = event_loop_thread.run(transport.call('Shelly.GetStatus', {}))
+    assert status['light:0'] == {'brightness': 10}
+    assert shelly.http_calls == ['Shelly.GetStatus']
+
+def test_udp_transport_sends_without_waiting(event_loop_thread):
+    shelly = StandInShelly()
+    transport = UdpTransport(shelly.address, event_loop_thread, port=shelly.udp_port)
+    for brightness in range(5):
+        assert event_loop_thread.run(
+            transport.call('Light.Set', {'id': 0, 'brightness': brightness})
+        ) is None
+    wait_for(lambda: len(shelly.udp_calls) == 5)
+    assert shelly.brightness[0] == 4
+    event_loop_thread.run(transport.close())
+
+def test_udp_status_poll_corrects_brightness(monkeypatch):
+    shelly = StandInShelly()
+    monkeypatch.setattr(transports, 'UDP_RPC_PORT', shelly.udp_port)
+    monkeypatch.setattr(dimmers, 'STATUS_POLL_INTERVAL', 0.05)
+    dimmer = dimmers.ShellyProDimmer2PM(0, shelly.address, transport='http')
+    try:
+        channel = dimmer.channels[0]
+        channel.set(brightness=40, transport='udp')
+        wait_for(lambda: shelly.brightness[0] == 40)
+        shelly.drop_udp = True
+        channel.set(brightness=90, transport='udp')
+        assert channel.brightness == 90
+        wait_for(lambda: channel.brightness == 40)
+        assert shelly.udp_calls == ['Light.Set']
+    finally:
+        dimmers.ShellyDimmer.close_all()
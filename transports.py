@@ -0,0 +1,207 @@
+"""Marquee Lighted Sign Project - transports"""
+
+from abc import ABC, abstractmethod
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, ClassVar
+
+import aiohttp
+
+from eventloops import BackgroundEventLoop, REQUEST_TIMEOUT
+
+RPC_SOURCE = "marquee"
+UDP_RPC_PORT = 1010  # Device setting sys.rpc_udp.listen_port
+WEBSOCKET_RETRY_INTERVAL = 10.0
+
+class ShellyRpcError(Exception):
+    """The device rejected an RPC call."""
+
+class ShellyTransport(ABC):
+    """Carries JSON-RPC calls to a single Shelly Gen2 device."""
+
+    fire_and_forget: ClassVar[bool] = False
+
+    def __init__(self, ip_address: str, event_loop: BackgroundEventLoop):
+        """Create the transport.  No connection is made until first use."""
+        self.ip_address = ip_address
+        self.event_loop = event_loop
+
+    def __str__(self):
+        return f"{type(self).__name__} @ {self.ip_address}"
+
+    @abstractmethod
+    async def call(self, method: str, params: dict[str, Any]) -> Any:
+        """Invoke method with params on the device and return its result."""
+
+    async def close(self):
+        """Clean up."""
+
+class HttpTransport(ShellyTransport):
+    """One HTTP GET per call to /rpc/<method>,
+       over the event loop's keep-alive session."""
+
+    @staticmethod
+    def _query(params: dict[str, Any]) -> dict[str, str]:
+        """Return params encoded as URL query values."""
+        return {
+            k: ('true' if v else 'false') if isinstance(v, bool) else str(v)
+            for k, v in params.items()
+        }
+
+    async def call(self, method: str, params: dict[str, Any]) -> Any:
+        """Invoke method with params on the device and return its result."""
+        session = self.event_loop.session(self.ip_address)
+        async with session.get(
+            url=f'http://{self.ip_address}/rpc/{method}',
+            params=self._query(params),
+        ) as response:
+            result = await response.json()
+            if response.status != 200:
+                raise ShellyRpcError(f"{self} {method}: {result}")
+        return result
+
+class WebSocketTransport(ShellyTransport):
+    """Pipelines any number of calls as JSON-RPC frames over
+       one persistent WebSocket on /rpc, matching each response
+       to its call by RPC id.  Falls back to HTTP while
+       the WebSocket cannot be established."""
+
+    def __init__(self, ip_address: str, event_loop: BackgroundEventLoop):
+        """Create the transport.  No connection is made until first use."""
+        super().__init__(ip_address, event_loop)
+        self.fallback = HttpTransport(ip_address, event_loop)
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._reader: asyncio.Task | None = None
+        self._connecting: asyncio.Lock | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._retry_time = 0.0
+
+    async def _connect(self) -> aiohttp.ClientWebSocketResponse | None:
+        """Return the open WebSocket, connecting if needed.
+           Return None if the device cannot be reached that way."""
+        if self._ws is not None and not self._ws.closed:
+            return self._ws
+        if self._connecting is None:
+            self._connecting = asyncio.Lock()
+        async with self._connecting:
+            if self._ws is not None and not self._ws.closed:
+                return self._ws
+            if time.monotonic() < self._retry_time:
+                return None
+            session = self.event_loop.session(self.ip_address)
+            try:
+                self._ws = await session.ws_connect(
+                    f'ws://{self.ip_address}/rpc',
+                )
+            except (aiohttp.ClientError, TimeoutError) as err:
+                print(f"{self} unavailable, using HTTP: {err!r}")
+                self._retry_time = time.monotonic() + WEBSOCKET_RETRY_INTERVAL
+                self._ws = None
+                return None
+            self._reader = asyncio.create_task(self._read_responses(self._ws))
+        return self._ws
+
+    async def _read_responses(self, ws: aiohttp.ClientWebSocketResponse):
+        """Resolve pending calls as their responses arrive."""
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                frame = message.json()
+                future = self._pending.pop(frame.get('id'), None)
+                if future is None or future.done():
+                    # Notification, or response to a call that timed out.
+                    continue
+                if 'error' in frame:
+                    future.set_exception(
+                        ShellyRpcError(f"{self}: {frame['error']}")
+                    )
+                else:
+                    future.set_result(frame.get('result'))
+        finally:
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError(f"{self} closed")
+                    )
+
+    async def call(self, method: str, params: dict[str, Any]) -> Any:
+        """Invoke method with params on the device and return its result."""
+        ws = await self._connect()
+        if ws is None:
+            return await self.fallback.call(method, params)
+        id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[id] = future
+        try:
+            await ws.send_json({
+                'id': id,
+                'src': RPC_SOURCE,
+                'method': method,
+                'params': params,
+            })
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        except ConnectionError:
+            return await self.fallback.call(method, params)
+        finally:
+            self._pending.pop(id, None)
+
+    async def close(self):
+        """Close the WebSocket."""
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await self._reader
+
+class UdpTransport(ShellyTransport):
+    """Sends each call as a single JSON-RPC datagram and returns
+       without waiting for, or ever reading, a response.
+       Callers must confirm device state by other means."""
+
+    fire_and_forget = True
+
+    def __init__(
+            self,
+            ip_address: str,
+            event_loop: BackgroundEventLoop,
+            port: int | None = None,
+        ):
+        """Create the transport.  No socket is opened until first use."""
+        super().__init__(ip_address, event_loop)
+        self.host = ip_address.split(':')[0]
+        self.port = UDP_RPC_PORT if port is None else port
+        self._endpoint: asyncio.DatagramTransport | None = None
+        self._ids = itertools.count(1)
+
+    def __str__(self):
+        return f"{type(self).__name__} @ {self.host}:{self.port}"
+
+    async def call(self, method: str, params: dict[str, Any]) -> None:
+        """Send method with params to the device.  Return immediately."""
+        if self._endpoint is None or self._endpoint.is_closing():
+            self._endpoint, _ = await asyncio.get_running_loop(
+            ).create_datagram_endpoint(
+                asyncio.DatagramProtocol,
+                remote_addr=(self.host, self.port),
+            )
+        self._endpoint.sendto(json.dumps({
+            'id': next(self._ids),
+            'src': RPC_SOURCE,
+            'method': method,
+            'params': params,
+        }).encode())
+
+    async def close(self):
+        """Close the socket."""
+        if self._endpoint is not None:
+            self._endpoint.close()
+
+TRANSPORTS: dict[str, type[ShellyTransport]] = {
+    'http': HttpTransport,
+    'websocket': WebSocketTransport,
+    'udp': UdpTransport,
+}